@@ -0,0 +1,97 @@
+try: import numpy as np
+except ImportError: np = None
+
+from db_core import COMPARISON_OPS, MOB_SCHEMA, compile_query, parse_query, parse_value
+
+HAS_NUMPY = np is not None
+
+NUMERIC_FIELDS = [k for k, v in MOB_SCHEMA.template.items() if isinstance(v, int) and not isinstance(v, bool) and k != 'Id']
+DROP_FIELDS = ['Drops.Rate', 'MvpDrops.Rate']
+ROUNDING = {'round': lambda a: np.rint(a), 'floor': lambda a: np.floor(a), 'ceil': lambda a: np.ceil(a)}
+
+class MobTable:
+    # Column projection of mob_data: one int64 array per numeric template field and flat arrays over all drop rows.
+    def __init__(self, body, schema=MOB_SCHEMA):
+        if np is None: raise RuntimeError("NumPy is required for bulk editing.")
+        self.body, self.schema = body, schema
+        self.columns = {}
+        for field in NUMERIC_FIELDS:
+            default = schema.template[field]
+            self.columns[field] = np.fromiter((_as_int(e.get(field, default), default) for e in body), dtype=np.int64, count=len(body))
+        self.ids = np.fromiter((_as_int(e.get('Id', 0), 0) for e in body), dtype=np.int64, count=len(body))
+        self.drops = {}
+        for list_field in ('Drops', 'MvpDrops'):
+            owners, positions, rates = [], [], []
+            for row, entry in enumerate(body):
+                for pos, drop in enumerate(entry.get(list_field) or ()):
+                    if isinstance(drop, dict): owners.append(row); positions.append(pos); rates.append(_as_int(drop.get('Rate', 0), 0))
+            self.drops[list_field + '.Rate'] = (np.array(owners, dtype=np.int64), np.array(positions, dtype=np.int64), np.array(rates, dtype=np.int64))
+
+    def __len__(self): return len(self.body)
+
+    def mask(self, text):
+        # text is a query in the search bar's language (db_core.parse_query). Numeric comparisons on projected columns
+        # are vectorized; any other condition runs the query bar's compiled matcher row by row.
+        if not text.strip(): return np.ones(len(self.body), dtype=bool)
+        return self._mask(parse_query(text))
+
+    def _mask(self, node):
+        if node[0] == 'not': return ~self._mask(node[1])
+        if node[0] in ('and', 'or'):
+            masks = [self._mask(n) for n in node[1]]
+            return np.logical_and.reduce(masks) if node[0] == 'and' else np.logical_or.reduce(masks)
+        _, path, op, raw_value = node
+        value = parse_value(raw_value)
+        if op in COMPARISON_OPS and isinstance(value, (int, float)) and not isinstance(value, bool):
+            if path in self.columns: return COMPARISON_OPS[op](self.columns[path], value)
+            if path == 'Id' and isinstance(value, int): return COMPARISON_OPS[op](self.ids, value)
+        predicate = compile_query(node, self.schema)
+        return np.fromiter((predicate(e) for e in self.body), dtype=bool, count=len(self.body))
+
+    def compute(self, field, mask, factor=1.0, offset=0.0, minimum=None, maximum=None, rounding='round'):
+        # Returns a BulkChange describing every value that differs after the operation; nothing is written yet.
+        if field in self.columns: rows, positions, old = np.nonzero(mask)[0], None, self.columns[field][mask]
+        elif field in self.drops:
+            owners, drop_positions, rates = self.drops[field]
+            selected = mask[owners] if len(owners) else np.zeros(0, dtype=bool)
+            rows, positions, old = owners[selected], drop_positions[selected], rates[selected]
+        else: raise ValueError(f"Field {field!r} cannot be bulk edited.")
+        new = old.astype(np.float64) * factor + offset
+        if minimum is not None or maximum is not None: new = np.clip(new, minimum, maximum)
+        new = ROUNDING[rounding](new).astype(np.int64)
+        changed = new != old
+        return BulkChange(field, rows[changed], None if positions is None else positions[changed], old[changed], new[changed])
+
+class BulkChange:
+    def __init__(self, field, rows, positions, old, new):
+        self.field, self.rows, self.positions, self.old, self.new = field, rows, positions, old, new
+
+    def __len__(self): return len(self.rows)
+
+    def preview(self, body, limit=None):
+        n = len(self.rows) if limit is None else min(limit, len(self.rows))
+        for i in range(n):
+            entry = body[int(self.rows[i])]
+            label = self.field if self.positions is None else f"{self.field.split('.')[0]}[{int(self.positions[i])}].Rate"
+            yield entry.get('Id'), entry.get('AegisName', ''), label, int(self.old[i]), int(self.new[i])
+
+    def build_entries(self, body, schema=MOB_SCHEMA):
+        # New entry dicts for every touched row as {row: new_entry}; the originals are left untouched for undo.
+        updated = {}
+        for i in range(len(self.rows)):
+            row = int(self.rows[i])
+            if (entry := updated.get(row)) is None: entry = updated[row] = dict(body[row])
+            if self.positions is None:
+                entry[self.field] = int(self.new[i])
+                if entry[self.field] == schema.template.get(self.field) and self.field not in schema.KEEP_FIELDS: del entry[self.field]
+            else:
+                list_field, pos = self.field.split('.')[0], int(self.positions[i])
+                if entry[list_field] is body[row].get(list_field): entry[list_field] = list(entry[list_field])
+                entry[list_field][pos] = dict(entry[list_field][pos], Rate=int(self.new[i]))
+        return updated
+
+def _as_int(value, default):
+    if isinstance(value, bool): return int(value)
+    if isinstance(value, int): return value
+    try: return int(value)
+    except (TypeError, ValueError): return default
@@ -0,0 +1,128 @@
+import json
+import os
+from collections.abc import Mapping
+
+JOURNAL_VERSION = 1
+
+def journal_path(path):
+    directory, name = os.path.split(os.path.abspath(path))
+    return os.path.join(directory, f".{name}.ryde-journal")
+
+def file_stamp(path):
+    st = os.stat(path)
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+
+def _encode(value):
+    if isinstance(value, Mapping): return dict(value.items())
+    return str(value)
+
+class JournalMismatch(Exception): pass
+
+class ChangeJournal:
+    # Append-only JSON-lines log next to the YAML file: one header naming the saved file it applies to, then one
+    # line per committed step as [old, new] entry pairs (old None = added, new None = deleted). Undo/redo keep the
+    # live entry objects in memory and append the inverse step, so the file always replays forward.
+    def __init__(self, path):
+        self.path, self.log_path = path, journal_path(path)
+        self.undo_stack, self.redo_stack = [], []
+        self.unsaved, self.enabled = 0, True
+
+    def _write_header(self, steps=()):
+        # A directory we cannot write to only costs crash recovery; undo/redo keep working in memory.
+        data = json.dumps({'journal': JOURNAL_VERSION, 'file': os.path.basename(self.path), **file_stamp(self.path)})
+        tmp = self.log_path + '.tmp'
+        try:
+            with open(tmp, 'w', encoding='utf-8') as f:
+                f.write(data + '\n' + ''.join(line + '\n' for line in steps)); f.flush(); os.fsync(f.fileno())
+            os.replace(tmp, self.log_path); self.enabled = True
+        except OSError: self.enabled = False
+        self.unsaved = 0
+
+    def _append(self, label, pairs):
+        self.unsaved += 1
+        if not self.enabled: return
+        line = json.dumps({'label': label, 'changes': [[old, new] for old, new in pairs]}, default=_encode, ensure_ascii=False)
+        try:
+            with open(self.log_path, 'a', encoding='utf-8') as f:
+                f.write(line + '\n'); f.flush(); os.fsync(f.fileno())
+        except OSError: self.enabled = False
+
+    def pending(self):
+        # [(label, [[old, new], ...])] waiting in the journal for the current file; raises JournalMismatch if the
+        # file changed after the journal was started (saved elsewhere, edited by another tool).
+        try:
+            with open(self.log_path, encoding='utf-8') as f: lines = f.read().split('\n')
+        except FileNotFoundError: return []
+        try: header = json.loads(lines[0])
+        except (ValueError, IndexError): raise JournalMismatch("The journal header is unreadable.")
+        if header.get('journal') != JOURNAL_VERSION or {k: header.get(k) for k in ('size', 'mtime_ns')} != file_stamp(self.path):
+            raise JournalMismatch(f"{os.path.basename(self.path)} changed after the journal was written.")
+        steps = []
+        for line in lines[1:]:
+            if not line.strip(): continue
+            try: record = json.loads(line)
+            except ValueError: break  # torn final write
+            steps.append((record.get('label', ''), record.get('changes', [])))
+        return steps
+
+    def start(self):
+        # New journal for the file as it is on disk now; called after a load without recovery and after every save.
+        self._write_header()
+
+    def adopt(self, label, pairs):
+        # A step replayed from the journal during recovery: undoable, but already on disk.
+        self.undo_stack.append((label, pairs)); self.redo_stack.clear(); self.unsaved += 1
+
+    def restamp(self):
+        # The file was changed by another program and merged in; the unsaved steps stay, now stamped against it.
+        try:
+            with open(self.log_path, encoding='utf-8') as f: steps = [line for line in f.read().split('\n')[1:] if line.strip()]
+        except OSError: steps = []
+        unsaved = self.unsaved
+        self._write_header(steps); self.unsaved = unsaved
+
+    def set_aside(self):
+        if os.path.exists(self.log_path): os.replace(self.log_path, self.log_path + '.bak')
+
+    def record(self, label, pairs):
+        pairs = list(pairs)
+        self._append(label, pairs)
+        self.undo_stack.append((label, pairs)); self.redo_stack.clear()
+
+    def undo(self):
+        # Returns (label, pairs to apply) or None.
+        if not self.undo_stack: return None
+        label, pairs = self.undo_stack.pop()
+        inverse = [(new, old) for old, new in reversed(pairs)]
+        self._append(f"undo {label}", inverse)
+        self.redo_stack.append((label, pairs))
+        return label, inverse
+
+    def redo(self):
+        if not self.redo_stack: return None
+        label, pairs = self.redo_stack.pop()
+        self._append(label, pairs)
+        self.undo_stack.append((label, pairs))
+        return label, pairs
+
+    def compact(self, path=None):
+        # After a save the file itself holds every change, so the log restarts empty; undo history stays in memory.
+        # With Save As the journal moves to the new file and the old one's is dropped.
+        if path is not None and os.path.abspath(path) != os.path.abspath(self.path):
+            self.close(); self.path, self.log_path = path, journal_path(path)
+        self._write_header()
+
+    def close(self):
+        # Clean shutdown with nothing unsaved.
+        try: os.remove(self.log_path)
+        except OSError: pass
+
+def resolve_step(keys, changes):
+    # Maps a journalled step ([old, new] plain dicts) onto live entries through the editor's PrimaryKeyIndex, one Id
+    # lookup per change: returns ([(live_old, new)], missed count).
+    live, missed = [], 0
+    for old, new in changes:
+        if old is None: live.append((None, new)); continue
+        if (match := keys.get(old.get('Id'))) is None or match != old: missed += 1
+        else: live.append((match, new))
+    return live, missed
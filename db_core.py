@@ -0,0 +1,247 @@
+import operator
+import os
+import re
+from abc import ABC, abstractmethod
+from collections.abc import Mapping
+
+from db_loader import DBLoadError, load_db, read_header
+from db_writer import FileImage, save_db
+from key_index import DuplicateKeyError, PrimaryKeyIndex
+
+ITEM_TEMPLATE = {
+    'Id': 0, 'AegisName': 'NEW_ITEM', 'Name': 'New Item', 'Type': 'Etc',
+    'SubType': None, 'Buy': 0, 'Sell': 0, 'Weight': 0, 'Attack': 0,
+    'MagicAttack': 0, 'Defense': 0, 'Range': 0, 'Slots': 0,
+    'Jobs': {'All': True}, 'Classes': {'All': True}, 'Gender': 'Both',
+    'Locations': None, 'WeaponLevel': 0, 'ArmorLevel': 0,
+    'EquipLevelMin': 0, 'EquipLevelMax': 0, 'Refineable': False,
+    'Gradable': False, 'View': 0, 'AliasName': None,
+    'Flags': {}, 'Delay': {}, 'Stack': {}, 'NoUse': {}, 'Trade': {},
+    'Script': None, 'EquipScript': None, 'UnEquipScript': None
+}
+
+MOB_TEMPLATE = {
+    'Id': 0, 'AegisName': 'NEW_MOB', 'Name': 'New Mob', 'JapaneseName': 'New Mob',
+    'Level': 1, 'Hp': 1, 'Sp': 1, 'BaseExp': 0, 'JobExp': 0, 'MvpExp': 0,
+    'Attack': 0, 'Attack2': 0, 'Defense': 0, 'MagicDefense': 0,
+    'Resistance': 0, 'MagicResistance': 0, 'Str': 1, 'Agi': 1, 'Vit': 1,
+    'Int': 1, 'Dex': 1, 'Luk': 1, 'AttackRange': 0, 'SkillRange': 0,
+    'ChaseRange': 0, 'Size': 'Small', 'Race': 'Formless',
+    'RaceGroups': {}, 'Element': 'Neutral', 'ElementLevel': 1,
+    'WalkSpeed': 'DEFAULT_WALK_SPEED', 'AttackDelay': 0, 'AttackMotion': 0,
+    'ClientAttackMotion': 0, 'DamageMotion': 0, 'DamageTaken': 100,
+    'GroupId': 0, 'Title': 'None', 'Ai': '06', 'Class': 'Normal',
+    'Modes': {}, 'MvpDrops': [], 'Drops': []
+}
+
+class Schema(ABC):
+    # Per-database rules shared by the GUI editors and the CLI: template, field coercion and cleaning.
+    def __init__(self, db_type, template, int_fields, bool_fields=(), none_values=(), dict_int_values=False, default_id=1):
+        self.db_type, self.template = db_type, template
+        self.int_fields, self.bool_fields = frozenset(int_fields), frozenset(bool_fields)
+        self.none_values, self.dict_int_values, self.default_id = tuple(none_values), dict_int_values, default_id
+
+    def merge_template(self, entry):
+        full = self.template.copy(); full.update(entry)
+        return full
+
+    def coerce_field(self, key, text):
+        if text in self.none_values: return None
+        if key in self.int_fields: return int(text) if text.isdigit() else 0
+        if key in self.bool_fields: return text.lower() == 'true'
+        return text
+
+    def parse_dict_text(self, text):
+        items = {}
+        for line in text.strip().split('\n'):
+            if ':' in line:
+                k, v = (s.strip() for s in line.split(':', 1))
+                if v.lower() == 'true': items[k] = True
+                elif v.lower() == 'false': items[k] = False
+                elif self.dict_int_values and v.isdigit(): items[k] = int(v)
+                else: items[k] = v
+        return items
+
+    def format_dict_text(self, items):
+        return "\n".join([f"{k}: {v}" for k, v in items.items()])
+
+    @abstractmethod
+    def clean(self, entry): pass
+
+class ItemSchema(Schema):
+    def __init__(self):
+        super().__init__('ITEM_DB', ITEM_TEMPLATE,
+                         ['Id', 'Buy', 'Sell', 'Weight', 'Attack', 'MagicAttack', 'Defense', 'Range', 'Slots', 'WeaponLevel', 'ArmorLevel', 'EquipLevelMin', 'EquipLevelMax', 'View'],
+                         bool_fields=['Refineable', 'Gradable'], none_values=("", "None"), dict_int_values=True, default_id=501)
+
+    def clean(self, entry):
+        return {k: v for k, v in entry.items() if v is not None and v != {}}
+
+class MobSchema(Schema):
+    KEEP_FIELDS = ('Id', 'AegisName', 'Name')
+    DROP_IF_EMPTY = ('MvpDrops', 'Drops', 'Modes', 'RaceGroups')
+
+    def __init__(self):
+        super().__init__('MOB_DB', MOB_TEMPLATE,
+                         ['Id', 'Level', 'Hp', 'Sp', 'BaseExp', 'JobExp', 'MvpExp', 'Attack', 'Attack2', 'Defense', 'MagicDefense', 'Resistance', 'MagicResistance', 'Str', 'Agi', 'Vit', 'Int', 'Dex', 'Luk', 'AttackRange', 'SkillRange', 'ChaseRange', 'ElementLevel', 'AttackDelay', 'AttackMotion', 'ClientAttackMotion', 'DamageMotion', 'DamageTaken', 'GroupId'],
+                         default_id=1001)
+
+    def make_drop(self, item, rate): return {'Item': item, 'Rate': int(rate)}
+
+    def clean(self, entry):
+        clean = {}
+        for key, value in entry.items():
+            if key in self.template and value == self.template[key] and key not in self.KEEP_FIELDS: continue
+            if key in self.DROP_IF_EMPTY and not value: continue
+            clean[key] = value
+        return clean
+
+ITEM_SCHEMA = ItemSchema()
+MOB_SCHEMA = MobSchema()
+SCHEMAS = {s.db_type: s for s in (ITEM_SCHEMA, MOB_SCHEMA)}
+
+def detect_schema(path):
+    header = read_header(path)
+    if header is None or header.get('Type') not in SCHEMAS:
+        raise DBLoadError(f"{os.path.basename(path)} is not an ITEM_DB or MOB_DB YAML file.")
+    return SCHEMAS[header['Type']]
+
+class Database:
+    def __init__(self, path, schema, header, body, image=None, cache=None):
+        self.path, self.schema, self.header, self.body = path, schema, header, body
+        self.image, self.cache = image, cache
+        self.keys = PrimaryKeyIndex(body)
+
+    @classmethod
+    def open(cls, path, schema=None, cache=None, progress=None):
+        schema = schema or detect_schema(path)
+        data, raw = load_db(path, schema.db_type, progress, cache, with_raw=True)
+        return cls(path, schema, data['Header'], data['Body'], FileImage.scan(raw, data['Body']), cache)
+
+    def __len__(self): return len(self.body)
+
+    def mark_changed(self, entry):
+        if self.image is not None: self.image.mark_dirty(entry)
+
+    def replace(self, index, entry):
+        self.keys.replace(self.body[index], entry)
+        self.body[index] = entry
+
+    def add(self, entry, index=None):
+        self.keys.add(entry)
+        if index is None: self.body.append(entry)
+        else: self.body.insert(index, entry)
+
+    def remove(self, index):
+        entry = self.body.pop(index)
+        self.keys.remove(entry)
+        return entry
+
+    def save(self, path=None):
+        path = path or self.path
+        if self.cache is not None: self.cache.invalidate(path)
+        self.image = save_db(path, self.header, self.body, self.image)
+        self.path = path
+
+# --- filters: "Field OP value" conditions, dotted paths reach into dict fields (Modes.Mvp=true)
+
+_CONDITION = re.compile(r'^\s*([A-Za-z_][\w.]*)\s*(>=|<=|!=|=|>|<|~)\s*(.*?)\s*$')
+COMPARISON_OPS = {'=': operator.eq, '!=': operator.ne, '>=': operator.ge, '<=': operator.le, '>': operator.gt, '<': operator.lt}
+
+def parse_value(text):
+    if re.fullmatch(r'-?\d+', text): return int(text)
+    if re.fullmatch(r'-?\d+\.\d*', text): return float(text)
+    if text.lower() in ('true', 'false'): return text.lower() == 'true'
+    return text
+
+def get_path(entry, path, schema=None):
+    value = entry
+    for i, part in enumerate(path.split('.')):
+        if not isinstance(value, Mapping): return None
+        if i == 0 and schema is not None and part not in value: value = schema.template.get(part)
+        else: value = value.get(part)
+    return value
+
+def split_condition(text):
+    if not (m := _CONDITION.match(text)): raise ValueError(f"Invalid condition: {text!r}")
+    return m.groups()
+
+def value_matcher(op, raw_value):
+    # Test for one field value; shared by the entry predicates below and search_index.FieldIndex.
+    value = parse_value(raw_value)
+    if op == '~':
+        needle = raw_value.lower()
+        return lambda actual: needle in str(actual or '').lower()
+    compare = COMPARISON_OPS[op]
+    def match(actual):
+        if isinstance(actual, Mapping) and isinstance(value, str) and op in ('=', '!='):
+            # Flag dicts (Jobs=Swordman, Locations=Right_Hand, Modes!=Mvp): the flag is set.
+            return compare(any(v and str(k).lower() == value.lower() for k, v in actual.items()), True)
+        if isinstance(actual, str) and isinstance(value, str): return compare(actual.lower(), value.lower())
+        if isinstance(actual, bool) or isinstance(value, bool): return compare(bool(actual), value) if op in ('=', '!=') else False
+        try: return compare(actual, value)
+        except TypeError: return op == '!='
+    return match
+
+def parse_condition(text, schema=None):
+    path, op, raw_value = split_condition(text)
+    match = value_matcher(op, raw_value)
+    return lambda entry: match(get_path(entry, path, schema))
+
+# Queries combine conditions with AND, OR, NOT and parentheses: "Type=Weapon AND (Slots>=3 OR Refineable=false)".
+# Keywords are upper case and stand alone, so values such as "Name~Sword and Shield" stay one condition.
+_QUERY_TOKEN = re.compile(r'(\(|\)|(?<![^\s(])(?:AND|OR|NOT)(?![^\s()]))')
+_QUERY_HINT = re.compile(r'[=<>~]')
+
+def is_query(text): return bool(_QUERY_HINT.search(text))
+
+def parse_query(text):
+    # Returns a tree of ('cond', path, op, raw_value), ('and', [...]), ('or', [...]) and ('not', node).
+    tokens = [t.strip() for t in _QUERY_TOKEN.split(text) if t.strip()]
+    pos = 0
+    def peek(): return tokens[pos] if pos < len(tokens) else None
+    def take():
+        nonlocal pos; pos += 1
+        return tokens[pos - 1]
+    def expr():
+        nodes = [term()]
+        while peek() == 'OR': take(); nodes.append(term())
+        return nodes[0] if len(nodes) == 1 else ('or', nodes)
+    def term():
+        nodes = [factor()]
+        while peek() == 'AND': take(); nodes.append(factor())
+        return nodes[0] if len(nodes) == 1 else ('and', nodes)
+    def factor():
+        token = take() if peek() is not None else None
+        if token is None: raise ValueError("Incomplete query.")
+        if token == 'NOT': return ('not', factor())
+        if token == '(':
+            node = expr()
+            if peek() != ')': raise ValueError("Missing ')'.")
+            take(); return node
+        if token in (')', 'AND', 'OR'): raise ValueError(f"Unexpected {token!r}.")
+        return ('cond', *split_condition(token))
+    node = expr()
+    if peek() is not None: raise ValueError(f"Unexpected {peek()!r}; join conditions with AND or OR.")
+    return node
+
+def query_paths(node):
+    if node[0] == 'cond': return {node[1]}
+    if node[0] == 'not': return query_paths(node[1])
+    return set().union(*(query_paths(n) for n in node[1]))
+
+def compile_query(node, schema=None):
+    if node[0] == 'cond':
+        match = value_matcher(node[2], node[3]); path = node[1]
+        return lambda entry: match(get_path(entry, path, schema))
+    if node[0] == 'not':
+        inner = compile_query(node[1], schema)
+        return lambda entry: not inner(entry)
+    parts = [compile_query(n, schema) for n in node[1]]
+    combine = all if node[0] == 'and' else any
+    return lambda entry: combine(p(entry) for p in parts)
+
+def parse_filter(conditions, schema=None):
+    # Each condition may itself be a query; they must all hold.
+    predicates = [compile_query(parse_query(c), schema) for c in conditions]
+    return lambda entry: all(p(entry) for p in predicates)
@@ -0,0 +1,112 @@
+import io
+import queue
+import re
+import threading
+import yaml
+
+try: from yaml import CSafeLoader as SafeLoader
+except ImportError: from yaml import SafeLoader
+
+HAS_LIBYAML = SafeLoader is not yaml.SafeLoader
+
+class DBLoadError(Exception): pass
+
+def read_header(path, max_bytes=64 * 1024):
+    # rAthena files put Header before Body, so only the leading top-level block has to be parsed.
+    lines, read, in_header = [], 0, False
+    with open(path, 'r', encoding='utf-8-sig', errors='replace') as f:
+        for line in f:
+            read += len(line)
+            if read > max_bytes: break
+            if line[:1] not in ('', ' ', '\t', '#', '\n', '\r'):
+                if in_header: break
+                in_header = line.startswith('Header:')
+            if in_header: lines.append(line)
+    if not lines: return None
+    try: data = yaml.load(''.join(lines), Loader=SafeLoader)
+    except yaml.YAMLError: return None
+    return data.get('Header') if isinstance(data, dict) and isinstance(data.get('Header'), dict) else None
+
+_FOOTER_LINE = re.compile(rb'^Footer:', re.M)
+_TOP_LEVEL_AFTER = re.compile(rb'^[^ \t\r\n#-]', re.M)
+
+def read_footer(path):
+    # Footer (Imports) follows the Body, so it is located with a byte search instead of parsing the whole file.
+    with open(path, 'rb') as f: raw = f.read()
+    if (m := _FOOTER_LINE.search(raw)) is None: return None
+    end = _TOP_LEVEL_AFTER.search(raw, m.end())
+    try: data = yaml.load(raw[m.start():end.start() if end else len(raw)], Loader=SafeLoader)
+    except yaml.YAMLError: return None
+    return data.get('Footer') if isinstance(data, dict) and isinstance(data.get('Footer'), dict) else None
+
+def check_header(path, db_type):
+    header = read_header(path)
+    if header is not None and header.get('Type') != db_type:
+        raise DBLoadError(f"This does not appear to be a valid {db_type} YAML file.")
+
+class _ProgressReader:
+    def __init__(self, f, total, callback):
+        self.f, self.total, self.callback, self.pos = f, max(total, 1), callback, 0
+
+    def read(self, size=-1):
+        chunk = self.f.read(size)
+        self.pos += len(chunk)
+        if self.callback: self.callback(min(self.pos / self.total, 1.0))
+        return chunk
+
+def load_db(path, db_type, progress=None, cache=None, with_raw=False):
+    check_header(path, db_type)
+    with open(path, 'rb') as f: raw = f.read()
+    if cache is not None and (data := cache.get(path, raw)) is not None:
+        if isinstance(data, dict) and isinstance(data.get('Header'), dict) and data['Header'].get('Type') == db_type:
+            if progress: progress(1.0)
+            return (data, raw) if with_raw else data
+    data = yaml.load(_ProgressReader(io.BytesIO(raw), len(raw), progress), Loader=SafeLoader)
+    if not isinstance(data, dict):
+        raise DBLoadError("Invalid YAML file: Does not contain a valid structure.")
+    if not isinstance(data.get('Header'), dict) or data['Header'].get('Type') != db_type:
+        raise DBLoadError(f"This does not appear to be a valid {db_type} YAML file.")
+    if data.get('Body') is None: data['Body'] = []
+    if cache is not None: cache.put(path, data, raw)
+    return (data, raw) if with_raw else data
+
+class AsyncTask:
+    # Runs work(progress) on a worker thread and calls on_done(*result) / on_error(e) back on the Tk thread.
+    POLL_MS = 50
+
+    def __init__(self, widget, work, on_done, on_error, on_progress=None):
+        self.widget, self.on_done, self.on_error, self.on_progress = widget, on_done, on_error, on_progress
+        self.events = queue.Queue()
+        self.thread = threading.Thread(target=self._run, args=(work,), daemon=True)
+        self.thread.start()
+        self.widget.after(self.POLL_MS, self._poll)
+
+    def _run(self, work):
+        last = [-1]
+        def progress(fraction):
+            pct = int(fraction * 100)
+            if pct != last[0]: last[0] = pct; self.events.put(('progress', fraction))
+        try: self.events.put(('done', work(progress)))
+        except Exception as e: self.events.put(('error', e))
+
+    def _poll(self):
+        progress = None
+        try:
+            while True:
+                kind, payload = self.events.get_nowait()
+                if kind == 'progress': progress = payload; continue
+                if kind == 'done': self.on_done(*payload)
+                else: self.on_error(payload)
+                return
+        except queue.Empty: pass
+        if progress is not None and self.on_progress: self.on_progress(progress)
+        self.widget.after(self.POLL_MS, self._poll)
+
+class AsyncLoad(AsyncTask):
+    def __init__(self, widget, path, db_type, on_done, on_error, on_progress=None, cache=None, prepare=None):
+        self.cache, self.prepare = cache, prepare
+        super().__init__(widget, lambda progress: self._load(path, db_type, progress), on_done, on_error, on_progress)
+
+    def _load(self, path, db_type, progress):
+        data, raw = load_db(path, db_type, progress, self.cache, with_raw=True)
+        return data, (self.prepare(data, raw) if self.prepare else None)
@@ -0,0 +1,169 @@
+import hashlib
+import json
+import os
+import yaml
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+
+from db_loader import DBLoadError, SafeLoader, check_header, load_db
+from db_writer import scan_layout
+
+PARALLEL_BYTES = 4 * 1024 * 1024
+MISSING = object()
+
+def _plain(value): return dict(value.items()) if isinstance(value, Mapping) else str(value)
+
+def fingerprint(entry):
+    # Stable across processes and key order; two entries with the same fingerprint are equal.
+    text = json.dumps(entry, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=_plain)
+    return hashlib.blake2b(text.encode('utf-8'), digest_size=16).digest()
+
+def _parse_range(path, start, end):
+    # Process pool worker: parses and fingerprints the Body entries in bytes start:end of path.
+    with open(path, 'rb') as f: f.seek(start); chunk = f.read(end - start)
+    try: body = yaml.load(chunk, Loader=SafeLoader) or []
+    except yaml.YAMLError as e: raise DBLoadError(f"{os.path.basename(path)}: the entries at byte {start} could not be parsed: {e}")
+    return body, [fingerprint(e) for e in body]
+
+class Version:
+    # One version of a database for compare/merge: Body entries with their fingerprints, computed on first use.
+    def __init__(self, header, body, fingerprints=None, path=None):
+        self.header, self.body, self.path = header, body, path
+        self._fingerprints = fingerprints
+        self._by_id = None
+
+    def fingerprints(self):
+        if self._fingerprints is None: self._fingerprints = [fingerprint(e) for e in self.body]
+        return self._fingerprints
+
+    def by_id(self):
+        # Id -> (entry, fingerprint); with duplicate Ids the last one wins, as on the server.
+        if self._by_id is None: self._by_id = {e.get('Id'): (e, fp) for e, fp in zip(self.body, self.fingerprints())}
+        return self._by_id
+
+def load_versions(paths, schema, cache=None, workers=None):
+    # Parses and fingerprints every file. Files above PARALLEL_BYTES are cut on entry boundaries and the pieces of all
+    # of them are parsed together across processes; smaller ones (or cached ones) are loaded here.
+    workers = workers or os.cpu_count() or 1
+    plans, jobs = [], []
+    for path in paths:
+        check_header(path, schema.db_type)
+        layout = None
+        if workers > 1 and os.path.getsize(path) > PARALLEL_BYTES and (cache is None or cache.get(path) is None):
+            with open(path, 'rb') as f: raw = f.read()
+            layout = scan_layout(raw)
+        if layout is None:
+            data = load_db(path, schema.db_type, cache=cache)
+            plans.append(Version(data['Header'], data['Body'], path=path)); continue
+        starts, suffix_start = layout[0], layout[1]
+        try: header = (yaml.load(raw[:starts[0]], Loader=SafeLoader) or {}).get('Header')
+        except yaml.YAMLError as e: raise DBLoadError(f"{os.path.basename(path)}: the Header could not be parsed: {e}")
+        bounds, step = starts + [suffix_start], -(-len(starts) // workers)
+        ranges = [(bounds[i], bounds[min(i + step, len(starts))]) for i in range(0, len(starts), step)]
+        plans.append((header, path, len(jobs), len(ranges))); jobs.extend((path, s, e) for s, e in ranges)
+    if jobs:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool: results = list(pool.map(_parse_range, *zip(*jobs)))
+    versions = []
+    for plan in plans:
+        if isinstance(plan, Version): versions.append(plan); continue
+        header, path, first, count = plan
+        body, fps = [], []
+        for part, part_fps in results[first:first + count]: body.extend(part); fps.extend(part_fps)
+        versions.append(Version(header, body, fps, path))
+    return versions
+
+def _merge_fields(base, ours, theirs, prefix=''):
+    # Field by field, one level into dict fields (Jobs, Flags, Modes): returns (merged entry, conflicting paths).
+    merged, conflicts = {}, []
+    for key in list(ours) + [k for k in theirs if k not in ours]:
+        b, o, t = base.get(key, MISSING), ours.get(key, MISSING), theirs.get(key, MISSING)
+        if o == t or b == t: value = o
+        elif b == o: value = t
+        elif not prefix and isinstance(o, Mapping) and isinstance(t, Mapping) and (b is MISSING or isinstance(b, Mapping)):
+            value, sub = _merge_fields(b if b is not MISSING else {}, o, t, f"{key}."); conflicts += sub
+        else: value = o; conflicts.append(prefix + str(key))
+        if value is not MISSING: merged[key] = value
+    return merged, conflicts
+
+def get_field(entry, path):
+    value = entry
+    for part in path.split('.'):
+        if not isinstance(value, Mapping) or part not in value: return MISSING
+        value = value[part]
+    return value
+
+def field_changes(old, new):
+    # Dotted paths whose value differs between two versions of one entry; dict fields are compared key by key.
+    paths = []
+    for key in list(old) + [k for k in new if k not in old]:
+        a, b = old.get(key, MISSING), new.get(key, MISSING)
+        if a == b: continue
+        if isinstance(a, Mapping) and isinstance(b, Mapping): paths.extend(f"{key}.{k}" for k in list(a) + [k for k in b if k not in a] if a.get(k, MISSING) != b.get(k, MISSING))
+        else: paths.append(str(key))
+    return paths
+
+class Conflict:
+    # kind 'fields': both sides changed paths differently, and the merged entry holds ours for them.
+    # kind 'deleted_theirs': changed here, deleted there; the entry stays. kind 'deleted_ours': deleted here, changed
+    # there; their version is put back so it can be looked at, and keeping ours deletes it again.
+    def __init__(self, key, kind, base, ours, theirs, paths=()):
+        self.key, self.kind, self.base, self.ours, self.theirs, self.paths = key, kind, base, ours, theirs, list(paths)
+
+    def describe(self):
+        if self.kind == 'deleted_theirs': return "Changed here, deleted in theirs."
+        if self.kind == 'deleted_ours': return "Deleted here, changed in theirs."
+        show = lambda entry, path: "-" if entry is None or (v := get_field(entry, path)) is MISSING else repr(v)
+        return "\n".join(f"{p}: base {show(self.base, p)}, ours {show(self.ours, p)}, theirs {show(self.theirs, p)}" for p in self.paths)
+
+    def resolve(self, side, current):
+        # The entry that replaces current ('ours' or 'theirs'); None deletes it.
+        if self.kind == 'deleted_theirs': return current if side == 'ours' else None
+        if self.kind == 'deleted_ours': return None if side == 'ours' else current
+        if side == 'ours': return current
+        new = dict(current)
+        for path in self.paths:
+            value, (field, _, key) = get_field(self.theirs, path), path.partition('.')
+            if not key:
+                if value is MISSING: new.pop(field, None)
+                else: new[field] = value
+                continue
+            sub = dict(new.get(field) or {})
+            if value is MISSING: sub.pop(key, None)
+            else: sub[key] = value
+            new[field] = sub
+        return new
+
+class MergeResult:
+    # pairs: (old, new) steps that turn ours into the merge, in the editors' _apply_pairs form.
+    # conflicts: Id -> Conflict. taken: entries that came from theirs; compared: entries merged field by field.
+    def __init__(self, pairs, conflicts, taken, compared):
+        self.pairs, self.conflicts, self.taken, self.compared = pairs, conflicts, taken, compared
+
+def merge3(base, ours, theirs):
+    # Three-way merge by Id. Entries whose fingerprints show that at most one side changed them are settled without
+    # looking inside; only entries changed on both sides are merged field by field. An empty base compares two files:
+    # entries only in theirs are added and entries in both that differ are conflicts.
+    b, o, t = base.by_id(), ours.by_id(), theirs.by_id()
+    pairs, conflicts, taken, compared = [], {}, 0, 0
+    for key in list(t) + [k for k in o if k not in t]:
+        (be, bf), (oe, of), (te, tf) = b.get(key, (None, None)), o.get(key, (None, None)), t.get(key, (None, None))
+        if of == tf or bf == tf: continue
+        if bf == of: pairs.append((oe, te)); taken += 1; continue
+        if oe is None: pairs.append((None, te)); conflicts[key] = Conflict(key, 'deleted_ours', be, None, te); continue
+        if te is None: conflicts[key] = Conflict(key, 'deleted_theirs', be, oe, None); continue
+        compared += 1
+        merged, paths = _merge_fields(be or {}, oe, te)
+        if merged != oe: pairs.append((oe, merged))
+        if paths: conflicts[key] = Conflict(key, 'fields', be, oe, te, paths)
+        elif merged != oe: taken += 1
+    return MergeResult(pairs, conflicts, taken, compared)
+
+def diff_versions(old, new):
+    # [(Id, old entry or None, new entry or None, changed paths)] in the order of new, removed entries last.
+    a, b = old.by_id(), new.by_id()
+    changes = []
+    for key in list(b) + [k for k in a if k not in b]:
+        (oe, of), (ne, nf) = a.get(key, (None, None)), b.get(key, (None, None))
+        if of == nf: continue
+        changes.append((key, oe, ne, field_changes(oe, ne) if oe is not None and ne is not None else []))
+    return changes
@@ -0,0 +1,135 @@
+import copy
+import os
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from db_core import Database
+from db_loader import DBLoadError, load_db, read_footer
+from db_writer import FileImage
+from key_index import PrimaryKeyIndex
+from parse_cache import ParseCache
+from record_store import compact_entries
+
+MODES = ('Renewal', 'Prerenewal')
+
+def resolve_import(import_path, from_file, root=None):
+    # Import paths are relative to the rAthena root (db/re/item_db_equip.yml); without a known root
+    # the first ancestor of the importing file that contains the path is used.
+    if os.path.isabs(import_path): return import_path if os.path.isfile(import_path) else None
+    if root is not None:
+        path = os.path.join(root, import_path)
+        return path if os.path.isfile(path) else None
+    directory = os.path.dirname(os.path.abspath(from_file))
+    while True:
+        if os.path.isfile(path := os.path.join(directory, import_path)): return path
+        if (parent := os.path.dirname(directory)) == directory: return None
+        directory = parent
+
+def import_chain(path, mode='Renewal', root=None):
+    # rAthena load order: a file's own Body first, then each Footer import depth first; later files override earlier ones.
+    order, missing, seen = [], [], set()
+    def visit(p):
+        key = os.path.normcase(os.path.abspath(p))
+        if key in seen: return
+        seen.add(key); order.append(p)
+        for imp in (read_footer(p) or {}).get('Imports') or ():
+            if not isinstance(imp, dict) or not imp.get('Path'): continue
+            if imp.get('Mode') and imp['Mode'] != mode: continue
+            if (target := resolve_import(str(imp['Path']), p, root)) is None: missing.append(str(imp['Path']))
+            else: visit(target)
+    visit(path)
+    return order, missing
+
+def _parse_file(path, db_type, cache_dir):
+    # Process pool worker: returns (data, raw) so the parent can scan the file layout for incremental saves.
+    return load_db(path, db_type, cache=ParseCache(cache_dir) if cache_dir else None, with_raw=True)
+
+class Project:
+    # Merged view of an import chain. Each merged entry remembers the per-file entries it was built from
+    # (lowest precedence first) so changes are written back to the file that defines the entry last.
+    def __init__(self, path, schema, files, mode='Renewal', missing=()):
+        self.path, self.schema, self.files, self.mode, self.missing = path, schema, files, mode, list(missing)
+        self.header = files[0].header
+        self.layers, self.body = {}, []
+        slots = {}
+        for db in files:
+            for entry in db.body:
+                if (slot := slots.get(entry.get('Id'))) is None:
+                    slots[entry.get('Id')] = len(self.body); self.body.append(entry); self.layers[id(entry)] = (entry, [(db, entry)])
+                    continue
+                # Field-level override: an import only replaces the top-level fields it lists, as the server does.
+                merged, layers = self.layers.pop(id(self.body[slot]))
+                new = dict(merged); new.update(entry)
+                self.body[slot] = new; self.layers[id(new)] = (new, layers + [(db, entry)])
+        self.keys = PrimaryKeyIndex(self.body)
+
+    @classmethod
+    def open(cls, path, schema, mode='Renewal', root=None, cache=None, workers=None, compact=False, progress=None):
+        if mode not in MODES: raise DBLoadError(f"Unknown mode {mode!r}.")
+        paths, missing = import_chain(path, mode, root)
+        results, cache_dir = {}, cache.cache_dir if cache is not None else None
+        if len(paths) == 1: results[paths[0]] = load_db(paths[0], schema.db_type, cache=cache, with_raw=True)
+        else:
+            with ProcessPoolExecutor(max_workers=workers or min(len(paths), os.cpu_count() or 1)) as pool:
+                futures = {pool.submit(_parse_file, p, schema.db_type, cache_dir): p for p in paths}
+                for done, future in enumerate(as_completed(futures), 1):
+                    results[futures[future]] = future.result()
+                    if progress: progress(done / len(paths))
+        files = []
+        for p in paths:
+            data, raw = results[p]
+            body = compact_entries(schema, data['Body']) if compact else data['Body']
+            files.append(Database(p, schema, data['Header'], body, FileImage.scan(raw, body), cache))
+        return cls(path, schema, files, mode, missing)
+
+    def __len__(self): return len(self.body)
+
+    def source_of(self, entry):
+        layers = self.layers.get(id(entry))
+        return layers[1][-1][0].path if layers else None
+
+    def _position(self, db, entry):
+        return next(i for i, e in enumerate(db.body) if e is entry)
+
+    def _cleared(self, key, value):
+        # What the server uses for an absent field: the schema default, or an empty value of the same kind.
+        if (default := self.schema.template.get(key)) is not None: return copy.deepcopy(default)
+        if isinstance(value, Mapping): return {}
+        if isinstance(value, list): return []
+        return '' if isinstance(value, str) else None
+
+    def _write_back(self, layers, new):
+        db, entry = layers[-1]
+        if len(layers) == 1: written = new
+        else:
+            # Override files keep only what differs from the layers underneath them.
+            below = {}
+            for _, e in layers[:-1]: below.update(e)
+            written = {k: v for k, v in new.items() if k == 'Id' or k not in below or below[k] != v}
+            # Imports cannot delete a field from the files below, so a removed field is overridden with its cleared value.
+            for k, v in below.items():
+                if k not in new and (cleared := self._cleared(k, v)) != v: written[k] = cleared
+        db.replace(self._position(db, entry), written)
+        return layers[:-1] + [(db, written)], db
+
+    def save(self, body=None):
+        # Reconciles the (possibly edited) merged body with the files and saves those that changed; returns their paths.
+        body = self.body if body is None else body
+        current = {id(e) for e in body}
+        removed = {m.get('Id'): (m, layers) for key, (m, layers) in self.layers.items() if key not in current}
+        dirty, layers_by_key = [], {}
+        for entry in body:
+            if (known := self.layers.get(id(entry))) is not None: layers_by_key[id(entry)] = known; continue
+            if (old := removed.pop(entry.get('Id'), None)) is not None: layers, db = self._write_back(old[1], entry)
+            else:
+                db = self.files[-1]; db.add(entry); layers = [(db, entry)]
+            layers_by_key[id(entry)] = (entry, layers)
+            if db not in dirty: dirty.append(db)
+        for merged, layers in removed.values():
+            for db, entry in layers:
+                db.remove(self._position(db, entry))
+                if db not in dirty: dirty.append(db)
+        for db in dirty: db.save()
+        self.layers, self.body = layers_by_key, body
+        self.keys = PrimaryKeyIndex(body)
+        return [db.path for db in dirty]
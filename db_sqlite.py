@@ -0,0 +1,405 @@
+import functools
+import json
+import re
+import sqlite3
+from collections import OrderedDict
+from collections.abc import Mapping
+
+from db_core import parse_query, parse_value
+from key_index import DuplicateKeyError
+from search_index import _WORD, _term_at
+
+BATCH = 5000
+PAGE = 200
+ROW_CACHE = 4096
+TABLES = {'ITEM_DB': 'item_db_re', 'MOB_DB': 'mob_db_re'}
+HEADER_VERSIONS = {'ITEM_DB': 3, 'MOB_DB': 4}
+EXTENSIONS = ('.db', '.sqlite', '.sqlite3')
+INDEXED = {'ITEM_DB': ('name_aegis', 'type', 'subtype'), 'MOB_DB': ('name_aegis', 'level', 'race', 'element', 'class')}
+
+# rAthena's item_db/mob_db SQL layout: scalar fields become snake_case columns, flag dicts become <prefix>_<key>
+# columns (job_swordman, mode_mvp) and drop lists become numbered slots (drop1_item, drop1_rate, ...).
+RENAMED = {'Id': 'id', 'AegisName': 'name_aegis', 'Name': 'name_english', 'JapaneseName': 'name_japanese', 'Buy': 'price_buy',
+           'Sell': 'price_sell', 'SubType': 'subtype', 'UnEquipScript': 'unequip_script', 'GroupId': 'groupid'}
+DICT_PREFIXES = {'Jobs': 'job', 'Classes': 'class', 'Locations': 'location', 'Flags': 'flag', 'Delay': 'delay', 'Stack': 'stack',
+                 'NoUse': 'nouse', 'Trade': 'trade', 'RaceGroups': 'racegroup', 'Modes': 'mode'}
+LIST_PREFIXES = {'Drops': ('drop', 10), 'MvpDrops': ('mvpdrop', 3)}
+LIST_KEYS = {'Item': 'item', 'Rate': 'rate', 'StealProtected': 'nosteal', 'RandomOptionGroup': 'option', 'Index': 'index'}
+# Key spelling and value kind for files exported by other tools, which carry no ryde_columns table; flags are bool.
+KNOWN_KEYS = {
+    'Jobs': 'All Acolyte Alchemist Archer Assassin BardDancer Blacksmith Crusader Gunslinger Hunter KagerouOboro Knight Mage Merchant Monk '
+            'Ninja Novice Priest Rebellion Rogue Sage SoulLinker StarGladiator Summoner SuperNovice Swordman Taekwon Thief Wizard',
+    'Classes': 'All Normal Upper Baby Third Third_Upper Third_Baby Fourth All_Upper All_Baby All_Third',
+    'Locations': 'Head_Top Head_Mid Head_Low Armor Right_Hand Left_Hand Garment Shoes Right_Accessory Left_Accessory Costume_Head_Top '
+                 'Costume_Head_Mid Costume_Head_Low Costume_Garment Ammo Shadow_Armor Shadow_Weapon Shadow_Shield Shadow_Shoes '
+                 'Shadow_Right_Accessory Shadow_Left_Accessory Both_Hand Both_Accessory',
+    'Flags': 'BuyingStore DeadBranch Container UniqueId BindOnEquip DropAnnounce NoConsume DropEffect',
+    'Delay': 'Duration Status', 'Stack': 'Amount Inventory Cart Storage GuildStorage', 'NoUse': 'Override Sitting',
+    'Trade': 'Override NoDrop NoTrade TradePartner NoSell NoCart NoStorage NoGuildStorage NoMail NoAuction',
+    'Modes': 'CanMove Looter Aggressive Assist CastSensorIdle NoRandomWalk NoCast CanAttack CastSensorChase ChangeChase Angry '
+             'ChangeTargetMelee ChangeTargetChase TargetWeak RandomTarget IgnoreMelee IgnoreMagic IgnoreRanged Mvp IgnoreMisc '
+             'KnockBackImmune TeleportBlock FixedItemDrop Detector StatusImmune SkillImmune',
+}
+KNOWN_KINDS = {('Flags', 'DropEffect'): 'str', ('Delay', 'Duration'): 'int', ('Delay', 'Status'): 'str', ('Stack', 'Amount'): 'int',
+               ('NoUse', 'Override'): 'int', ('Trade', 'Override'): 'int', ('Drops', 'Item'): 'str', ('Drops', 'Rate'): 'int',
+               ('Drops', 'StealProtected'): 'bool', ('Drops', 'RandomOptionGroup'): 'str', ('Drops', 'Index'): 'int'}
+_CAMEL = re.compile(r'(?<=[a-z0-9])(?=[A-Z])')
+_TEXT_FIELDS = {'ITEM_DB': ('Script', 'EquipScript', 'UnEquipScript'), 'MOB_DB': ()}
+
+def _quote(name): return '"' + name.replace('"', '""') + '"'
+
+def _like(text): return '%' + re.sub(r'([%_\\])', r'\\\1', text) + '%'
+
+def field_column(field): return RENAMED.get(field) or _CAMEL.sub('_', field).lower()
+
+def _kind(value):
+    if isinstance(value, bool): return 'bool'
+    if isinstance(value, int): return 'int'
+    if isinstance(value, float): return 'real'
+    if isinstance(value, str): return 'str'
+    return 'json'
+
+# str columns get no affinity: fields such as WalkSpeed hold a name in one entry and a number in the next.
+_AFFINITY = {'bool': 'INTEGER', 'int': 'INTEGER', 'real': 'REAL', 'str': '', 'json': 'TEXT'}
+
+class ColumnMap:
+    # column -> (field, key, slot, kind): key is None for scalar fields, slot is None unless the field is a drop list.
+    def __init__(self, schema, columns=None):
+        self.schema = schema
+        self.columns = OrderedDict(columns or ())
+        self.by_target = {(f, k, s): c for c, (f, k, s, _) in self.columns.items()}
+        for field, value in schema.template.items():
+            if field not in DICT_PREFIXES and field not in LIST_PREFIXES: self._add(field, None, None, _kind(value) if value is not None else 'str')
+
+    def _add(self, field, key, slot, kind):
+        if (field, key, slot) in self.by_target: return self.by_target[field, key, slot]
+        if slot is not None: column = f"{LIST_PREFIXES[field][0]}{slot}_{LIST_KEYS.get(key, key.lower())}"
+        elif key is not None: column = f"{DICT_PREFIXES.get(field, field_column(field))}_{key.lower()}"
+        else: column = field_column(field)
+        while column in self.columns: column += '_'
+        self.columns[column] = (field, key, slot, kind); self.by_target[field, key, slot] = column
+        return column
+
+    def learn(self, entry):
+        # Adds columns for any field, flag or drop slot this entry uses that the table does not have yet.
+        for field, value in entry.items():
+            if field in LIST_PREFIXES and isinstance(value, list):
+                for slot, drop in enumerate(value, 1):
+                    if isinstance(drop, Mapping):
+                        for k, v in drop.items(): self._add(field, k, slot, KNOWN_KINDS.get(('Drops', k)) or _kind(v))
+            elif isinstance(value, Mapping) and (field in DICT_PREFIXES or not isinstance(self.schema.template.get(field), (str, int))):
+                for k, v in value.items(): self._add(field, k, None, KNOWN_KINDS.get((field, k)) or _kind(v))
+            elif (field, None, None) not in self.by_target: self._add(field, None, None, _kind(value))
+
+    def flatten(self, entry):
+        row = {}
+        for field, value in entry.items():
+            if field in LIST_PREFIXES and isinstance(value, list):
+                for slot, drop in enumerate(value, 1):
+                    for k, v in (drop.items() if isinstance(drop, Mapping) else ()): row[self.by_target[field, k, slot]] = _encode(v)
+            elif (field, None, None) not in self.by_target and isinstance(value, Mapping):
+                for k, v in value.items(): row[self.by_target[field, k, None]] = _encode(v)
+            else: row[self.by_target[field, None, None]] = _encode(value)
+        return row
+
+    def unflatten(self, names, values):
+        # Builds an entry from a row; NULL columns are absent keys, and fields come out in template order.
+        entry, lists = {}, {}
+        for name, value in zip(names, values):
+            if value is None or (target := self.columns.get(name)) is None: continue
+            field, key, slot, kind = target
+            value = _decode(value, kind)
+            if slot is not None: lists.setdefault(field, {}).setdefault(slot, {})[key] = value
+            elif key is not None: entry.setdefault(field, {})[key] = value
+            else: entry[field] = value
+        for field, slots in lists.items(): entry[field] = [slots[s] for s in sorted(slots)]
+        order = {f: i for i, f in enumerate(self.schema.template)}
+        return dict(sorted(entry.items(), key=lambda kv: order.get(kv[0], len(order))))
+
+    @classmethod
+    def guess(cls, schema, names):
+        # Reads a table written by another tool: known rAthena columns map back exactly, the rest by spelling.
+        cmap = cls(schema)
+        known = {(DICT_PREFIXES[f] + '_' + k.lower()): (f, k) for f, keys in KNOWN_KEYS.items() for k in keys.split()}
+        list_keys = {v: k for k, v in LIST_KEYS.items()}
+        for name in names:
+            if name in cmap.columns: continue
+            if (m := re.fullmatch(r'(mvpdrop|drop)(\d+)_(\w+)', name)):
+                field = 'MvpDrops' if m.group(1) == 'mvpdrop' else 'Drops'
+                key = list_keys.get(m.group(3), m.group(3).title())
+                cmap.columns[name] = (field, key, int(m.group(2)), KNOWN_KINDS.get(('Drops', key), 'str'))
+            elif name in known:
+                field, key = known[name]
+                cmap.columns[name] = (field, key, None, KNOWN_KINDS.get((field, key), 'bool'))
+            elif (prefix := next((p for p in DICT_PREFIXES.items() if name.startswith(p[1] + '_')), None)) is not None:
+                key = '_'.join(part.title() for part in name[len(prefix[1]) + 1:].split('_'))
+                cmap.columns[name] = (prefix[0], key, None, 'bool')
+            else: cmap.columns[name] = (''.join(p.title() for p in name.split('_')), None, None, 'str')
+        cmap.columns = OrderedDict((name, cmap.columns[name]) for name in names)
+        cmap.by_target = {(f, k, s): c for c, (f, k, s, _) in cmap.columns.items()}
+        return cmap
+
+def _encode(value):
+    if isinstance(value, bool): return int(value)
+    if isinstance(value, (int, float, str)) or value is None: return value
+    return json.dumps(value, default=lambda v: dict(v) if isinstance(v, Mapping) else str(v))
+
+def _decode(value, kind):
+    if kind == 'bool': return bool(value)
+    if kind == 'json' and isinstance(value, str):
+        try: return json.loads(value)
+        except ValueError: return value
+    if kind == 'int' and isinstance(value, str) and re.fullmatch(r'-?\d+', value): return int(value)
+    return value
+
+def _column_map(con, schema, table):
+    # Our own exports record the exact mapping in ryde_columns; anything else is guessed from the column names.
+    names = [r[1] for r in con.execute(f"PRAGMA table_info({_quote(table)})")]
+    if not names: return None, names
+    try: rows = con.execute("SELECT col, field, key, slot, kind FROM ryde_columns WHERE tbl = ? ORDER BY pos", (table,)).fetchall()
+    except sqlite3.OperationalError: rows = []
+    if rows:
+        cmap = ColumnMap(schema, ((c, (f, k, s, kind)) for c, f, k, s, kind in rows))
+        for name in names:
+            if name not in cmap.columns: cmap.columns.update(ColumnMap.guess(schema, [name]).columns)
+        cmap.by_target = {(f, k, s): c for c, (f, k, s, _) in cmap.columns.items()}
+        return cmap, names
+    return ColumnMap.guess(schema, names), names
+
+def _prepare_table(con, schema, table, cmap, names):
+    if not names:
+        cols = [f"{_quote(c)} {_AFFINITY[kind]}".rstrip() + (" PRIMARY KEY" if c == 'id' else "") for c, (_, _, _, kind) in cmap.columns.items()]
+        con.execute(f"CREATE TABLE {_quote(table)} ({', '.join(cols)})")
+    else:
+        for c, (_, _, _, kind) in cmap.columns.items():
+            if c not in names: con.execute(f"ALTER TABLE {_quote(table)} ADD COLUMN {_quote(c)} {_AFFINITY[kind]}".rstrip())
+    for c in INDEXED.get(schema.db_type, ()):
+        if c in cmap.columns: con.execute(f"CREATE INDEX IF NOT EXISTS {_quote(f'{table}_{c}')} ON {_quote(table)} ({_quote(c)} COLLATE NOCASE)")
+    con.execute("CREATE TABLE IF NOT EXISTS ryde_columns (tbl TEXT, pos INTEGER, col TEXT, field TEXT, key TEXT, slot INTEGER, kind TEXT)")
+    con.execute("DELETE FROM ryde_columns WHERE tbl = ?", (table,))
+    con.executemany("INSERT INTO ryde_columns VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    [(table, i, c, f, k, s, kind) for i, (c, (f, k, s, kind)) in enumerate(cmap.columns.items())])
+
+def _write_header(con, table, header):
+    con.execute("CREATE TABLE IF NOT EXISTS ryde_headers (tbl TEXT PRIMARY KEY, header TEXT)")
+    con.execute("INSERT OR REPLACE INTO ryde_headers VALUES (?, ?)", (table, json.dumps(dict(header))))
+
+def _read_header(con, schema, table):
+    # The YAML Header the table was exported from; tables from other tools get the current rAthena one.
+    try: row = con.execute("SELECT header FROM ryde_headers WHERE tbl = ?", (table,)).fetchone()
+    except sqlite3.OperationalError: row = None
+    return json.loads(row[0]) if row else {'Type': schema.db_type, 'Version': HEADER_VERSIONS[schema.db_type]}
+
+def _read_rows(con, cmap, table, where='', params=(), progress=None):
+    total = con.execute(f"SELECT COUNT(*) FROM {_quote(table)}" + (f" WHERE {where}" if where else ""), params).fetchone()[0] if progress else 0
+    cursor = con.execute(f"SELECT * FROM {_quote(table)}" + (f" WHERE {where}" if where else "") + " ORDER BY id", params)
+    columns = [d[0] for d in cursor.description]
+    body = []
+    while (rows := cursor.fetchmany(BATCH)):
+        body.extend(cmap.unflatten(columns, row) for row in rows)
+        if progress: progress(len(body) / max(total, 1))
+    return body
+
+def export_sqlite(db_path, schema, body, table=None, header=None, replace=True, progress=None):
+    # Writes body into table in one transaction with batched executemany; an existing table gains any columns it
+    # lacks. replace=False keeps the rows already there (several item_db files into one item_db_re). Rows with the
+    # same Id overwrite each other, the way later entries win in rAthena. Returns the number of rows written.
+    table = table or TABLES[schema.db_type]
+    con = sqlite3.connect(db_path)
+    try:
+        with con:
+            cmap, names = _column_map(con, schema, table)
+            cmap = cmap or ColumnMap(schema)
+            for entry in body: cmap.learn(entry)
+            _prepare_table(con, schema, table, cmap, names)
+            if header is not None: _write_header(con, table, header)
+            if replace: con.execute(f"DELETE FROM {_quote(table)}")
+            columns = list(cmap.columns)
+            sql = f"INSERT OR REPLACE INTO {_quote(table)} ({', '.join(map(_quote, columns))}) VALUES ({', '.join('?' * len(columns))})"
+            for start in range(0, len(body), BATCH):
+                rows = [cmap.flatten(e) for e in body[start:start + BATCH]]
+                con.executemany(sql, [tuple(r.get(c) for c in columns) for r in rows])
+                if progress: progress(min((start + BATCH) / len(body), 1.0))
+    finally: con.close()
+    return len(body)
+
+def import_sqlite(db_path, schema, table=None, where='', params=(), progress=None):
+    # Reads table back as (Header, Body), the Body ordered by Id and fetched BATCH rows at a time.
+    table = table or TABLES[schema.db_type]
+    con = sqlite3.connect(db_path)
+    try:
+        cmap, _ = _column_map(con, schema, table)
+        if cmap is None: raise sqlite3.OperationalError(f"no such table: {table}")
+        return _read_header(con, schema, table), _read_rows(con, cmap, table, where, params, progress)
+    finally: con.close()
+
+class SqlTable:
+    # Editing mode backed by a SQLite table. The editor holds only the Ids of the current view; list rows are
+    # fetched a page at a time, whole entries one at a time, and every change is committed as it is made.
+    def __init__(self, path, schema, table=None):
+        self.path, self.schema, self.table = path, schema, table or TABLES[schema.db_type]
+        self.con = sqlite3.connect(path)
+        self.cmap, names = _column_map(self.con, schema, self.table)
+        if self.cmap is None: self.con.close(); raise sqlite3.OperationalError(f"no such table: {self.table}")
+        self.view, self.positions, self.rows = [], {}, OrderedDict()
+        self.list_columns = ('id', 'name_aegis')
+        self.text_columns = [self.cmap.by_target[f, None, None] for f in _TEXT_FIELDS[schema.db_type] if (f, None, None) in self.cmap.by_target]
+        if self.text_columns: self.con.create_function('ryde_text', len(self.text_columns) + 1, _text_match, deterministic=True)
+
+    def close(self): self.con.close()
+
+    def header(self): return _read_header(self.con, self.schema, self.table)
+
+    def body(self, progress=None): return _read_rows(self.con, self.cmap, self.table, progress=progress)
+
+    def __len__(self): return self.con.execute(f"SELECT COUNT(*) FROM {_quote(self.table)}").fetchone()[0]
+
+    def column(self, field): return self.cmap.by_target.get((field, None, None))
+
+    def show(self, field):
+        # The field shown in the list's third column, when it has a column of its own (dict and list fields do not).
+        self.list_columns = ('id', 'name_aegis') + ((column,) if (column := self.column(field)) is not None else ())
+        self.rows.clear()
+
+    def ids(self, where='', params=(), order=(('id', False),)):
+        # Ids of the rows matching where, ordered by [(column, reverse), ...]; becomes the view rows are paged from.
+        terms = [f"{_quote(c)}{'' if c == 'id' else ' COLLATE NOCASE'}{' DESC' if r else ''}" for c, r in order]
+        if 'id' not in (c for c, _ in order): terms.append('id')
+        sql = f"SELECT id FROM {_quote(self.table)}" + (f" WHERE {where}" if where else "") + f" ORDER BY {', '.join(terms)}"
+        self.view = [r[0] for r in self.con.execute(sql, params)]
+        self.positions = {k: i for i, k in enumerate(self.view)}
+        return self.view
+
+    def row(self, entry_id):
+        # List values for one row; a miss fetches the page of the view around it in one query.
+        if (values := self.rows.get(entry_id)) is not None: return values
+        pos = self.positions.get(entry_id, 0)
+        page = self.view[max(pos - PAGE // 4, 0):pos + PAGE] or [entry_id]
+        if entry_id not in page: page = [entry_id]
+        cols = ', '.join(map(_quote, self.list_columns))
+        for start in range(0, len(page), 500):
+            chunk = page[start:start + 500]
+            for values in self.con.execute(f"SELECT {cols} FROM {_quote(self.table)} WHERE id IN ({', '.join('?' * len(chunk))})", chunk):
+                self.rows[values[0]] = tuple('' if v is None else v for v in values)
+        while len(self.rows) > ROW_CACHE: self.rows.popitem(last=False)
+        return self.rows.get(entry_id, (entry_id,) + ('',) * (len(self.list_columns) - 1))
+
+    def get(self, entry_id):
+        cursor = self.con.execute(f"SELECT * FROM {_quote(self.table)} WHERE id = ?", (entry_id,))
+        if (row := cursor.fetchone()) is None: return None
+        return self.cmap.unflatten([d[0] for d in cursor.description], row)
+
+    def get_by_name(self, name):
+        row = self.con.execute(f"SELECT id FROM {_quote(self.table)} WHERE name_aegis = ? COLLATE NOCASE", (name,)).fetchone()
+        return row[0] if row else None
+
+    def first_gap(self, start=1):
+        # Smallest unused Id >= start, like PrimaryKeyIndex.first_gap.
+        table = _quote(self.table)
+        if self.con.execute(f"SELECT 1 FROM {table} WHERE id = ?", (start,)).fetchone() is None: return start
+        return self.con.execute(f"SELECT MIN(a.id) + 1 FROM {table} a WHERE a.id >= ? AND NOT EXISTS "
+                                f"(SELECT 1 FROM {table} b WHERE b.id = a.id + 1)", (start,)).fetchone()[0]
+
+    def put(self, old_id, entry):
+        # Inserts (old_id None) or replaces a row; raises DuplicateKeyError like PrimaryKeyIndex on a taken Id or AegisName.
+        entry_id, name = entry.get('Id'), entry.get('AegisName')
+        if entry_id != old_id and self.con.execute(f"SELECT 1 FROM {_quote(self.table)} WHERE id = ?", (entry_id,)).fetchone():
+            raise DuplicateKeyError(f"Id {entry_id} is already used.")
+        if name is not None and (other := self.get_by_name(name)) is not None and other != old_id:
+            raise DuplicateKeyError(f"AegisName '{name}' is already used by Id {other}.")
+        with self.con:
+            for _ in range(2):
+                before = len(self.cmap.columns); self.cmap.learn(entry)
+                if len(self.cmap.columns) == before: break
+                _, names = _column_map(self.con, self.schema, self.table)
+                _prepare_table(self.con, self.schema, self.table, self.cmap, names)
+            row = self.cmap.flatten(entry)
+            columns = list(self.cmap.columns)
+            if old_id is not None: self.con.execute(f"DELETE FROM {_quote(self.table)} WHERE id = ?", (old_id,))
+            self.con.execute(f"INSERT INTO {_quote(self.table)} ({', '.join(map(_quote, columns))}) VALUES ({', '.join('?' * len(columns))})",
+                             tuple(row.get(c) for c in columns))
+        self.rows.pop(old_id, None); self.rows.pop(entry_id, None)
+
+    def delete(self, entry_id):
+        with self.con: self.con.execute(f"DELETE FROM {_quote(self.table)} WHERE id = ?", (entry_id,))
+        self.rows.pop(entry_id, None)
+
+    def where_search(self, term):
+        # The plain search box: substring of Id or AegisName.
+        if not term: return '', ()
+        pattern = _like(term)
+        return "(CAST(id AS TEXT) LIKE ? ESCAPE '\\' OR name_aegis LIKE ? ESCAPE '\\')", (pattern, pattern)
+
+    def where_query(self, text):
+        # Structured queries (db_core.parse_query) as a WHERE clause over the flattened columns.
+        params = []
+        return self._sql(parse_query(text), params), tuple(params)
+
+    def _flag_test(self, field, name):
+        # Jobs=Swordman: the flag column is set, or the entry has no Jobs at all and the template's default sets it.
+        columns = [c for (f, k, s), c in self.cmap.by_target.items() if f == field and s is None and k is not None]
+        flag = next((c for c in columns if self.cmap.columns[c][1].lower() == name.lower()), None)
+        test = f"COALESCE({_quote(flag)}, 0) != 0" if flag else "0"
+        default = self.schema.template.get(field)
+        if isinstance(default, Mapping) and any(v and str(k).lower() == name.lower() for k, v in default.items()):
+            test = f"({test} OR COALESCE({', '.join(map(_quote, columns))}, NULL) IS NULL)"
+        return test
+
+    def _sql(self, node, params):
+        kind = node[0]
+        if kind == 'not': return f"NOT ({self._sql(node[1], params)})"
+        if kind in ('and', 'or'): return '(' + f' {kind.upper()} '.join(self._sql(n, params) for n in node[1]) + ')'
+        _, path, op, raw_value = node
+        value = parse_value(raw_value)
+        field, _, key = path.partition('.')
+        if not key and (field, None, None) not in self.cmap.by_target and (field in DICT_PREFIXES or any(f == field for f, k, s in self.cmap.by_target)):
+            if op in ('=', '!=') and isinstance(value, str):
+                test = self._flag_test(field, value)
+                return test if op == '=' else f"NOT ({test})"
+            return "0"
+        if not key: columns = [self.column(field)] if self.column(field) else []
+        else:
+            columns = [c for (f, k, s), c in self.cmap.by_target.items()
+                       if f == field and k is not None and k.lower() == key.lower() and (s is not None) == (field in LIST_PREFIXES)]
+        if not columns: return "1" if op == '!=' else "0"
+        if field in LIST_PREFIXES and op == '!=':
+            # Drops.Item!=Jellopy: no drop slot holds it.
+            return f"NOT ({self._sql(('cond', path, '=', raw_value), params)})"
+        default = self.schema.template.get(field) if not key and not isinstance(self.schema.template.get(field), (Mapping, list)) else None
+        tests = []
+        for column in columns:
+            expr = _quote(column) if default is None else "COALESCE(" + _quote(column) + ", ?)"
+            lead = [] if default is None else [_encode(default)]
+            if op == '~':
+                tests.append(f"COALESCE({expr}, '') LIKE ? ESCAPE '\\'"); params.extend(lead + [_like(raw_value)])
+            elif isinstance(value, bool):
+                if op not in ('=', '!='): tests.append("0"); continue
+                tests.append(f"(COALESCE({expr}, 0) != 0) {op} ?"); params.extend(lead + [int(value)])
+            else:
+                collate = " COLLATE NOCASE" if isinstance(value, str) else ""
+                # A missing value matches only != (value_matcher compares None and fails every other operator).
+                test = f"{expr} {op} ?{collate}"
+                if op == '!=' and default is None: test = f"({expr} IS NULL OR {test})"
+                tests.append(test); params.extend(lead + [value])
+        return '(' + ' OR '.join(tests) + ')'
+
+    def where_text(self, terms):
+        # Script search with token, phrase and prefix terms: LIKE narrows the rows inside SQLite, then the scripts of
+        # each candidate are matched word by word so the result is the same as search_index.TextIndex gives.
+        if not terms or not self.text_columns: return '', ()
+        clauses, params = [], []
+        for word in (w for kind, value in terms for w in (value if kind == 'phrase' else [value])):
+            clauses.append('(' + ' OR '.join(f"{_quote(c)} LIKE ? ESCAPE '\\'" for c in self.text_columns) + ')')
+            params.extend([_like(word)] * len(self.text_columns))
+        clauses.append(f"ryde_text(?, {', '.join(map(_quote, self.text_columns))})")
+        return ' AND '.join(clauses), tuple(params) + (json.dumps(terms),)
+
+@functools.lru_cache(maxsize=16)
+def _parse_terms(terms):
+    # SQLite calls ryde_text once per candidate row with the same JSON terms; they are decoded once per query.
+    return [(kind, value) for kind, value in json.loads(terms)]
+
+def _text_match(terms, *texts):
+    terms = _parse_terms(terms)
+    scripts = [[w.lower() for w in _WORD.findall(text)] for text in texts if isinstance(text, str)]
+    return all(any(_term_at(words, i, term) for words in scripts for i in range(len(words))) for term in terms)
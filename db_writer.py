@@ -0,0 +1,141 @@
+import os
+import re
+import tempfile
+import yaml
+from collections.abc import Mapping
+
+try: from yaml import CSafeDumper as _BaseDumper
+except ImportError: from yaml import SafeDumper as _BaseDumper
+
+class NoAliasDumper(_BaseDumper):
+    def ignore_aliases(self, data):
+        return True
+
+class EntryDumper(yaml.SafeDumper):
+    # Pure-Python emitter so nested sequences can be indented the way rAthena's own files are (Drops:\n  - Item: ...).
+    def ignore_aliases(self, data):
+        return True
+
+    def increase_indent(self, flow=False, indentless=False):
+        return super().increase_indent(flow, False)
+
+def _represent_str(dumper, data):
+    # Multi-line scripts are written as literal blocks (Script: |) like rAthena's own files, but only when the block
+    # loads back as the same string: trailing empty lines need a |+ block, which ends the document, and \r or the
+    # other YAML line breaks are not kept by a block. Anything else the block style cannot hold (blanks at line ends,
+    # control characters) the emitter itself writes quoted.
+    if '\n' not in data or data.endswith('\n\n') or data == '\n' or _BLOCK_UNSAFE.search(data): return dumper.represent_str(data)
+    return dumper.represent_scalar('tag:yaml.org,2002:str', data, style='|')
+
+_BLOCK_UNSAFE = re.compile('[\r\x85\u2028\u2029]')
+
+# Mapping views such as record_store.CompactRecord dump exactly like the dicts they stand in for.
+for _dumper in (NoAliasDumper, EntryDumper):
+    _dumper.add_multi_representer(Mapping, yaml.representer.SafeRepresenter.represent_dict)
+    _dumper.add_representer(str, _represent_str)
+
+_ENTRY_ID = re.compile(rb'-\s+Id:\s*(-?\d+)')
+_BODY_LINE = re.compile(rb'^Body:([^\n]*)$', re.M)
+_TOP_LEVEL_LINE = re.compile(rb'^[^ \t\r\n#-]', re.M)
+_ITEM_LINE = re.compile(rb'^( *)-(?= |[ \t\r\f\v]*$)', re.M)
+
+def scan_layout(raw):
+    # Regex pass over the Body block sequence: (entry start offsets, suffix start, entry indent, newline) or None.
+    # raw may be bytes or an mmap; nothing is decoded.
+    newline = '\r\n' if b'\r\n' in raw[:4096] else '\n'
+    n = len(raw)
+    if (m := _BODY_LINE.search(raw)) is None or m.group(1).strip(): return None
+    body_start = m.end() + 1 if m.end() < n else n
+    top = _TOP_LEVEL_LINE.search(raw, body_start)
+    body_end = top.start() if top else n
+    starts, indent = [], None
+    for item in _ITEM_LINE.finditer(raw, body_start, body_end):
+        if indent is None: indent = len(item.group(1))
+        if len(item.group(1)) == indent: starts.append(item.start())
+    if not starts: return None
+    last_content_end, line_end = None, body_end
+    while line_end > body_start:
+        line_start = max(raw.rfind(b'\n', body_start, line_end - 1) + 1, body_start)
+        stripped = raw[line_start:line_end].lstrip(b' ')
+        if stripped and stripped[:1] not in (b'#', b'\r', b'\n'): last_content_end = line_end; break
+        line_end = line_start
+    suffix_start = last_content_end if last_content_end is not None else (top.start() if top else n)
+    return starts, suffix_start, indent, newline
+
+def dump_full(header, body):
+    return yaml.dump({'Header': header, 'Body': body}, Dumper=NoAliasDumper, sort_keys=False, indent=2)
+
+def dump_entry(entry, indent=2, newline='\n'):
+    text = yaml.dump([entry], Dumper=EntryDumper, sort_keys=False, indent=2)
+    pad = ' ' * indent
+    lines = [pad + line if line else line for line in text.split('\n')]
+    return '\n'.join(lines).replace('\n', newline).encode('utf-8')
+
+class FileImage:
+    # Original bytes of a loaded file plus the byte span of every Body entry, keyed by id() of the entry.
+    def __init__(self, raw, prefix_end, suffix_start, spans, entries, indent, newline):
+        self.raw, self.prefix_end, self.suffix_start = raw, prefix_end, suffix_start
+        self.spans = {id(e): span for e, span in zip(entries, spans)}
+        self.entries = list(entries)
+        self.indent, self.newline = indent, newline
+        self.dirty = set()
+
+    @classmethod
+    def scan(cls, raw, body):
+        # Returns None when the Body layout is not the usual block sequence, callers then fall back to a full dump.
+        if (layout := scan_layout(raw)) is None: return None
+        starts, suffix_start, indent, newline = layout
+        if len(starts) != len(body): return None
+        bounds = starts + [suffix_start]
+        spans = [(bounds[i], bounds[i + 1]) for i in range(len(starts))]
+        for entry, (start, end) in zip(body, spans):
+            m = _ENTRY_ID.match(raw, start + indent)
+            if m is None or int(m.group(1)) != entry.get('Id'): return None
+        return cls(raw, starts[0], suffix_start, spans, body, indent, newline)
+
+    def mark_dirty(self, entry): self.dirty.add(id(entry))
+
+    def span_of(self, entry):
+        key = id(entry)
+        if key in self.dirty: return None
+        return self.spans.get(key)
+
+    def render(self, body):
+        parts, spans, pos = [self.raw[:self.prefix_end]], [], self.prefix_end
+        for entry in body:
+            span = self.span_of(entry)
+            chunk = self.raw[span[0]:span[1]] if span else dump_entry(entry, self.indent, self.newline)
+            if parts[-1] and not parts[-1].endswith(b'\n'): parts.append(self.newline.encode()); pos += len(self.newline)
+            parts.append(chunk); spans.append((pos, pos + len(chunk))); pos += len(chunk)
+        suffix = self.raw[self.suffix_start:]
+        if suffix and not parts[-1].endswith(b'\n'): parts.append(self.newline.encode()); pos += len(self.newline)
+        parts.append(suffix)
+        raw = b''.join(parts)
+        return raw, FileImage(raw, self.prefix_end, pos, spans, body, self.indent, self.newline)
+
+def write_atomic(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=directory)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data); f.flush(); os.fsync(f.fileno())
+        if os.path.exists(path):
+            try: os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+            except OSError: pass
+        os.replace(tmp_path, path)
+    except BaseException:
+        try: os.remove(tmp_path)
+        except OSError: pass
+        raise
+
+def save_db(path, header, body, image=None, before_write=None):
+    # Splices freshly dumped text for changed entries into the original file image; returns the new image.
+    # before_write(raw, new_image) lets a caller drop its mapping of the old file before it is replaced.
+    if image is not None and body:
+        raw, new_image = image.render(body)
+    else:
+        raw = dump_full(header, body).encode('utf-8')
+        new_image = FileImage.scan(raw, body)
+    if before_write is not None: before_write(raw, new_image)
+    write_atomic(path, raw)
+    return new_image
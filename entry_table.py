@@ -0,0 +1,111 @@
+from collections.abc import Mapping
+
+from db_core import get_path
+
+ORDER_CACHE = 8
+
+def sort_key(value):
+    # One order over the mixed values a field can hold: empty first, then numbers, text ignoring case, dicts, the rest.
+    if value is None or value == '': return (0,)
+    if isinstance(value, (int, float)): return (1, value)
+    if isinstance(value, str): return (2, value.lower(), value)
+    if isinstance(value, Mapping): return (3, tuple(sorted((str(k), repr(v)) for k, v in value.items())))
+    return (4, repr(value))
+
+def cell_text(value):
+    # A field value as one list cell: dict fields show their set flags, lists their length.
+    if value is None: return ''
+    if isinstance(value, Mapping): return ' '.join(str(k) for k, v in value.items() if v)
+    if isinstance(value, list): return f"[{len(value)}]"
+    return value
+
+class EntryTable:
+    # Stable handles for the entries of a Body list, which keeps the file's order: sorting only produces orders of
+    # handles. An entry's handle is its position when the table was built (added entries take the next number) and
+    # stays with its slot when an edit replaces the entry, so list rows and search keys survive sorts and edits.
+    # Each sort field gets a rank per handle on first use, kept until an edit changes that field's values; a sort on
+    # any number of keys is then one stable bucket pass per key.
+    def __init__(self, body, schema):
+        self.body, self.schema = body, schema
+        self.handles = list(range(len(body)))
+        self.entries = dict(enumerate(body))
+        self.next_handle = len(body)
+        self._slots, self._by_id = None, None
+        self._ranks, self._orders = {}, {}
+
+    def __len__(self): return len(self.entries)
+
+    def __contains__(self, handle): return handle in self.entries
+
+    def __getitem__(self, handle): return self.entries[handle]
+
+    def handle(self, entry):
+        if self._by_id is None: self._by_id = {id(e): h for h, e in self.entries.items()}
+        return self._by_id.get(id(entry))
+
+    def slot(self, handle):
+        # Position of handle's entry in the Body.
+        if self._slots is None: self._slots = {h: i for i, h in enumerate(self.handles)}
+        return self._slots[handle]
+
+    def _insert_slot(self, entry):
+        # New entries go after the last entry with a smaller Id: the end for a fresh Id, the old place for an undone delete.
+        key, i = sort_key(entry.get('Id')), len(self.body)
+        while i and sort_key(self.body[i - 1].get('Id')) >= key: i -= 1
+        return i
+
+    def add(self, entry):
+        handle, slot = self.next_handle, self._insert_slot(entry)
+        self.next_handle += 1
+        self.body.insert(slot, entry); self.handles.insert(slot, handle); self.entries[handle] = entry
+        if self._by_id is not None: self._by_id[id(entry)] = handle
+        self._slots, self._orders = None, {}
+        for field in list(self._ranks): self._rank_one(field, handle, entry)
+        return handle
+
+    def replace(self, handle, entry):
+        old = self.entries[handle]
+        self.body[self.slot(handle)] = entry; self.entries[handle] = entry
+        if self._by_id is not None: self._by_id.pop(id(old), None); self._by_id[id(entry)] = handle
+        changed = {field for field in self._ranks if sort_key(get_path(old, field, self.schema)) != sort_key(get_path(entry, field, self.schema))}
+        for field in changed: self._rank_one(field, handle, entry)
+        if changed: self._orders = {keys: order for keys, order in self._orders.items() if not changed & {f for f, _ in keys}}
+
+    def remove(self, handle):
+        slot, entry = self.slot(handle), self.entries.pop(handle)
+        del self.body[slot]; del self.handles[slot]
+        if self._by_id is not None: self._by_id.pop(id(entry), None)
+        for ranks, _ in self._ranks.values(): ranks.pop(handle, None)
+        self._slots, self._orders = None, {}
+
+    def _rank(self, field):
+        # (handle -> rank, sort key -> rank); equal values share a rank.
+        if (cached := self._ranks.get(field)) is None:
+            keys = {h: sort_key(get_path(e, field, self.schema)) for h, e in self.entries.items()}
+            index = {k: r for r, k in enumerate(sorted(set(keys.values())))}
+            cached = self._ranks[field] = ({h: index[k] for h, k in keys.items()}, index)
+        return cached
+
+    def _rank_one(self, field, handle, entry):
+        # A value the field already holds reuses its rank; a new one makes the ranks stale and they are rebuilt on next use.
+        ranks, index = self._ranks[field]
+        if (rank := index.get(sort_key(get_path(entry, field, self.schema)))) is None: del self._ranks[field]
+        else: ranks[handle] = rank
+
+    def order(self, keys):
+        # Handles sorted by keys, [(field, reverse), ...] most significant first; ties keep the Body order.
+        keys = tuple(keys)
+        if (cached := self._orders.get(keys)) is not None: return cached
+        order = self.handles
+        for field, reverse in reversed(keys):
+            ranks, index = self._rank(field)
+            buckets = [[] for _ in range(len(index))]
+            for h in order: buckets[ranks[h]].append(h)
+            order = [h for bucket in (reversed(buckets) if reverse else buckets) for h in bucket]
+        if len(self._orders) >= ORDER_CACHE: self._orders.clear()
+        self._orders[keys] = order = list(order)
+        return order
+
+    def select(self, order, handles):
+        # The handles of a search result in the order of order.
+        return [h for h in order if h in handles]
@@ -0,0 +1,140 @@
+import os
+import yaml
+
+from db_loader import DBLoadError, SafeLoader
+from db_writer import FileImage, scan_layout
+
+POLL_MS = 1000
+
+def stat_key(path):
+    try: st = os.stat(path)
+    except OSError: return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+class FileWatcher:
+    # Polls os.stat of the open file(s) from the Tk loop. A change is reported once two polls agree, so a file that
+    # is still being written (git checkout, a copy over a network share) is not read half-way.
+    def __init__(self, widget, on_change, interval_ms=POLL_MS):
+        self.widget, self.on_change, self.interval_ms = widget, on_change, interval_ms
+        self.stamps, self.pending, self.paused, self._job = {}, {}, False, None
+
+    def watch(self, paths):
+        self.stamps = {p: stat_key(p) for p in paths}; self.pending = {}; self.paused = False
+        if self._job is None: self._job = self.widget.after(self.interval_ms, self._poll)
+
+    def sync(self, stamps=None):
+        # Our own saves are not changes. stamps ({path: stat_key}) are the versions a reload actually read; without
+        # them every watched file is taken as it is now.
+        self.stamps.update(stamps if stamps is not None else {p: stat_key(p) for p in self.stamps})
+        self.pending = {}; self.paused = False
+
+    def pause(self): self.paused = True
+
+    def stop(self):
+        if self._job is not None: self.widget.after_cancel(self._job); self._job = None
+        self.stamps, self.pending = {}, {}
+
+    def _poll(self):
+        self._job = self.widget.after(self.interval_ms, self._poll)
+        if self.paused: return
+        changed = []
+        for path, stamp in self.stamps.items():
+            if (now := stat_key(path)) == stamp: self.pending.pop(path, None); continue
+            if self.pending.get(path) == now: changed.append(path)
+            else: self.pending[path] = now
+        if changed:
+            self.paused = True
+            self.on_change(changed)
+
+def _common_prefix(a, b):
+    # Byte length both buffers start with; slice comparisons are memcmp, so this is a binary search of C compares.
+    lo, hi = 0, min(len(a), len(b))
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[lo:mid] == b[lo:mid]: lo = mid
+        else: hi = mid - 1
+    return lo
+
+def _common_suffix(a, b, limit):
+    lo, hi, na, nb = 0, limit, len(a), len(b)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if a[na - mid:na - lo] == b[nb - mid:nb - lo]: lo = mid
+        else: hi = mid - 1
+    return lo
+
+def _parse_chunk(raw, start, end):
+    try: data = yaml.load(raw[start:end], Loader=SafeLoader)
+    except yaml.YAMLError as e: raise DBLoadError(f"The entry at byte {start} could not be parsed: {e}")
+    if not (isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict)):
+        raise DBLoadError(f"The entry at byte {start} could not be parsed.")
+    return data[0]
+
+class DiskDiff:
+    # header: the new Header dict, or None when the bytes before Body are unchanged.
+    # pairs: (old, new) per entry Id as the file changed on disk; old is the entry object image was built for.
+    # image: FileImage of the new bytes, reusing the old entry objects for every entry whose text did not change.
+    def __init__(self, header, pairs, image, parsed):
+        self.header, self.pairs, self.image, self.parsed = header, pairs, image, parsed
+
+def diff_file(image, raw):
+    # Compares the bytes image was built from with raw, the file as it is now. Only entries inside the region between
+    # the common prefix and suffix are looked at, and of those only the ones whose text changed are parsed.
+    if (layout := scan_layout(raw)) is None: raise DBLoadError("The Body of the changed file is not a block sequence.")
+    starts, suffix_start, indent, newline = layout
+    old = image.raw
+    prefix = _common_prefix(old, raw)
+    suffix = _common_suffix(old, raw, min(len(old), len(raw)) - prefix)
+    delta, tail = len(raw) - len(old), len(raw) - suffix
+    header = None
+    if prefix < image.prefix_end:
+        try: data = yaml.load(raw[:starts[0]], Loader=SafeLoader)
+        except yaml.YAMLError as e: raise DBLoadError(f"The Header of the changed file could not be parsed: {e}")
+        if not isinstance(data, dict) or not isinstance(data.get('Header'), dict): raise DBLoadError("The changed file has no Header.")
+        header = data['Header']
+    by_span = {image.spans[id(e)]: e for e in image.entries if id(e) in image.spans}
+    bounds = starts + [suffix_start]
+    entries, spans, middle = [], [], []
+    for i, start in enumerate(starts):
+        span = (start, bounds[i + 1])
+        if span[1] <= prefix: kept = by_span.pop(span, None)
+        elif span[0] >= tail: kept = by_span.pop((span[0] - delta, span[1] - delta), None)
+        else: kept = None
+        entries.append(kept); spans.append(span)
+        if kept is None: middle.append(i)
+    # Old entries left over were inside the changed region (or lost their neighbours); match them by text first.
+    old_text = {}
+    for span, entry in by_span.items(): old_text.setdefault(old[span[0]:span[1]], []).append(entry)
+    unmatched, parsed = [], 0
+    for i in middle:
+        start, end = spans[i]
+        if (same := old_text.get(raw[start:end])): entries[i] = same.pop(0)
+        else: unmatched.append(i)
+    leftover = {}
+    for group in old_text.values():
+        for entry in group: leftover.setdefault(entry.get('Id'), []).append(entry)
+    pairs = []
+    for i in unmatched:
+        new = _parse_chunk(raw, *spans[i]); parsed += 1
+        previous = leftover.get(new.get('Id'))
+        old_entry = previous.pop(0) if previous else None
+        if old_entry is not None and old_entry == new: entries[i] = old_entry; continue  # only comments or layout moved
+        entries[i] = new; pairs.append((old_entry, new))
+    for group in leftover.values(): pairs.extend((entry, None) for entry in group)
+    new_image = FileImage(raw, starts[0], suffix_start, spans, entries, indent, newline)
+    new_image.dirty = {key for key in image.dirty if key in new_image.spans}
+    return DiskDiff(header, pairs, new_image, parsed)
+
+def split_changes(pairs, body, image, keys):
+    # Sorts DiskDiff.pairs for an editor holding body (indexed by keys) with image as its last read or save of the file:
+    # (take, conflicts). A change is taken when the entry it replaces is still loaded and has no unsaved edit, or when
+    # it adds an Id the editor does not have; otherwise it conflicts with the editor's entry for that Id, as (mine, new),
+    # unless both sides made the same change.
+    live = {id(e) for e in body}
+    take, conflicts = [], []
+    for old, new in pairs:
+        mine = keys.get((old or new).get('Id'))
+        if old is not None and id(old) in live and id(old) not in image.dirty: take.append((old, new))
+        elif old is None and mine is None: take.append((None, new))
+        elif mine != new: conflicts.append((mine, new))
+    return take, conflicts
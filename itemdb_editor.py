@@ -1,23 +1,31 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox, simpledialog, ttk
-import yaml
 import os
+import sqlite3
+import time
+from db_core import ITEM_SCHEMA, ITEM_TEMPLATE, get_path, is_query
+from db_loader import AsyncLoad, AsyncTask, DBLoadError, HAS_LIBYAML, check_header
+from db_project import MODES, Project
+from parse_cache import ParseCache
+from virtual_list import VirtualTreeview
+from search_index import SearchIndex, is_text_query, parse_text_query, text_hits
+from db_writer import FileImage, save_db
+from key_index import DuplicateKeyError, PrimaryKeyIndex
+from record_store import compact_entries
+from lazy_body import open_lazy
+from perf_log import PerfLog, format_record, rss_bytes, timed
+from change_journal import ChangeJournal, JournalMismatch, resolve_step
+from file_watch import FileWatcher, diff_file, split_changes, stat_key
+from db_sqlite import EXTENSIONS as SQLITE_EXTENSIONS, SqlTable, export_sqlite
+from db_merge import Version, load_versions, merge3
+from entry_table import EntryTable, cell_text
 
-class NoAliasDumper(yaml.SafeDumper):
-    def ignore_aliases(self, data):
-        return True
-
-ITEM_TEMPLATE = {
-    'Id': 0, 'AegisName': 'NEW_ITEM', 'Name': 'New Item', 'Type': 'Etc',
-    'SubType': None, 'Buy': 0, 'Sell': 0, 'Weight': 0, 'Attack': 0,
-    'MagicAttack': 0, 'Defense': 0, 'Range': 0, 'Slots': 0,
-    'Jobs': {'All': True}, 'Classes': {'All': True}, 'Gender': 'Both',
-    'Locations': None, 'WeaponLevel': 0, 'ArmorLevel': 0,
-    'EquipLevelMin': 0, 'EquipLevelMax': 0, 'Refineable': False,
-    'Gradable': False, 'View': 0, 'AliasName': None,
-    'Flags': {}, 'Delay': {}, 'Stack': {}, 'NoUse': {}, 'Trade': {},
-    'Script': None, 'EquipScript': None, 'UnEquipScript': None
-}
+SCRIPT_FIELDS = ('Script', 'EquipScript', 'UnEquipScript')
+DICT_FIELDS = {k for k, v in ITEM_TEMPLATE.items() if isinstance(v, dict)} | {'Locations'}
+
+SEARCH_DEBOUNCE_MS = 150
+COLUMN_FIELDS = {"ID": 'Id', "AegisName": 'AegisName'}
+SHOWN_FIELDS = [k for k in ITEM_TEMPLATE if k not in COLUMN_FIELDS.values()]
 
 class App(ctk.CTk):
     def __init__(self):
@@ -25,19 +33,48 @@ class App(ctk.CTk):
 
         self.title("rAthena Item DB YML Editor")
         self.geometry("1200x800")
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         ctk.set_appearance_mode("dark")
 
         self.file_path = None
+        self.parse_cache = ParseCache()
+        self.file_image = None
+        self.lazy_source = None
+        self.project = None
+        self.sql = None
+        self.perf = PerfLog("itemdb_editor", on_record=lambda rec: self.perf_label.configure(text=format_record(rec)))
+        self._load_started = None
+        self.journal = None
+        self.watcher = FileWatcher(self, self._on_disk_change)
         self.header_data = {}
         self.item_data = []
+        self.search_index = SearchIndex()
+        self.key_index = PrimaryKeyIndex()
+        self.table = EntryTable([], ITEM_SCHEMA)
+        self._filter_job = None
+        self._script_terms = None
+        self.conflicts = {}
         self.current_item_index = None
-        self.sort_by_column = "ID"
-        self.sort_reverse_order = False
+        self.sort_keys = [('Id', False)]
+        self.list_field_var = ctk.StringVar(value='Name')
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=3)
         self.grid_rowconfigure(1, weight=1)
 
+        self.status_frame = ctk.CTkFrame(self, height=24, corner_radius=0)
+        self.status_frame.grid(row=2, column=0, columnspan=2, sticky="ew")
+        self.status_frame.grid_columnconfigure(0, weight=1)
+        self.status_label = ctk.CTkLabel(self.status_frame, text="Ready" + ("" if HAS_LIBYAML else " (libyaml not available, using pure-Python parser)"), anchor="w")
+        self.status_label.grid(row=0, column=0, sticky="ew", padx=10)
+        self.status_progress = ctk.CTkProgressBar(self.status_frame, width=200)
+        self.status_progress.set(0)
+        self.perf_label = ctk.CTkLabel(self.status_frame, text="", anchor="e", text_color="gray70")
+        self.perf_label.grid(row=0, column=2, sticky="e", padx=10)
+        self.profile_var = ctk.BooleanVar(value=False)
+        self.profile_switch = ctk.CTkSwitch(self.status_frame, text="Profile", variable=self.profile_var, command=self.toggle_profile)
+        self.profile_switch.grid(row=0, column=3, padx=10)
+
         self.menu_frame = ctk.CTkFrame(self, height=30, corner_radius=0)
         self.menu_frame.grid(row=0, column=0, columnspan=2, sticky="ew")
         self.btn_open = ctk.CTkButton(self.menu_frame, text="Open", command=self.load_file)
@@ -46,6 +83,22 @@ class App(ctk.CTk):
         self.btn_save.pack(side="left", padx=5, pady=5)
         self.btn_save_as = ctk.CTkButton(self.menu_frame, text="Save As...", command=self.save_file_as, state="disabled")
         self.btn_save_as.pack(side="left", padx=5, pady=5)
+        self.btn_undo = ctk.CTkButton(self.menu_frame, text="Undo", command=self.undo, state="disabled")
+        self.btn_undo.pack(side="left", padx=5, pady=5)
+        self.btn_redo = ctk.CTkButton(self.menu_frame, text="Redo", command=self.redo, state="disabled")
+        self.btn_redo.pack(side="left", padx=5, pady=5)
+        self.btn_open_project = ctk.CTkButton(self.menu_frame, text="Open Project...", command=self.load_project)
+        self.btn_open_project.pack(side="left", padx=5, pady=5)
+        self.btn_open_sqlite = ctk.CTkButton(self.menu_frame, text="Open SQLite...", command=self.load_sqlite)
+        self.btn_open_sqlite.pack(side="left", padx=5, pady=5)
+        self.btn_merge = ctk.CTkButton(self.menu_frame, text="Merge...", command=self.open_merge, state="disabled")
+        self.btn_merge.pack(side="left", padx=5, pady=5)
+        self.project_mode_var = ctk.StringVar(value=MODES[0])
+        self.project_mode_menu = ctk.CTkOptionMenu(self.menu_frame, values=list(MODES), variable=self.project_mode_var, width=110)
+        self.project_mode_menu.pack(side="left", padx=5, pady=5)
+        self.lazy_open_var = ctk.BooleanVar(value=False)
+        self.chk_lazy_open = ctk.CTkCheckBox(self.menu_frame, text="Lazy open (large files)", variable=self.lazy_open_var)
+        self.chk_lazy_open.pack(side="left", padx=5, pady=5)
 
         self.left_frame = ctk.CTkFrame(self)
         self.left_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
@@ -55,8 +108,8 @@ class App(ctk.CTk):
         ctk.CTkLabel(self.left_frame, text="Items", font=ctk.CTkFont(size=16, weight="bold")).grid(row=0, column=0, columnspan=2, pady=(5,0))
         
         self.search_var = ctk.StringVar()
-        self.search_var.trace_add("write", self.filter_item_list)
-        self.search_entry = ctk.CTkEntry(self.left_frame, textvariable=self.search_var, placeholder_text="Search by ID or AegisName...")
+        self.search_var.trace_add("write", self._schedule_filter)
+        self.search_entry = ctk.CTkEntry(self.left_frame, textvariable=self.search_var, placeholder_text="ID, AegisName, Type=Weapon AND Slots>=3, or script: bonus bStr")
         self.search_entry.grid(row=1, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
 
         style = ttk.Style()
@@ -66,17 +119,17 @@ class App(ctk.CTk):
         style.configure("Treeview.Heading", background="#242424", foreground="white", relief="flat")
         style.map("Treeview.Heading", background=[('active', '#343434')])
 
-        self.item_list_tree = ttk.Treeview(self.left_frame, columns=("ID", "AegisName"), show="headings")
-        self.item_list_tree.heading("ID", text="ID ▼", command=lambda: self.sort_treeview_column("ID"))
-        self.item_list_tree.heading("AegisName", text="AegisName", command=lambda: self.sort_treeview_column("AegisName"))
+        self.item_list_tree = ttk.Treeview(self.left_frame, columns=("ID", "AegisName", "Field"), show="headings")
+        for col in ("ID", "AegisName", "Field"): self.item_list_tree.heading(col, command=lambda c=col: self.sort_treeview_column(c))
+        self.item_list_tree.bind("<Shift-Button-1>", self._on_heading_shift_click)
         self.item_list_tree.column("ID", width=80)
         self.item_list_tree.column("AegisName", width=200)
+        self.item_list_tree.column("Field", width=100)
         self.item_list_tree.grid(row=2, column=0, sticky="nsew", padx=(5,0))
-        self.item_list_tree.bind("<<TreeviewSelect>>", self.on_item_select)
 
-        self.item_list_scrollbar = ttk.Scrollbar(self.left_frame, orient="vertical", command=self.item_list_tree.yview)
-        self.item_list_tree.configure(yscrollcommand=self.item_list_scrollbar.set)
+        self.item_list_scrollbar = ttk.Scrollbar(self.left_frame, orient="vertical")
         self.item_list_scrollbar.grid(row=2, column=1, sticky="ns", padx=(0,5))
+        self.item_list = VirtualTreeview(self.item_list_tree, self.item_list_scrollbar, self._item_row_values, on_select=self.on_item_select)
 
         self.btn_frame = ctk.CTkFrame(self.left_frame)
         self.btn_frame.grid(row=3, column=0, columnspan=2, sticky="ew", pady=5)
@@ -86,6 +139,8 @@ class App(ctk.CTk):
         self.btn_add_item.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
         self.btn_delete_item = ctk.CTkButton(self.btn_frame, text="Delete Selected", command=self.delete_item, state="disabled")
         self.btn_delete_item.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        ctk.CTkLabel(self.btn_frame, text="Third column:", anchor="w").grid(row=1, column=0, padx=5, sticky="ew")
+        ctk.CTkOptionMenu(self.btn_frame, values=SHOWN_FIELDS, variable=self.list_field_var, command=self.set_list_field).grid(row=1, column=1, padx=5, pady=(0, 5), sticky="ew")
 
         self.editor_outer_frame = ctk.CTkFrame(self)
         self.editor_outer_frame.grid(row=1, column=1, sticky="nsew", padx=(0, 10), pady=10)
@@ -101,155 +156,583 @@ class App(ctk.CTk):
         self.editor_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
         self.editor_frame.grid_columnconfigure(1, weight=1)
         self.entry_widgets = {}
+        self.form_rows = {}
+        self._form_grid = {}
 
-    def sort_treeview_column(self, col):
-        if self.sort_by_column == col: self.sort_reverse_order = not self.sort_reverse_order
-        else: self.sort_by_column = col; self.sort_reverse_order = False
-        
-        if col == "ID": self.item_data.sort(key=lambda item: int(item.get('Id', 0)), reverse=self.sort_reverse_order)
-        elif col == "AegisName": self.item_data.sort(key=lambda item: item.get('AegisName', '').lower(), reverse=self.sort_reverse_order)
-        
-        for c in ("ID", "AegisName"):
-            text = c; text += " ▼" if c == self.sort_by_column and not self.sort_reverse_order else (" ▲" if c == self.sort_by_column else "")
-            self.item_list_tree.heading(c, text=text)
-        
+        self.conflict_frame = ctk.CTkFrame(self.editor_outer_frame, fg_color="#5a2d2d")
+        self.conflict_frame.grid_columnconfigure(0, weight=1)
+        self.conflict_label = ctk.CTkLabel(self.conflict_frame, text="", anchor="w", justify="left")
+        self.conflict_label.grid(row=0, column=0, rowspan=3, sticky="ew", padx=10, pady=5)
+        ctk.CTkButton(self.conflict_frame, text="Keep Ours", command=lambda: self.resolve_conflict('ours')).grid(row=0, column=1, padx=5, pady=2)
+        ctk.CTkButton(self.conflict_frame, text="Take Theirs", command=lambda: self.resolve_conflict('theirs')).grid(row=1, column=1, padx=5, pady=2)
+        ctk.CTkButton(self.conflict_frame, text="Next Conflict", command=self.next_conflict).grid(row=2, column=1, padx=5, pady=2)
+
+    @timed('sort', lambda app: len(app.item_data))
+    def sort_treeview_column(self, col, add=False):
+        # A click sorts by the column (again: reverses it); Shift+click adds it as a further key or reverses that key.
+        field = self._column_field(col)
+        pos = next((i for i, (f, _) in enumerate(self.sort_keys) if f == field), None)
+        if add and pos is not None: self.sort_keys[pos] = (field, not self.sort_keys[pos][1])
+        elif add: self.sort_keys.append((field, False))
+        elif pos == 0: self.sort_keys[0] = (field, not self.sort_keys[0][1])
+        else: self.sort_keys = [(field, False)]
+        self._update_headings()
         self.filter_item_list()
+        if self.current_item_index is not None: self.item_list.see(self.current_item_index)
+
+    def _on_heading_shift_click(self, event):
+        if self.item_list_tree.identify_region(event.x, event.y) != "heading": return
+        if (column := self.item_list_tree.identify_column(event.x)):
+            self.sort_treeview_column(self.item_list_tree["columns"][int(column[1:]) - 1], add=True)
+        return "break"
+
+    def _column_field(self, col): return COLUMN_FIELDS.get(col) or self.list_field_var.get()
+
+    def _update_headings(self):
+        ranks = {f: (i, r) for i, (f, r) in enumerate(self.sort_keys)}
+        for col in ("ID", "AegisName", "Field"):
+            text = col if col != "Field" else self._column_field(col)
+            if (rank := ranks.get(self._column_field(col))) is not None:
+                text += (" ▲" if rank[1] else " ▼") + (str(rank[0] + 1) if len(self.sort_keys) > 1 else "")
+            self.item_list_tree.heading(col, text=text)
 
+    def set_list_field(self, field):
+        # A field that was only shown leaves the sort with the column.
+        self.sort_keys = [k for k in self.sort_keys if k[0] in COLUMN_FIELDS.values()] or [('Id', False)]
+        if self.sql is not None: self.sql.show(field)
+        self._update_headings(); self.filter_item_list()
+
+    def _schedule_filter(self, *args):
+        if self._filter_job: self.after_cancel(self._filter_job)
+        self._filter_job = self.after(SEARCH_DEBOUNCE_MS, self.filter_item_list)
+
+    @timed('filter', lambda app: len(app.item_data))
     def filter_item_list(self, *args):
-        search_term = self.search_var.get().lower()
-        self.item_list_tree.unbind("<<TreeviewSelect>>")
-        self.item_list_tree.delete(*self.item_list_tree.get_children())
-        for i, item in enumerate(self.item_data):
-            if search_term in str(item.get('Id', '')) or search_term in item.get('AegisName', '').lower():
-                self.item_list_tree.insert("", "end", iid=i, values=(item.get('Id', ''), item.get('AegisName', '')))
-        self.item_list_tree.bind("<<TreeviewSelect>>", self.on_item_select)
-
-    def load_file(self):
-        path = filedialog.askopenfilename(title="Open item_db.yml", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")))
-        if not path: return
+        if self._filter_job: self.after_cancel(self._filter_job); self._filter_job = None
+        text = self.search_var.get()
+        self._script_terms = parse_text_query(text) if is_text_query(text) else None
+        self._refresh_hits()
         try:
-            with open(path, 'r', encoding='utf-8') as f: data = yaml.safe_load(f)
-            if data.get('Header', {}).get('Type') != 'ITEM_DB':
-                messagebox.showerror("Error", "This does not appear to be a valid ITEM_DB YAML file."); return
-            self.file_path = path
-            self.header_data = data['Header']; self.item_data = data['Body']
-            self.populate_item_list()
-            self.btn_save.configure(state="normal"); self.btn_save_as.configure(state="normal")
-            self.btn_add_item.configure(state="normal"); self.btn_delete_item.configure(state="normal")
-            self.title(f"rAthena Item DB YML Editor - {os.path.basename(path)}")
-        except Exception as e: messagebox.showerror("Error Loading File", str(e))
+            if self.sql is not None: matches = self._sql_view(text)
+            elif is_text_query(text): matches = self._search_scripts()
+            else: matches = self.search_index.query(text, ITEM_SCHEMA) if is_query(text) else self.search_index.search(text)
+        except ValueError as e: self.set_status(f"Query: {e}"); return
+        if self.sql is not None: self.item_list.set_rows(matches); return
+        order = self.table.order(self.sort_keys)
+        self.item_list.set_rows(order if matches is None else self.table.select(order, matches))
+
+    def _sql_view(self, text):
+        # SQLite mode: the search runs as a WHERE clause and the sort keys as ORDER BY; rows are Ids.
+        if is_text_query(text): where, params = self.sql.where_text(self._script_terms)
+        elif is_query(text): where, params = self.sql.where_query(text)
+        else: where, params = self.sql.where_search(text)
+        return self.sql.ids(where, params, [(c, r) for f, r in self.sort_keys if (c := self.sql.column(f)) is not None])
+
+    def _search_scripts(self):
+        # Lazily opened files index their scripts on the first script search, which parses every entry once.
+        if self.search_index.text is None:
+            self.set_status("Indexing scripts..."); self.update_idletasks()
+            with self.perf.measure('index_scripts', entries=len(self.item_data)): self.search_index.index_text(SCRIPT_FIELDS)
+            self.set_status(f"Indexed scripts of {len(self.item_data)} items")
+        return self.search_index.search_text(self._script_terms) if self._script_terms else None
+
+    def _refresh_hits(self):
+        for key in SCRIPT_FIELDS:
+            if (widget := self.entry_widgets.get(key)) is not None: self._mark_hits(widget, widget.get("1.0", "end-1c"))
+
+    def _mark_hits(self, widget, text):
+        widget.tag_remove("hit", "1.0", "end")
+        if not self._script_terms or not text: return
+        for start, end in (hits := text_hits(text, self._script_terms)): widget.tag_add("hit", f"1.0+{start}c", f"1.0+{end}c")
+        if hits: widget.see(f"1.0+{hits[0][0]}c")
+
+    def _item_row_values(self, i):
+        if self.sql is not None: return self.sql.row(i)
+        item = self.table[i]
+        return (item.get('Id', ''), item.get('AegisName', ''), cell_text(get_path(item, self.list_field_var.get(), ITEM_SCHEMA)))
+
+    def on_close(self):
+        # Quitting with nothing unsaved drops the journal; otherwise it stays for recovery on the next open.
+        if self.journal is not None and not self.journal.unsaved: self.journal.close()
+        self._close_sql(); self.destroy()
+
+    def set_status(self, text, progress=None):
+        self.status_label.configure(text=text)
+        if progress is None: self.status_progress.grid_remove()
+        else: self.status_progress.set(progress); self.status_progress.grid(row=0, column=1, padx=10)
+
+    def toggle_profile(self):
+        # cProfile covers the Tk thread only; background parsing shows up as its wait time.
+        if self.profile_var.get(): self.perf.start_profile(); self.set_status(f"Profiling; switch off to write a .prof file to {self.perf.directory}")
+        elif (path := self.perf.stop_profile()): self.set_status(f"Profile written to {path}")
+
+    def load_file(self, path=None):
+        path = path or filedialog.askopenfilename(title="Open item_db.yml", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")))
+        if not path: return
+        try: check_header(path, 'ITEM_DB')
+        except DBLoadError as e: messagebox.showerror("Error", str(e)); return
+        except Exception as e: messagebox.showerror("Error Loading File", str(e)); return
+        self._load_started = (time.perf_counter(), rss_bytes())
+        if self.lazy_open_var.get(): self._open_lazy(path); return
+        self.btn_open.configure(state="disabled")
+        self.set_status(f"Loading {os.path.basename(path)}...", 0)
+        AsyncLoad(self, path, 'ITEM_DB', on_done=lambda data, prepared: self._on_file_loaded(path, data, *prepared), on_error=self._on_load_error, cache=self.parse_cache,
+                  prepare=self._prepare_loaded,
+                  on_progress=lambda p: self.set_status(f"Loading {os.path.basename(path)}... {int(p * 100)}%", p))
+
+    @staticmethod
+    def _prepare_loaded(data, raw):
+        # Runs on the loader thread; must not touch Tk.
+        body = data['Body'] = compact_entries(ITEM_SCHEMA, data['Body'])
+        return SearchIndex(enumerate(body), SCRIPT_FIELDS), FileImage.scan(raw, body), PrimaryKeyIndex(body)
+
+    def _open_lazy(self, path):
+        # Only the Id/AegisName offset scan runs here; entries are parsed when selected.
+        try: header, body, image, source = open_lazy(path, 'ITEM_DB')
+        except (DBLoadError, OSError) as e: messagebox.showerror("Error", str(e)); return
+        self._on_file_loaded(path, {'Header': header, 'Body': body}, SearchIndex(enumerate(body)), image, PrimaryKeyIndex(body), source)
+
+    def load_project(self, path=None):
+        # Opens db/item_db.yml (or any file with Footer Imports) and every file it imports for the selected mode.
+        path = path or filedialog.askopenfilename(title="Open db/item_db.yml", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")))
+        if not path: return
+        try: check_header(path, 'ITEM_DB')
+        except DBLoadError as e: messagebox.showerror("Error", str(e)); return
+        except Exception as e: messagebox.showerror("Error Loading File", str(e)); return
+        self.btn_open.configure(state="disabled"); self.btn_open_project.configure(state="disabled")
+        self._load_started = (time.perf_counter(), rss_bytes())
+        self.set_status(f"Loading project {os.path.basename(path)}...", 0)
+        mode = self.project_mode_var.get()
+        def work(progress):
+            project = Project.open(path, ITEM_SCHEMA, mode, cache=self.parse_cache, compact=True, progress=progress)
+            return project, SearchIndex(enumerate(project.body), SCRIPT_FIELDS)
+        AsyncTask(self, work, on_done=lambda project, index: self._on_project_loaded(path, project, index), on_error=self._on_load_error,
+                  on_progress=lambda p: self.set_status(f"Loading project {os.path.basename(path)}... {int(p * 100)}%", p))
+
+    def load_sqlite(self, path=None):
+        # Edits an item_db_re table in place (written by Save As... or ryde_cli export-sqlite): the list, search and sort
+        # are SQL queries, rows are fetched a page at a time and every entry save is committed straight away.
+        path = path or filedialog.askopenfilename(title="Open SQLite database", filetypes=(("SQLite databases", " ".join("*" + e for e in SQLITE_EXTENSIONS)), ("All files", "*.*")))
+        if not path: return
+        self._load_started = (time.perf_counter(), rss_bytes())
+        try: sql = SqlTable(path, ITEM_SCHEMA); header = sql.header()
+        except sqlite3.Error as e: messagebox.showerror("Error", f"{os.path.basename(path)}: {e}"); return
+        self._close_sql(); self.watcher.stop()
+        if self.lazy_source is not None: self.lazy_source.close(); self.lazy_source = None
+        self.sql, self.project, self.journal, self.file_path, self.file_image = sql, None, None, path, None
+        self.header_data, self.item_data = header, []
+        self.search_index, self.key_index, self.table = SearchIndex(), PrimaryKeyIndex(), EntryTable([], ITEM_SCHEMA)
+        sql.show(self.list_field_var.get()); self.populate_item_list(); self._update_undo_buttons()
+        self.btn_save.configure(state="disabled"); self.btn_save_as.configure(state="normal")
+        self.btn_add_item.configure(state="normal"); self.btn_delete_item.configure(state="normal")
+        self.btn_merge.configure(state="disabled"); self.conflicts = {}; self.conflict_frame.grid_remove()
+        self.title(f"rAthena Item DB YML Editor - {os.path.basename(path)} ({sql.table})")
+        count = len(self.item_list)
+        self.perf.record('load', time.perf_counter() - self._load_started[0], self._load_started[1], entries=count, file=os.path.basename(path), mode="sqlite")
+        self._load_started = None
+        self.set_status(f"Opened {count} items from {sql.table} in {os.path.basename(path)}; changes are committed as you save each item")
+
+    def _close_sql(self):
+        if self.sql is not None: self.sql.close(); self.sql = None
+
+    def _on_project_loaded(self, path, project, index):
+        self._on_file_loaded(path, {'Header': project.header, 'Body': project.body}, index, None, project.keys, project=project)
+        self.btn_save_as.configure(state="disabled")
+        self.set_status(f"Loaded {len(project.body)} items from {len(project.files)} files ({project.mode})" + (f", missing imports: {', '.join(project.missing)}" if project.missing else ""))
+
+    def _release_lazy(self, raw, image):
+        if self.lazy_source is not None: self.lazy_source.rebase(raw, image, self.item_data)
+
+    def _on_file_loaded(self, path, data, index, image, keys, source=None, project=None):
+        self.btn_open.configure(state="normal"); self.btn_open_project.configure(state="normal")
+        self._close_sql()
+        if self.lazy_source is not None: self.lazy_source.close()
+        self.lazy_source = source; self.project = project
+        self.file_path = path
+        self.header_data = data['Header']; self.item_data = data['Body']; self.search_index = index; self.file_image = image
+        self.key_index = keys; self.table = EntryTable(self.item_data, ITEM_SCHEMA)
+        self.populate_item_list()
+        self.btn_save.configure(state="normal"); self.btn_save_as.configure(state="normal")
+        self.btn_add_item.configure(state="normal"); self.btn_delete_item.configure(state="normal")
+        self.btn_merge.configure(state="disabled" if source is not None else "normal"); self.conflicts = {}; self.conflict_frame.grid_remove()
+        self.title(f"rAthena Item DB YML Editor - {os.path.basename(path)}")
+        self.set_status(f"Loaded {len(self.item_data)} items from {os.path.basename(path)}" + (f" ({len(keys.duplicates)} duplicate keys)" if keys.duplicates else ""))
+        if self._load_started is not None:
+            mode = "project" if project is not None else "lazy" if source is not None else "full"
+            self.perf.record('load', time.perf_counter() - self._load_started[0], self._load_started[1], entries=len(self.item_data), file=os.path.basename(path), mode=mode)
+            self._load_started = None
+        self._open_journal(path); self._watch()
+        if keys.duplicates: messagebox.showwarning("Duplicate Keys", "\n".join(keys.duplicates[:20]) + ("\n..." if len(keys.duplicates) > 20 else ""))
+
+    def _on_load_error(self, e):
+        self.btn_open.configure(state="normal"); self.btn_open_project.configure(state="normal")
+        self.set_status("Load failed")
+        if isinstance(e, DBLoadError): messagebox.showerror("Error", str(e))
+        else: messagebox.showerror("Error Loading File", str(e))
 
     def populate_item_list(self):
-        self.sort_by_column = "ID"; self.sort_reverse_order = False
-        self.item_data.sort(key=lambda item: int(item.get('Id', 0)))
+        # Shown by Id; the Body itself keeps the file's order.
+        self.sort_keys = [('Id', False)]
+        self.item_list.clear_selection(); self.current_item_index = None
         self.search_var.set("")
-        self.item_list_tree.heading("ID", text="ID ▼"); self.item_list_tree.heading("AegisName", text="AegisName")
+        self._update_headings()
         self.filter_item_list()
 
+    @timed('select', lambda app: len(app.item_data))
     def on_item_select(self, event=None):
-        if not (selected := self.item_list_tree.selection()): return
+        if not (selected := self.item_list.selection()): return
         self.current_item_index = int(selected[0])
-        self.display_item_details(self.item_data[self.current_item_index])
+        if (item := self.sql.get(self.current_item_index) if self.sql is not None else self.table[self.current_item_index]) is None: return
+        self.display_item_details(item)
         self.btn_save_item.configure(state="normal")
 
     def display_item_details(self, item):
-        for widget in self.editor_frame.winfo_children(): widget.destroy()
-        self.entry_widgets = {}
-        self.editor_frame.configure(label_text=f"Editing: {item.get('Id')} - {item.get('AegisName')}")
-        full_item_data = ITEM_TEMPLATE.copy(); full_item_data.update(item)
+        source = f" ({os.path.relpath(self.project.source_of(item), os.path.dirname(self.project.path))})" if self.project is not None and self.project.source_of(item) else ""
+        self.editor_frame.configure(label_text=f"Editing: {item.get('Id')} - {item.get('AegisName')}{source}")
+        full_item_data = ITEM_SCHEMA.merge_template(item)
         
+        shown = {}
         for i, (key, value) in enumerate(full_item_data.items()):
-            lbl = ctk.CTkLabel(self.editor_frame, text=key); lbl.grid(row=i, column=0, padx=10, pady=5, sticky="w")
-            
-            if key in ['Script', 'EquipScript', 'UnEquipScript']:
-                widget = ctk.CTkTextbox(self.editor_frame, height=100)
+            lbl, widget, kind = self._form_row(key, self._field_kind(key, value))
+            if kind == 'script':
+                widget.delete("1.0", "end")
                 if value: widget.insert("1.0", str(value))
-            elif isinstance(value, dict):
-                widget = self._create_dict_editor(self.editor_frame, key, value)
+                self._mark_hits(widget, str(value or ''))
+            elif kind == 'dict': self._set_dict_editor(widget, value or {})
             else:
-                widget = ctk.CTkEntry(self.editor_frame)
+                widget.delete(0, "end")
                 if value is not None: widget.insert(0, str(value))
             
-            widget.grid(row=i, column=1, padx=5, pady=5, sticky="ew")
-            self.entry_widgets[key] = widget
+            if self._form_grid.get(key) != i:
+                lbl.grid(row=i, column=0, padx=10, pady=5, sticky="w")
+                widget.grid(row=i, column=1, padx=5, pady=5, sticky="ew")
+                self._form_grid[key] = i
+            shown[key] = widget
+        for key in [k for k in self._form_grid if k not in shown]: self._hide_form_row(key)
+        self.entry_widgets = shown
+        self._show_conflict(item)
+
+    def _show_conflict(self, item):
+        if (conflict := self.conflicts.get(item.get('Id'))) is None: self.conflict_frame.grid_remove(); return
+        self.conflict_label.configure(text=f"Merge conflict ({len(self.conflicts)} left):\n{conflict.describe()}")
+        self.conflict_frame.grid(row=2, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
+
+    def _field_kind(self, key, value):
+        if key in SCRIPT_FIELDS: return 'script'
+        if isinstance(value, dict) or (value is None and key in DICT_FIELDS): return 'dict'
+        return 'entry'
+
+    def _form_row(self, key, kind):
+        # Widgets are built once per field and reused across selections; only a type change rebuilds one.
+        if (row := self.form_rows.get(key)) is not None and row[2] == kind: return row
+        if row is not None: self._hide_form_row(key); row[0].destroy(); row[1].destroy()
+        lbl = ctk.CTkLabel(self.editor_frame, text=key)
+        if kind == 'script': widget = ctk.CTkTextbox(self.editor_frame, height=100); widget.tag_config("hit", background="#7a5c00")
+        elif kind == 'dict': widget = self._create_dict_editor(self.editor_frame, key, {})
+        else: widget = ctk.CTkEntry(self.editor_frame)
+        self.form_rows[key] = row = (lbl, widget, kind)
+        return row
+
+    def _hide_form_row(self, key):
+        if self._form_grid.pop(key, None) is None: return
+        lbl, widget, _ = self.form_rows[key]; lbl.grid_remove(); widget.grid_remove()
+
+    def _hide_form(self):
+        for key in list(self._form_grid): self._hide_form_row(key)
+        self.entry_widgets = {}
 
     def _create_dict_editor(self, parent, key, items):
         frame = ctk.CTkFrame(parent); frame.columnconfigure(0, weight=1)
         text_widget = ctk.CTkTextbox(frame, height=max(60, len(items) * 25))
-        if items: text_widget.insert("1.0", "\n".join([f"{k}: {v}" for k, v in items.items()]))
         text_widget.grid(row=0, column=0, sticky="ew")
-        frame.textbox = text_widget
+        frame.textbox = text_widget; frame.textbox_height = max(60, len(items) * 25)
+        self._set_dict_editor(frame, items)
         return frame
+
+    def _set_dict_editor(self, frame, items):
+        frame.textbox.delete("1.0", "end")
+        if items: frame.textbox.insert("1.0", ITEM_SCHEMA.format_dict_text(items))
+        if (height := max(60, len(items) * 25)) != frame.textbox_height:
+            frame.textbox.configure(height=height); frame.textbox_height = height
         
     def save_current_item(self):
         if self.current_item_index is None: return
         new_item_data = {}
         try:
-            for key, widget in self.entry_widgets.items():
-                if isinstance(widget, ctk.CTkEntry):
-                    value = widget.get() if widget.get() not in ["", "None"] else None
-                    if value is None: new_item_data[key] = None; continue
-                    if key in ['Id','Buy','Sell','Weight','Attack','MagicAttack','Defense','Range','Slots','WeaponLevel','ArmorLevel','EquipLevelMin','EquipLevelMax','View']:
-                        new_item_data[key] = int(value) if value.isdigit() else 0
-                    elif key in ['Refineable', 'Gradable']:
-                        new_item_data[key] = value.lower() == 'true'
-                    else: new_item_data[key] = value
-                elif isinstance(widget, ctk.CTkTextbox):
-                    value = widget.get("1.0", "end-1c").strip()
-                    new_item_data[key] = value if value else None
-                elif isinstance(widget, ctk.CTkFrame) and hasattr(widget, 'textbox'):
-                    items = {}
-                    if text_content := widget.textbox.get("1.0", "end-1c").strip():
-                        for line in text_content.split('\n'):
-                            if ':' in line:
-                                k, v = (s.strip() for s in line.split(':', 1))
-                                if v.lower() == 'true': items[k] = True
-                                elif v.lower() == 'false': items[k] = False
-                                else: items[k] = v if not v.isdigit() else int(v)
-                    new_item_data[key] = items
-            
-            clean_item_data = {k: v for k, v in new_item_data.items() if v is not None and v != {}}
-            self.item_data[self.current_item_index] = clean_item_data
-            self.filter_item_list()
-            self.item_list_tree.selection_set(str(self.current_item_index))
+            with self.perf.measure('save_entry', entries=len(self.item_data)):
+                for key, widget in self.entry_widgets.items():
+                    if isinstance(widget, ctk.CTkEntry):
+                        new_item_data[key] = ITEM_SCHEMA.coerce_field(key, widget.get())
+                    elif isinstance(widget, ctk.CTkTextbox):
+                        value = widget.get("1.0", "end-1c").strip()
+                        new_item_data[key] = value if value else None
+                    elif isinstance(widget, ctk.CTkFrame) and hasattr(widget, 'textbox'):
+                        new_item_data[key] = ITEM_SCHEMA.parse_dict_text(widget.textbox.get("1.0", "end-1c"))
+                
+                clean_item_data = ITEM_SCHEMA.clean(new_item_data)
+                if self.sql is not None: duplicate = self._sql_put(self.current_item_index, clean_item_data)
+                else:
+                    try: self.key_index.replace(self.table[self.current_item_index], clean_item_data)
+                    except DuplicateKeyError as e: duplicate = e
+                    else:
+                        duplicate, old_item = None, self.table[self.current_item_index]
+                        self.table.replace(self.current_item_index, clean_item_data)
+                        self.search_index.update(self.current_item_index, clean_item_data)
+                        self.filter_item_list()
+                        self.item_list.select(self.current_item_index)
+                        self._journal(f"edit {clean_item_data.get('AegisName')}", [(old_item, clean_item_data)])
+            if duplicate is not None: messagebox.showerror("Duplicate Key", str(duplicate)); return
             messagebox.showinfo("Success", f"Item '{clean_item_data['AegisName']}' updated.")
         except Exception as e: messagebox.showerror("Save Error", f"An error occurred: {e}")
 
+    def _sql_put(self, old_id, item):
+        # Returns the DuplicateKeyError instead of raising it, like the in-memory branch of save_current_item.
+        try: self.sql.put(old_id, item)
+        except DuplicateKeyError as e: return e
+        self.current_item_index = item.get('Id')
+        self.filter_item_list(); self.item_list.select(self.current_item_index)
+        return None
+
+    @timed('add', lambda app: len(app.item_data))
     def add_item(self):
-        new_id = max(item.get('Id', 0) for item in self.item_data) + 1 if self.item_data else 501
-        new_item = {'Id': new_id, 'AegisName': f'NEW_ITEM_{new_id}', 'Name': 'New Item'}
-        self.item_data.append(new_item)
-        self.sort_treeview_column(self.sort_by_column)
-        for i, item in enumerate(self.item_list_tree.get_children()):
-             if self.item_data[int(item)].get('Id') == new_id:
-                 self.item_list_tree.selection_set(item); self.item_list_tree.see(item); break
+        if self.sql is not None:
+            new_id = self.sql.first_gap(ITEM_SCHEMA.default_id); name = f'NEW_ITEM_{new_id}'
+            while self.sql.get_by_name(name) is not None: name += '_'
+            self._sql_put(None, {'Id': new_id, 'AegisName': name, 'Name': 'New Item'}); return
+        new_id = self.key_index.first_gap(ITEM_SCHEMA.default_id)
+        name = f'NEW_ITEM_{new_id}'
+        while self.key_index.get_by_name(name) is not None: name += '_'
+        new_item = {'Id': new_id, 'AegisName': name, 'Name': 'New Item'}
+        self.key_index.add(new_item)
+        handle = self.table.add(new_item); self.search_index.add(handle, new_item)
+        self.filter_item_list()
+        self.item_list.select(handle)
+        self._journal(f"add {name}", [(None, new_item)])
 
     def delete_item(self):
-        if not (selected := self.item_list_tree.selection()):
+        if not (selected := self.item_list.selection()):
             messagebox.showwarning("Warning", "Please select an item to delete."); return
         selected_iid = int(selected[0])
-        if messagebox.askyesno("Confirm Delete", f"Delete {self.item_data[selected_iid].get('AegisName', 'N/A')}?"):
-            self.item_data.pop(selected_iid)
+        name = self.sql.row(selected_iid)[1] if self.sql is not None else self.table[selected_iid].get('AegisName', 'N/A')
+        if not messagebox.askyesno("Confirm Delete", f"Delete {name}?"): return
+        if self.sql is not None:
+            self.sql.delete(selected_iid); self.item_list.clear_selection(); self.filter_item_list(); self._hide_form()
+            self.editor_frame.configure(label_text="Select an item to edit")
+            self.current_item_index = None; self.btn_save_item.configure(state="disabled"); return
+        with self.perf.measure('delete', entries=len(self.item_data)):
+            removed = self.table[selected_iid]; self.table.remove(selected_iid)
+            self.search_index.remove(selected_iid); self.key_index.remove(removed)
+            self.item_list.clear_selection()
             self.filter_item_list()
-            for widget in self.editor_frame.winfo_children(): widget.destroy()
+            self._hide_form()
             self.editor_frame.configure(label_text="Select an item to edit")
             self.current_item_index = None; self.btn_save_item.configure(state="disabled")
+            self._journal(f"delete {removed.get('AegisName')}", [(removed, None)])
+
+    def _open_journal(self, path):
+        # Unsaved steps from a previous session are replayed on top of the file just loaded if the user agrees.
+        self.journal = ChangeJournal(path)
+        try: steps = self.journal.pending()
+        except JournalMismatch as e:
+            self.journal.set_aside(); steps = []
+            messagebox.showwarning("Change Journal", f"{e}\nThe old journal was kept as {os.path.basename(self.journal.log_path)}.bak.")
+        if steps and messagebox.askyesno("Recover Changes", f"{len(steps)} unsaved change(s) to {os.path.basename(path)} were found from a previous session. Recover them?"):
+            missed = 0
+            for label, changes in steps:
+                pairs, skipped = resolve_step(self.key_index, changes)
+                applied = self._apply_pairs(pairs); missed += skipped + len(pairs) - len(applied)
+                if applied: self.journal.adopt(label, applied)
+            self.set_status(f"Recovered {len(steps)} change(s)" + (f", {missed} could not be applied" if missed else ""))
+        else: self.journal.start()
+        self._update_undo_buttons()
+
+    def _journal(self, label, pairs):
+        if self.journal is not None: self.journal.record(label, pairs); self._update_undo_buttons()
+
+    def _update_undo_buttons(self):
+        undo = self.journal.undo_stack[-1][0] if self.journal is not None and self.journal.undo_stack else None
+        redo = self.journal.redo_stack[-1][0] if self.journal is not None and self.journal.redo_stack else None
+        self.btn_undo.configure(state="normal" if undo else "disabled", text=f"Undo {undo}" if undo else "Undo")
+        self.btn_redo.configure(state="normal" if redo else "disabled", text=f"Redo {redo}" if redo else "Redo")
+
+    @timed('undo', lambda app: len(app.item_data))
+    def undo(self):
+        if self.journal is None or (step := self.journal.undo()) is None: return
+        self._apply_pairs(step[1]); self._update_undo_buttons(); self.set_status(f"Undid {step[0]}")
+
+    @timed('redo', lambda app: len(app.item_data))
+    def redo(self):
+        if self.journal is None or (step := self.journal.redo()) is None: return
+        self._apply_pairs(step[1]); self._update_undo_buttons(); self.set_status(f"Redid {step[0]}")
+
+    def _apply_pairs(self, pairs):
+        # (old, new) steps from undo/redo, recovery and reloads from disk; None on the old side adds new, None on the new
+        # side deletes old. Returns the pairs that applied: one whose Id or AegisName is taken by another entry is skipped.
+        applied, reshaped = [], False
+        for old, new in pairs:
+            try:
+                if old is None:
+                    self.key_index.add(new); handle = self.table.add(new)
+                    self.search_index.add(handle, new); reshaped = True
+                else:
+                    if (handle := self.table.handle(old)) is None: continue
+                    if new is None:
+                        self.key_index.remove(old); self.search_index.remove(handle); self.table.remove(handle); reshaped = True
+                    else:
+                        self.key_index.replace(old, new); self.table.replace(handle, new); self.search_index.update(handle, new)
+            except DuplicateKeyError: continue
+            applied.append((old, new))
+        if reshaped and self.current_item_index not in self.table:
+            self.item_list.clear_selection(); self._hide_form()
+            self.editor_frame.configure(label_text="Select an item to edit")
+            self.current_item_index = None; self.btn_save_item.configure(state="disabled")
+        self.filter_item_list()
+        if self.current_item_index is not None:
+            self.item_list.select(self.current_item_index, see=False); self.display_item_details(self.table[self.current_item_index])
+        return applied
+
+    def _watch(self):
+        self.watcher.watch([db.path for db in self.project.files] if self.project is not None else [self.file_path])
+
+    def _on_disk_change(self, paths):
+        # Another program rewrote the open file: it is diffed against the loaded bytes on a worker thread and only the
+        # entries that changed are patched in. Projects, and lazy files written in place, can only be reloaded whole.
+        if self.project is not None or self.file_image is None or (self.lazy_source is not None and self.lazy_source.maps_path()):
+            self._offer_reload(paths); return
+        path, image = self.file_path, self.file_image
+        def work(progress):
+            stamp = stat_key(path)
+            with open(path, 'rb') as f: raw = f.read()
+            return diff_file(image, raw), stamp
+        AsyncTask(self, work, on_done=lambda diff, stamp: self._apply_disk_diff(path, image, diff, stamp), on_error=self._on_disk_error)
+
+    def _offer_reload(self, paths):
+        names = ", ".join(os.path.basename(p) for p in paths)
+        unsaved = self.journal is not None and self.journal.unsaved
+        if not messagebox.askyesno("Changed on Disk", f"{names} changed on disk. Reload?" + (" Your unsaved changes will be lost." if unsaved else "")):
+            self.watcher.sync(); return
+        if self.journal is not None: self.journal.close(); self.journal = None
+        self._load_started = (time.perf_counter(), rss_bytes())
+        if self.project is not None: self.project_mode_var.set(self.project.mode); self.load_project(self.project.path)
+        elif self.lazy_source is not None: self._open_lazy(self.file_path)
+        else: self.load_file(self.file_path)
+
+    def _on_disk_error(self, e):
+        self.watcher.sync()
+        self.set_status(f"{os.path.basename(self.file_path)} changed on disk but could not be read ({e}); keeping the loaded version")
+
+    def _apply_disk_diff(self, path, image, diff, stamp):
+        if path != self.file_path or image is not self.file_image: self.watcher.sync(); return  # reopened or saved meanwhile
+        take, conflicts = split_changes(diff.pairs, self.item_data, image, self.key_index)
+        if conflicts:
+            names = [f"{(mine or new).get('Id')} - {(mine or new).get('AegisName')}" for mine, new in conflicts]
+            if messagebox.askyesno("Changed on Disk", f"{os.path.basename(path)} was changed by another program, and these items also have unsaved edits here:\n\n"
+                                   + "\n".join(names[:20]) + ("\n..." if len(names) > 20 else "") + "\n\nTake the versions from disk? No keeps your edits; saving will overwrite the file with them."):
+                take += conflicts; conflicts = []
+        with self.perf.measure('disk_reload', parsed=diff.parsed, changed=len(diff.pairs)) as extra:
+            if diff.header is not None: self.header_data = diff.header
+            self.file_image = diff.image
+            if self.lazy_source is not None: self.lazy_source.rebase(diff.image.raw, diff.image, self.item_data)
+            applied = self._apply_pairs(take) if take else []
+            extra['entries'] = len(self.item_data)
+        if self.journal is not None: self.journal.restamp()
+        self.watcher.sync({path: stamp})
+        self.set_status(f"{os.path.basename(path)} changed on disk: {len(applied)} item(s) updated" + (f", {len(conflicts)} kept with your edits" if conflicts else "")
+                        + (f", {len(take) - len(applied)} skipped (duplicate Id or AegisName)" if len(applied) < len(take) else ""))
+
+    def open_merge(self):
+        # Merges another version of the open file (e.g. an rAthena update) into it. With the common base version this is a
+        # three-way merge; without one, items only in theirs are added and items that differ are conflicts.
+        theirs = filedialog.askopenfilename(title="Merge: their version (e.g. the updated upstream item_db.yml)", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")))
+        if not theirs: return
+        base = filedialog.askopenfilename(title="Merge: common base version (Cancel to compare without one)", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")))
+        body = self.item_data; ours = Version(self.header_data, list(body))
+        self.btn_merge.configure(state="disabled"); self.set_status(f"Merging {os.path.basename(theirs)}...", 0)
+        def work(progress):
+            versions = load_versions([p for p in (base, theirs) if p], ITEM_SCHEMA, cache=self.parse_cache)
+            return merge3(versions[0] if base else Version({}, []), ours, versions[-1]),
+        AsyncTask(self, work, on_done=lambda result: self._on_merged(theirs, body, result), on_error=self._on_merge_error)
+
+    def _on_merge_error(self, e):
+        self.btn_merge.configure(state="normal"); self.set_status("Merge failed")
+        messagebox.showerror("Merge Error", str(e))
+
+    def _on_merged(self, path, body, result):
+        # Applied as one undoable step; nothing is written until the file is saved as usual.
+        if body is not self.item_data: return  # another file was opened meanwhile
+        self.btn_merge.configure(state="normal")
+        with self.perf.measure('merge', entries=len(self.item_data), compared=result.compared, conflicts=len(result.conflicts)):
+            applied = self._apply_pairs(result.pairs) if result.pairs else []
+            if applied: self._journal(f"merge {os.path.basename(path)}", applied)
+        self.conflicts = result.conflicts
+        self.set_status(f"Merged {os.path.basename(path)}: {result.taken} item(s) from theirs, {len(self.conflicts)} conflict(s)"
+                        + (f", {len(result.pairs) - len(applied)} skipped (duplicate Id or AegisName)" if len(applied) < len(result.pairs) else ""))
+        if self.conflicts: self.next_conflict()
+
+    def next_conflict(self):
+        if not self.conflicts: self.conflict_frame.grid_remove(); self.set_status("No merge conflicts left"); return
+        current = self.table[self.current_item_index].get('Id') if self.current_item_index in self.table else None
+        keys = sorted(self.conflicts)
+        key = next((k for k in keys if current is not None and k > current), keys[0])
+        if (item := self.key_index.get(key)) is None: self.conflicts.pop(key); self.next_conflict(); return
+        self.select_item(item)
+
+    def select_item(self, item):
+        if (handle := self.table.handle(item)) is None: return
+        if handle not in self.item_list.positions: self.search_var.set(""); self.filter_item_list()
+        self.item_list.select(handle)
+
+    def resolve_conflict(self, side):
+        if self.current_item_index is None: return
+        item = self.table[self.current_item_index]
+        if (conflict := self.conflicts.pop(item.get('Id'), None)) is None: return
+        if (new := conflict.resolve(side, item)) is not item:
+            applied = self._apply_pairs([(item, new)])
+            if applied: self._journal(f"{'take theirs' if side == 'theirs' else 'keep ours'} {item.get('AegisName')}", applied)
+            else: self.conflicts[item.get('Id')] = conflict; messagebox.showerror("Duplicate Key", "Their version clashes with another item's Id or AegisName."); return
+        self.next_conflict()
 
     def _get_full_data_dict(self): return {'Header': self.header_data, 'Body': self.item_data}
 
     def save_file(self):
         if not self.file_path: self.save_file_as(); return
+        if self.project is not None:
+            try:
+                with self.perf.measure('save_file', entries=len(self.item_data), mode="project") as extra:
+                    saved = self.project.save(self.item_data); extra['files'] = len(saved)
+                if self.journal is not None: self.journal.compact()
+                self._watch()
+                messagebox.showinfo("Success", "Saved " + (", ".join(os.path.basename(p) for p in saved) if saved else "nothing, no changes"))
+            except Exception as e: messagebox.showerror("Save Error", str(e))
+            return
         try:
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                yaml.dump(self._get_full_data_dict(), f, Dumper=NoAliasDumper, sort_keys=False, indent=2)
+            with self.perf.measure('save_file', entries=len(self.item_data), file=os.path.basename(self.file_path), incremental=self.file_image is not None):
+                self.parse_cache.invalidate(self.file_path)
+                self.file_image = save_db(self.file_path, self.header_data, self.item_data, self.file_image, before_write=self._release_lazy)
+            if self.journal is not None: self.journal.compact(self.file_path)
+            self._watch()
             messagebox.showinfo("Success", f"File saved to {self.file_path}")
         except Exception as e: messagebox.showerror("Save Error", str(e))
     
     def save_file_as(self):
-        if not (path := filedialog.asksaveasfilename(defaultextension=".yml", filetypes=(("YAML files", "*.yml"),("All files", "*.*")), initialfile="item_db.yml")): return
+        if not (path := filedialog.asksaveasfilename(defaultextension=".yml", filetypes=(("YAML files", "*.yml"), ("SQLite databases", " ".join("*" + e for e in SQLITE_EXTENSIONS)), ("All files", "*.*")), initialfile="item_db.yml")): return
+        if os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS or self.sql is not None: self._export(path); return
         self.file_path = path; self.save_file()
         self.title(f"rAthena Item DB YML Editor - {os.path.basename(path)}")
 
+    def _export(self, path):
+        # A .db/.sqlite target gets an item_db_re table (replaced if it exists); in SQLite mode a YAML target gets the
+        # whole table. Either way the editor stays on what it has open.
+        try:
+            body = self.sql.body() if self.sql is not None else self.item_data
+            with self.perf.measure('export', entries=len(body), file=os.path.basename(path)):
+                if os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS:
+                    if self.sql is not None and os.path.abspath(path) == os.path.abspath(self.sql.path): messagebox.showerror("Save Error", "That is the open database."); return
+                    export_sqlite(path, ITEM_SCHEMA, body, header=self.header_data)
+                else: save_db(path, self.header_data, body)
+            messagebox.showinfo("Success", f"Exported {len(body)} items to {path}")
+        except (OSError, sqlite3.Error) as e: messagebox.showerror("Save Error", str(e))
+
 if __name__ == "__main__":
     app = App()
     app.mainloop()
@@ -0,0 +1,60 @@
+from bisect import bisect_left, insort
+
+class DuplicateKeyError(ValueError): pass
+
+def _name_key(name): return str(name).lower()
+
+class PrimaryKeyIndex:
+    # Id -> entry and AegisName -> entry, plus a sorted Id list for free-Id lookups.
+    def __init__(self, entries=()):
+        self.by_id, self.by_name, self.ids = {}, {}, []
+        self.duplicates = []
+        for entry in entries:
+            try: self.add(entry)
+            except DuplicateKeyError as e: self.duplicates.append(str(e))
+
+    def __len__(self): return len(self.by_id)
+
+    def __contains__(self, entry_id): return entry_id in self.by_id
+
+    def get(self, entry_id): return self.by_id.get(entry_id)
+
+    def get_by_name(self, name): return self.by_name.get(_name_key(name))
+
+    def first_gap(self, start=1):
+        # Smallest unused Id >= start. The ids are unique and sorted, so ids[j] - j only grows and
+        # the first hole after position lo can be found by bisection.
+        lo = bisect_left(self.ids, start)
+        if lo == len(self.ids) or self.ids[lo] > start: return start
+        base, hi = self.ids[lo] - lo, len(self.ids)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.ids[mid] - mid == base: lo = mid + 1
+            else: hi = mid
+        return self.ids[lo - 1] + 1
+
+    def check(self, entry, replacing=None):
+        entry_id, name = entry.get('Id'), entry.get('AegisName')
+        if (other := self.by_id.get(entry_id)) is not None and other is not replacing:
+            raise DuplicateKeyError(f"Id {entry_id} is already used by '{other.get('AegisName', 'N/A')}'.")
+        if name is not None and (other := self.by_name.get(_name_key(name))) is not None and other is not replacing:
+            raise DuplicateKeyError(f"AegisName '{name}' is already used by Id {other.get('Id')}.")
+
+    def add(self, entry):
+        self.check(entry)
+        entry_id, name = entry.get('Id'), entry.get('AegisName')
+        self.by_id[entry_id] = entry
+        if isinstance(entry_id, int): insort(self.ids, entry_id)
+        if name is not None: self.by_name[_name_key(name)] = entry
+
+    def remove(self, entry):
+        entry_id, name = entry.get('Id'), entry.get('AegisName')
+        if self.by_id.get(entry_id) is entry:
+            del self.by_id[entry_id]
+            if isinstance(entry_id, int) and (i := bisect_left(self.ids, entry_id)) < len(self.ids) and self.ids[i] == entry_id:
+                del self.ids[i]
+        if name is not None and self.by_name.get(_name_key(name)) is entry: del self.by_name[_name_key(name)]
+
+    def replace(self, old, new):
+        self.check(new, replacing=old)
+        self.remove(old); self.add(new)
@@ -0,0 +1,118 @@
+import mmap
+import os
+import re
+from collections import OrderedDict
+from collections.abc import Mapping
+import yaml
+
+from db_loader import DBLoadError, SafeLoader, read_header
+from db_writer import FileImage, scan_layout
+
+LRU_SIZE = 512
+SUMMARY_KEYS = ('Id', 'AegisName', 'Name')
+_MISSING = object()
+_PLAIN_INT = re.compile(rb'-?\d+')
+_PLAIN_NAME = re.compile(rb"[A-Za-z_][\w .()'-]*")
+_YAML_WORDS = {b'y', b'n', b'yes', b'no', b'true', b'false', b'on', b'off', b'null'}
+
+def _scalar(key, text):
+    text = text.rstrip()
+    if key == 'Id' and _PLAIN_INT.fullmatch(text): return int(text)
+    if key != 'Id' and _PLAIN_NAME.fullmatch(text) and not text.endswith(b' ') and text.lower() not in _YAML_WORDS: return text.decode('utf-8')
+    try: return yaml.load(text, Loader=SafeLoader)
+    except yaml.YAMLError: return _MISSING
+
+class LazyEntry(Mapping):
+    # Read-only stand-in for a Body entry: Id/AegisName/Name come from the offset scan, anything else parses the entry.
+    __slots__ = ('_source', '_span', '_summary')
+
+    def __init__(self, source, span, summary):
+        self._source, self._span, self._summary = source, span, summary
+
+    def _known(self, key):
+        return self._summary[SUMMARY_KEYS.index(key)] if key in SUMMARY_KEYS else _MISSING
+
+    def get(self, key, default=None):
+        if (value := self._known(key)) is not _MISSING: return value
+        return self._source.entry(self).get(key, default)
+
+    def __getitem__(self, key):
+        if (value := self._known(key)) is not _MISSING: return value
+        return self._source.entry(self)[key]
+
+    def __contains__(self, key): return self._known(key) is not _MISSING or key in self._source.entry(self)
+
+    def __iter__(self): return iter(self._source.entry(self))
+
+    def __len__(self): return len(self._source.entry(self))
+
+    def __repr__(self): return f"LazyEntry(Id={self._summary[0]!r})"
+
+class LazySource:
+    # Memory-mapped file plus an LRU of fully parsed entries.
+    def __init__(self, path, cache_size=LRU_SIZE):
+        self.path, self.cache_size = path, cache_size
+        self._file = open(path, 'rb')
+        try: self.raw = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError: self.raw = b''  # empty file
+        self.parsed = OrderedDict()
+
+    def entry(self, proxy):
+        key = id(proxy)
+        if (entry := self.parsed.get(key)) is not None:
+            self.parsed.move_to_end(key); return entry
+        start, end = proxy._span
+        try: data = yaml.load(self.raw[start:end], Loader=SafeLoader)
+        except yaml.YAMLError as e: raise DBLoadError(f"Entry {proxy._summary[0]} could not be parsed: {e}")
+        if not (isinstance(data, list) and len(data) == 1 and isinstance(data[0], dict)):
+            raise DBLoadError(f"Entry {proxy._summary[0]} could not be parsed.")
+        entry = self.parsed[key] = data[0]
+        if len(self.parsed) > self.cache_size: self.parsed.popitem(last=False)
+        return entry
+
+    def rebase(self, raw, image, body):
+        # After a save the proxies point into the freshly rendered bytes so the old mapping can be released.
+        for proxy in body:
+            if isinstance(proxy, LazyEntry) and (span := image.spans.get(id(proxy))) is not None: proxy._span = span
+        self.close()
+        self.raw = raw
+
+    def maps_path(self):
+        # True while the mapping is of the file now at path; a change reported for it then was written in place,
+        # and the mapped bytes can no longer be trusted as the old version.
+        if self._file is None: return False
+        try: return os.path.samestat(os.fstat(self._file.fileno()), os.stat(self.path))
+        except OSError: return False
+
+    def close(self):
+        if isinstance(self.raw, mmap.mmap): self.raw.close()
+        if self._file is not None: self._file.close(); self._file = None
+
+def open_lazy(path, db_type, cache_size=LRU_SIZE):
+    # Returns (header, body of LazyEntry, FileImage, LazySource) after a single regex scan; no entry is parsed.
+    header = read_header(path)
+    if header is None or header.get('Type') != db_type:
+        raise DBLoadError(f"This does not appear to be a valid {db_type} YAML file.")
+    source = LazySource(path, cache_size)
+    raw = source.raw
+    if (layout := scan_layout(raw)) is None:
+        source.close()
+        raise DBLoadError("The Body of this file cannot be opened lazily; open it normally instead.")
+    starts, suffix_start, indent, newline = layout
+    pad, key_pad = b' ' * indent, b' ' * (indent + 2)
+    summary_line = re.compile(rb'^(?:' + pad + rb'- ' + rb'|' + key_pad + rb')(Id|AegisName|Name):[ \t]*([^\r\n]*)', re.M)
+    # A value continued on deeper-indented lines (block scalar, folded plain text) is left for the full parse.
+    continued = re.compile(rb'(?:[ \t]*\r?\n)+' + key_pad + rb'[ \t]')
+    bounds = starts + [suffix_start]
+    summaries = [[_MISSING] * len(SUMMARY_KEYS) for _ in starts]
+    row = 0
+    for m in summary_line.finditer(raw, starts[0], suffix_start):
+        while m.start() >= bounds[row + 1]: row += 1
+        key = m.group(1).decode()
+        summaries[row][SUMMARY_KEYS.index(key)] = _MISSING if continued.match(raw, m.end()) else _scalar(key, m.group(2))
+    spans = [(bounds[i], bounds[i + 1]) for i in range(len(starts))]
+    body = [LazyEntry(source, span, tuple(s)) for span, s in zip(spans, summaries)]
+    if any(e._summary[0] is _MISSING for e in body):
+        source.close()
+        raise DBLoadError("Some Body entries do not start with an Id; open the file normally instead.")
+    return header, body, FileImage(raw, starts[0], suffix_start, spans, body, indent, newline), source
@@ -1,25 +1,33 @@
 import customtkinter as ctk
 from tkinter import filedialog, messagebox, simpledialog, ttk
-import yaml
 import os
+import sqlite3
+import time
+from bulk_ops import DROP_FIELDS, HAS_NUMPY, NUMERIC_FIELDS, ROUNDING, MobTable
+from db_core import MOB_SCHEMA, MOB_TEMPLATE, get_path, is_query
+from db_loader import AsyncLoad, AsyncTask, DBLoadError, HAS_LIBYAML, check_header
+from db_project import MODES, Project
+from parse_cache import ParseCache
+from virtual_list import VirtualTreeview
+from search_index import SearchIndex
+from db_writer import FileImage, save_db
+from key_index import DuplicateKeyError, PrimaryKeyIndex
+from record_store import compact_entries
+from lazy_body import open_lazy
+from perf_log import PerfLog, format_record, rss_bytes, timed
+from change_journal import ChangeJournal, JournalMismatch, resolve_step
+from file_watch import FileWatcher, diff_file, split_changes, stat_key
+from xref_index import DropIndex, ItemRefIndex
+from db_sqlite import EXTENSIONS as SQLITE_EXTENSIONS, SqlTable, export_sqlite
+from db_merge import Version, load_versions, merge3
+from entry_table import EntryTable, cell_text
 
-class NoAliasDumper(yaml.SafeDumper):
-    def ignore_aliases(self, data):
-        return True
-
-MOB_TEMPLATE = {
-    'Id': 0, 'AegisName': 'NEW_MOB', 'Name': 'New Mob', 'JapaneseName': 'New Mob',
-    'Level': 1, 'Hp': 1, 'Sp': 1, 'BaseExp': 0, 'JobExp': 0, 'MvpExp': 0,
-    'Attack': 0, 'Attack2': 0, 'Defense': 0, 'MagicDefense': 0,
-    'Resistance': 0, 'MagicResistance': 0, 'Str': 1, 'Agi': 1, 'Vit': 1,
-    'Int': 1, 'Dex': 1, 'Luk': 1, 'AttackRange': 0, 'SkillRange': 0,
-    'ChaseRange': 0, 'Size': 'Small', 'Race': 'Formless',
-    'RaceGroups': {}, 'Element': 'Neutral', 'ElementLevel': 1,
-    'WalkSpeed': 'DEFAULT_WALK_SPEED', 'AttackDelay': 0, 'AttackMotion': 0,
-    'ClientAttackMotion': 0, 'DamageMotion': 0, 'DamageTaken': 100,
-    'GroupId': 0, 'Title': 'None', 'Ai': '06', 'Class': 'Normal',
-    'Modes': {}, 'MvpDrops': [], 'Drops': []
-}
+LIST_FIELDS = {k for k, v in MOB_TEMPLATE.items() if isinstance(v, list)}
+DICT_FIELDS = {k for k, v in MOB_TEMPLATE.items() if isinstance(v, dict)}
+
+SEARCH_DEBOUNCE_MS = 150
+COLUMN_FIELDS = {"ID": 'Id', "AegisName": 'AegisName'}
+SHOWN_FIELDS = [k for k in MOB_TEMPLATE if k not in COLUMN_FIELDS.values()]
 
 class App(ctk.CTk):
     def __init__(self):
@@ -27,20 +35,50 @@ class App(ctk.CTk):
 
         self.title("rAthena Mob DB YML Editor")
         self.geometry("1200x800")
+        self.protocol("WM_DELETE_WINDOW", self.on_close)
         ctk.set_appearance_mode("dark")
 
         self.file_path = None
+        self.parse_cache = ParseCache()
+        self.file_image = None
+        self.lazy_source = None
+        self.project = None
+        self.sql = None
+        self.perf = PerfLog("mobdb_editor", on_record=lambda rec: self.perf_label.configure(text=format_record(rec)))
+        self._load_started = None
+        self.journal = None
+        self.watcher = FileWatcher(self, self._on_disk_change)
         self.header_data = {}
         self.mob_data = []
+        self.search_index = SearchIndex()
+        self.key_index = PrimaryKeyIndex()
+        self.drop_index = DropIndex()
+        self.item_refs = ItemRefIndex()
+        self.table = EntryTable([], MOB_SCHEMA)
+        self._filter_job = None
         self.current_mob_index = None
+        self.conflicts = {}
         
-        self.sort_by_column = "ID"
-        self.sort_reverse_order = False
+        self.sort_keys = [('Id', False)]
+        self.list_field_var = ctk.StringVar(value='Level')
 
         self.grid_columnconfigure(0, weight=1)
         self.grid_columnconfigure(1, weight=3)
         self.grid_rowconfigure(1, weight=1)
 
+        self.status_frame = ctk.CTkFrame(self, height=24, corner_radius=0)
+        self.status_frame.grid(row=2, column=0, columnspan=2, sticky="ew")
+        self.status_frame.grid_columnconfigure(0, weight=1)
+        self.status_label = ctk.CTkLabel(self.status_frame, text="Ready" + ("" if HAS_LIBYAML else " (libyaml not available, using pure-Python parser)"), anchor="w")
+        self.status_label.grid(row=0, column=0, sticky="ew", padx=10)
+        self.status_progress = ctk.CTkProgressBar(self.status_frame, width=200)
+        self.status_progress.set(0)
+        self.perf_label = ctk.CTkLabel(self.status_frame, text="", anchor="e", text_color="gray70")
+        self.perf_label.grid(row=0, column=2, sticky="e", padx=10)
+        self.profile_var = ctk.BooleanVar(value=False)
+        self.profile_switch = ctk.CTkSwitch(self.status_frame, text="Profile", variable=self.profile_var, command=self.toggle_profile)
+        self.profile_switch.grid(row=0, column=3, padx=10)
+
         self.menu_frame = ctk.CTkFrame(self, height=30, corner_radius=0)
         self.menu_frame.grid(row=0, column=0, columnspan=2, sticky="ew")
         self.btn_open = ctk.CTkButton(self.menu_frame, text="Open", command=self.load_file)
@@ -49,6 +87,28 @@ class App(ctk.CTk):
         self.btn_save.pack(side="left", padx=5, pady=5)
         self.btn_save_as = ctk.CTkButton(self.menu_frame, text="Save As...", command=self.save_file_as, state="disabled")
         self.btn_save_as.pack(side="left", padx=5, pady=5)
+        self.btn_open_project = ctk.CTkButton(self.menu_frame, text="Open Project...", command=self.load_project)
+        self.btn_open_project.pack(side="left", padx=5, pady=5)
+        self.btn_open_sqlite = ctk.CTkButton(self.menu_frame, text="Open SQLite...", command=self.load_sqlite)
+        self.btn_open_sqlite.pack(side="left", padx=5, pady=5)
+        self.btn_merge = ctk.CTkButton(self.menu_frame, text="Merge...", command=self.open_merge, state="disabled")
+        self.btn_merge.pack(side="left", padx=5, pady=5)
+        self.project_mode_var = ctk.StringVar(value=MODES[0])
+        self.project_mode_menu = ctk.CTkOptionMenu(self.menu_frame, values=list(MODES), variable=self.project_mode_var, width=110)
+        self.project_mode_menu.pack(side="left", padx=5, pady=5)
+        self.lazy_open_var = ctk.BooleanVar(value=False)
+        self.chk_lazy_open = ctk.CTkCheckBox(self.menu_frame, text="Lazy open (large files)", variable=self.lazy_open_var)
+        self.chk_lazy_open.pack(side="left", padx=5, pady=5)
+        self.btn_bulk_edit = ctk.CTkButton(self.menu_frame, text="Bulk Edit...", command=self.open_bulk_edit, state="disabled")
+        self.btn_bulk_edit.pack(side="left", padx=5, pady=5)
+        self.btn_undo = ctk.CTkButton(self.menu_frame, text="Undo", command=self.undo, state="disabled")
+        self.btn_undo.pack(side="left", padx=5, pady=5)
+        self.btn_redo = ctk.CTkButton(self.menu_frame, text="Redo", command=self.redo, state="disabled")
+        self.btn_redo.pack(side="left", padx=5, pady=5)
+        self.btn_attach_items = ctk.CTkButton(self.menu_frame, text="Attach Item DB...", command=self.attach_item_db)
+        self.btn_attach_items.pack(side="left", padx=5, pady=5)
+        self.btn_who_drops = ctk.CTkButton(self.menu_frame, text="Who Drops...", command=self.show_droppers, state="disabled")
+        self.btn_who_drops.pack(side="left", padx=5, pady=5)
 
         self.left_frame = ctk.CTkFrame(self)
         self.left_frame.grid(row=1, column=0, sticky="nsew", padx=10, pady=10)
@@ -58,8 +118,8 @@ class App(ctk.CTk):
         ctk.CTkLabel(self.left_frame, text="Monsters", font=ctk.CTkFont(size=16, weight="bold")).grid(row=0, column=0, columnspan=2, pady=(5,0))
         
         self.search_var = ctk.StringVar()
-        self.search_var.trace_add("write", self.filter_mob_list)
-        self.search_entry = ctk.CTkEntry(self.left_frame, textvariable=self.search_var, placeholder_text="Search by ID or AegisName...")
+        self.search_var.trace_add("write", self._schedule_filter)
+        self.search_entry = ctk.CTkEntry(self.left_frame, textvariable=self.search_var, placeholder_text="ID or AegisName, or a query: Race=Demon AND Level<90")
         self.search_entry.grid(row=1, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
 
         style = ttk.Style()
@@ -69,17 +129,18 @@ class App(ctk.CTk):
         style.configure("Treeview.Heading", background="#242424", foreground="white", relief="flat")
         style.map("Treeview.Heading", background=[('active', '#343434')])
 
-        self.mob_list_tree = ttk.Treeview(self.left_frame, columns=("ID", "AegisName"), show="headings")
-        self.mob_list_tree.heading("ID", text="ID ▼", command=lambda: self.sort_treeview_column("ID"))
-        self.mob_list_tree.heading("AegisName", text="AegisName", command=lambda: self.sort_treeview_column("AegisName"))
+        self.mob_list_tree = ttk.Treeview(self.left_frame, columns=("ID", "AegisName", "Field"), show="headings")
+        for col in ("ID", "AegisName", "Field"):
+            self.mob_list_tree.heading(col, command=lambda c=col: self.sort_treeview_column(c))
+        self.mob_list_tree.bind("<Shift-Button-1>", self._on_heading_shift_click)
         self.mob_list_tree.column("ID", width=80)
         self.mob_list_tree.column("AegisName", width=200)
+        self.mob_list_tree.column("Field", width=100)
         self.mob_list_tree.grid(row=2, column=0, sticky="nsew", padx=(5,0))
-        self.mob_list_tree.bind("<<TreeviewSelect>>", self.on_mob_select)
 
-        self.mob_list_scrollbar = ttk.Scrollbar(self.left_frame, orient="vertical", command=self.mob_list_tree.yview)
-        self.mob_list_tree.configure(yscrollcommand=self.mob_list_scrollbar.set)
+        self.mob_list_scrollbar = ttk.Scrollbar(self.left_frame, orient="vertical")
         self.mob_list_scrollbar.grid(row=2, column=1, sticky="ns", padx=(0,5))
+        self.mob_list = VirtualTreeview(self.mob_list_tree, self.mob_list_scrollbar, self._mob_row_values, on_select=self.on_mob_select)
 
         self.btn_frame = ctk.CTkFrame(self.left_frame)
         self.btn_frame.grid(row=3, column=0, columnspan=2, sticky="ew", pady=5)
@@ -89,6 +150,10 @@ class App(ctk.CTk):
         self.btn_add_mob.grid(row=0, column=0, padx=5, pady=5, sticky="ew")
         self.btn_delete_mob = ctk.CTkButton(self.btn_frame, text="Delete Selected", command=self.delete_mob, state="disabled")
         self.btn_delete_mob.grid(row=0, column=1, padx=5, pady=5, sticky="ew")
+        field_label = ctk.CTkLabel(self.btn_frame, text="Third column:", anchor="w")
+        field_label.grid(row=1, column=0, padx=5, sticky="ew")
+        self.field_menu = ctk.CTkOptionMenu(self.btn_frame, values=SHOWN_FIELDS, variable=self.list_field_var, command=self.set_list_field)
+        self.field_menu.grid(row=1, column=1, padx=5, pady=(0, 5), sticky="ew")
 
         self.editor_outer_frame = ctk.CTkFrame(self)
         self.editor_outer_frame.grid(row=1, column=1, sticky="nsew", padx=(0, 10), pady=10)
@@ -104,205 +169,1052 @@ class App(ctk.CTk):
         self.editor_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=5, pady=5)
         self.editor_frame.grid_columnconfigure(1, weight=1)
         self.entry_widgets = {}
+        self.form_rows = {}
+        self._form_grid = {}
+
+        self.conflict_frame = ctk.CTkFrame(self.editor_outer_frame, fg_color="#5a2d2d")
+        self.conflict_frame.grid_columnconfigure(0, weight=1)
+        self.conflict_label = ctk.CTkLabel(self.conflict_frame, text="", anchor="w", justify="left")
+        self.conflict_label.grid(row=0, column=0, rowspan=3, sticky="ew", padx=10, pady=5)
+        btn_keep = ctk.CTkButton(self.conflict_frame, text="Keep Ours", command=lambda: self.resolve_conflict('ours'))
+        btn_keep.grid(row=0, column=1, padx=5, pady=2)
+        btn_take = ctk.CTkButton(self.conflict_frame, text="Take Theirs", command=lambda: self.resolve_conflict('theirs'))
+        btn_take.grid(row=1, column=1, padx=5, pady=2)
+        btn_next = ctk.CTkButton(self.conflict_frame, text="Next Conflict", command=self.next_conflict)
+        btn_next.grid(row=2, column=1, padx=5, pady=2)
 
-    def sort_treeview_column(self, col):
-        if self.sort_by_column == col:
-            self.sort_reverse_order = not self.sort_reverse_order
+    @timed('sort', lambda app: len(app.mob_data))
+    def sort_treeview_column(self, col, add=False):
+        # A click sorts by the column (again: reverses it); Shift+click adds it as a further key or reverses that key.
+        field = self._column_field(col)
+        pos = next((i for i, (f, _) in enumerate(self.sort_keys) if f == field), None)
+        if add and pos is not None:
+            self.sort_keys[pos] = (field, not self.sort_keys[pos][1])
+        elif add:
+            self.sort_keys.append((field, False))
+        elif pos == 0:
+            self.sort_keys[0] = (field, not self.sort_keys[0][1])
         else:
-            self.sort_by_column = col
-            self.sort_reverse_order = False
-
-        if col == "ID":
-            self.mob_data.sort(key=lambda mob: int(mob.get('Id', 0)), reverse=self.sort_reverse_order)
-        elif col == "AegisName":
-            self.mob_data.sort(key=lambda mob: mob.get('AegisName', '').lower(), reverse=self.sort_reverse_order)
-
-        for c in ("ID", "AegisName"):
-            text = c
-            if c == self.sort_by_column:
-                text += " ▼" if not self.sort_reverse_order else " ▲"
-            self.mob_list_tree.heading(c, text=text)
-        
+            self.sort_keys = [(field, False)]
+        self._update_headings()
         self.filter_mob_list()
+        if self.current_mob_index is not None:
+            self.mob_list.see(self.current_mob_index)
 
-    def filter_mob_list(self, *args):
-        search_term = self.search_var.get().lower()
-        self.mob_list_tree.unbind("<<TreeviewSelect>>")
-        self.mob_list_tree.delete(*self.mob_list_tree.get_children())
-        
-        for i, mob in enumerate(self.mob_data):
-            mob_id_str = str(mob.get('Id', ''))
-            mob_name_str = mob.get('AegisName', '').lower()
-            
-            if search_term in mob_id_str or search_term in mob_name_str:
-                self.mob_list_tree.insert("", "end", iid=i, values=(mob_id_str, mob.get('AegisName', '')))
-        
-        self.mob_list_tree.bind("<<TreeviewSelect>>", self.on_mob_select)
+    def _on_heading_shift_click(self, event):
+        if self.mob_list_tree.identify_region(event.x, event.y) != "heading":
+            return
+        if column := self.mob_list_tree.identify_column(event.x):
+            self.sort_treeview_column(self.mob_list_tree["columns"][int(column[1:]) - 1], add=True)
+        return "break"
+
+    def _column_field(self, col):
+        return COLUMN_FIELDS.get(col) or self.list_field_var.get()
+
+    def _update_headings(self):
+        ranks = {field: (i, reverse) for i, (field, reverse) in enumerate(self.sort_keys)}
+        for col in ("ID", "AegisName", "Field"):
+            text = col if col != "Field" else self._column_field(col)
+            rank = ranks.get(self._column_field(col))
+            if rank is not None:
+                text += " ▲" if rank[1] else " ▼"
+                if len(self.sort_keys) > 1:
+                    text += str(rank[0] + 1)
+            self.mob_list_tree.heading(col, text=text)
+
+    def set_list_field(self, field):
+        # A field that was only shown leaves the sort with the column.
+        self.sort_keys = [k for k in self.sort_keys if k[0] in COLUMN_FIELDS.values()] or [('Id', False)]
+        if self.sql is not None:
+            self.sql.show(field)
+        self._update_headings()
+        self.filter_mob_list()
+
+    def _schedule_filter(self, *args):
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+        self._filter_job = self.after(SEARCH_DEBOUNCE_MS, self.filter_mob_list)
+
+    @timed('filter', lambda app: len(app.mob_data))
+    def filter_mob_list(self, *args, keep_top=False):
+        if self._filter_job:
+            self.after_cancel(self._filter_job)
+            self._filter_job = None
+
+        text = self.search_var.get()
+        try:
+            if self.sql is not None:
+                matches = self._sql_view(text)
+            else:
+                matches = self.search_index.query(text, MOB_SCHEMA) if is_query(text) else self.search_index.search(text)
+        except ValueError as e:
+            self.set_status(f"Query: {e}")
+            return
+        if self.sql is not None:
+            self.mob_list.set_rows(matches, keep_top=keep_top)
+            return
+        order = self.table.order(self.sort_keys)
+        if matches is not None:
+            order = self.table.select(order, matches)
+        self.mob_list.set_rows(order, keep_top=keep_top)
+
+    def _sql_view(self, text):
+        # SQLite mode: the search runs as a WHERE clause and the sort keys as ORDER BY; rows are Ids.
+        if is_query(text):
+            where, params = self.sql.where_query(text)
+        else:
+            where, params = self.sql.where_search(text)
+        order = [(column, reverse) for field, reverse in self.sort_keys if (column := self.sql.column(field)) is not None]
+        return self.sql.ids(where, params, order)
+
+    def _mob_row_values(self, i):
+        if self.sql is not None:
+            return self.sql.row(i)
+        mob = self.table[i]
+        return (str(mob.get('Id', '')), mob.get('AegisName', ''), cell_text(get_path(mob, self.list_field_var.get(), MOB_SCHEMA)))
         
-    def load_file(self):
-        path = filedialog.askopenfilename(title="Open mob_db.yml", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")))
+    def on_close(self):
+        # Quitting with nothing unsaved drops the journal; otherwise it stays for recovery on the next open.
+        if self.journal is not None and not self.journal.unsaved:
+            self.journal.close()
+        self._close_sql()
+        self.destroy()
+
+    def set_status(self, text, progress=None):
+        self.status_label.configure(text=text)
+        if progress is None:
+            self.status_progress.grid_remove()
+        else:
+            self.status_progress.set(progress)
+            self.status_progress.grid(row=0, column=1, padx=10)
+
+    def toggle_profile(self):
+        # cProfile covers the Tk thread only; background parsing shows up as its wait time.
+        if self.profile_var.get():
+            self.perf.start_profile()
+            self.set_status(f"Profiling; switch off to write a .prof file to {self.perf.directory}")
+        elif (path := self.perf.stop_profile()):
+            self.set_status(f"Profile written to {path}")
+
+    def load_file(self, path=None):
+        path = path or filedialog.askopenfilename(title="Open mob_db.yml", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")))
+        if not path: return
+        try:
+            check_header(path, 'MOB_DB')
+        except DBLoadError as e:
+            messagebox.showerror("Error", str(e)); return
+        except Exception as e:
+            messagebox.showerror("Error Loading File", str(e)); return
+        self._load_started = (time.perf_counter(), rss_bytes())
+        if self.lazy_open_var.get():
+            self._open_lazy(path)
+            return
+
+        self.btn_open.configure(state="disabled")
+        self.set_status(f"Loading {os.path.basename(path)}...", 0)
+        AsyncLoad(self, path, 'MOB_DB', on_done=lambda data, prepared: self._on_file_loaded(path, data, *prepared), on_error=self._on_load_error, cache=self.parse_cache,
+                  prepare=self._prepare_loaded,
+                  on_progress=lambda p: self.set_status(f"Loading {os.path.basename(path)}... {int(p * 100)}%", p))
+
+    @staticmethod
+    def _prepare_loaded(data, raw):
+        # Runs on the loader thread; must not touch Tk.
+        body = data['Body'] = compact_entries(MOB_SCHEMA, data['Body'])
+        return SearchIndex(enumerate(body)), FileImage.scan(raw, body), PrimaryKeyIndex(body), DropIndex(body)
+
+    def _open_lazy(self, path):
+        # Only the Id/AegisName offset scan runs here; entries are parsed when selected. The drop index,
+        # which needs every entry, is built the first time it is used.
+        try:
+            header, body, image, source = open_lazy(path, 'MOB_DB')
+        except (DBLoadError, OSError) as e:
+            messagebox.showerror("Error", str(e)); return
+        self._on_file_loaded(path, {'Header': header, 'Body': body}, SearchIndex(enumerate(body)), image, PrimaryKeyIndex(body), None, source)
+
+    def load_project(self, path=None):
+        # Opens db/mob_db.yml (or any file with Footer Imports) and every file it imports for the selected mode.
+        path = path or filedialog.askopenfilename(title="Open db/mob_db.yml", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")))
+        if not path: return
+        try:
+            check_header(path, 'MOB_DB')
+        except DBLoadError as e:
+            messagebox.showerror("Error", str(e)); return
+        except Exception as e:
+            messagebox.showerror("Error Loading File", str(e)); return
+
+        self.btn_open.configure(state="disabled")
+        self.btn_open_project.configure(state="disabled")
+        self._load_started = (time.perf_counter(), rss_bytes())
+        self.set_status(f"Loading project {os.path.basename(path)}...", 0)
+        mode = self.project_mode_var.get()
+
+        def work(progress):
+            project = Project.open(path, MOB_SCHEMA, mode, cache=self.parse_cache, compact=True, progress=progress)
+            return project, SearchIndex(enumerate(project.body)), DropIndex(project.body)
+
+        AsyncTask(self, work, on_done=lambda project, index, drops: self._on_project_loaded(path, project, index, drops), on_error=self._on_load_error,
+                  on_progress=lambda p: self.set_status(f"Loading project {os.path.basename(path)}... {int(p * 100)}%", p))
+
+    def load_sqlite(self, path=None):
+        # Edits a mob_db_re table in place (written by Save As... or ryde_cli export-sqlite): the list, search and sort
+        # are SQL queries, rows are fetched a page at a time and every mob save is committed straight away.
+        path = path or filedialog.askopenfilename(title="Open SQLite database", filetypes=(("SQLite databases", " ".join("*" + e for e in SQLITE_EXTENSIONS)), ("All files", "*.*")))
         if not path: return
+        self._load_started = (time.perf_counter(), rss_bytes())
         try:
-            with open(path, 'r', encoding='utf-8') as f: data = yaml.safe_load(f)
-
-            if not isinstance(data, dict):
-                messagebox.showerror("Error", "Invalid YAML file: Does not contain a valid structure."); return
-            
-            if data.get('Header', {}).get('Type') != 'MOB_DB':
-                messagebox.showerror("Error", "This does not appear to be a valid MOB_DB YAML file."); return
-            
-            self.file_path = path
-            self.header_data = data.get('Header', {})
-            self.mob_data = data.get('Body', [])
-            self.populate_mob_list()
-            
-            self.btn_save.configure(state="normal")
-            self.btn_save_as.configure(state="normal")
-            self.btn_add_mob.configure(state="normal")
-            self.btn_delete_mob.configure(state="normal")
-            self.title(f"rAthena Mob DB YML Editor - {os.path.basename(path)}")
-        except Exception as e: messagebox.showerror("Error Loading File", str(e))
+            sql = SqlTable(path, MOB_SCHEMA)
+            header = sql.header()
+        except sqlite3.Error as e:
+            messagebox.showerror("Error", f"{os.path.basename(path)}: {e}")
+            return
+        self._close_sql()
+        self.watcher.stop()
+        if self.lazy_source is not None:
+            self.lazy_source.close()
+            self.lazy_source = None
+        self.sql = sql
+        self.project = None
+        self.journal = None
+        self.file_path = path
+        self.file_image = None
+        self.header_data = header
+        self.mob_data = []
+        self.search_index = SearchIndex()
+        self.key_index = PrimaryKeyIndex()
+        self.drop_index = DropIndex()
+        self.table = EntryTable([], MOB_SCHEMA)
+        sql.show(self.list_field_var.get())
+        self.populate_mob_list()
+        self._update_undo_buttons()
+
+        self.btn_save.configure(state="disabled")
+        self.btn_save_as.configure(state="normal")
+        self.btn_add_mob.configure(state="normal")
+        self.btn_delete_mob.configure(state="normal")
+        self.btn_bulk_edit.configure(state="disabled")
+        self.btn_who_drops.configure(state="normal")
+        self.btn_merge.configure(state="disabled")
+        self.conflicts = {}
+        self.conflict_frame.grid_remove()
+        self.title(f"rAthena Mob DB YML Editor - {os.path.basename(path)} ({sql.table})")
+        count = len(self.mob_list)
+        self.perf.record('load', time.perf_counter() - self._load_started[0], self._load_started[1],
+                         entries=count, file=os.path.basename(path), mode="sqlite")
+        self._load_started = None
+        self.set_status(f"Opened {count} mobs from {sql.table} in {os.path.basename(path)}; changes are committed as you save each mob")
+
+    def _close_sql(self):
+        if self.sql is not None:
+            self.sql.close()
+            self.sql = None
+
+    def _on_project_loaded(self, path, project, index, drops):
+        self._on_file_loaded(path, {'Header': project.header, 'Body': project.body}, index, None, project.keys, drops, project=project)
+        self.btn_save_as.configure(state="disabled")
+        status = f"Loaded {len(project.body)} mobs from {len(project.files)} files ({project.mode})"
+        if project.missing:
+            status += f", missing imports: {', '.join(project.missing)}"
+        self.set_status(status)
+
+    def _release_lazy(self, raw, image):
+        if self.lazy_source is not None:
+            self.lazy_source.rebase(raw, image, self.mob_data)
+
+    def _drops(self):
+        if self.drop_index is None:
+            self.drop_index = DropIndex(self.mob_data)
+        return self.drop_index
+
+    def _on_file_loaded(self, path, data, index, image, keys, drops, source=None, project=None):
+        self.btn_open.configure(state="normal")
+        self.btn_open_project.configure(state="normal")
+        self._close_sql()
+        if self.lazy_source is not None:
+            self.lazy_source.close()
+        self.lazy_source = source
+        self.project = project
+        self.file_path = path
+        self.header_data = data.get('Header', {})
+        self.mob_data = data.get('Body', [])
+        self.search_index = index
+        self.file_image = image
+        self.key_index = keys
+        self.drop_index = drops
+        self.table = EntryTable(self.mob_data, MOB_SCHEMA)
+        self.populate_mob_list()
+
+        self.btn_save.configure(state="normal")
+        self.btn_save_as.configure(state="normal")
+        self.btn_add_mob.configure(state="normal")
+        self.btn_delete_mob.configure(state="normal")
+        self.btn_bulk_edit.configure(state="normal" if HAS_NUMPY else "disabled")
+        self.btn_who_drops.configure(state="normal")
+        self.btn_merge.configure(state="disabled" if source is not None else "normal")
+        self.conflicts = {}
+        self.conflict_frame.grid_remove()
+        self.title(f"rAthena Mob DB YML Editor - {os.path.basename(path)}")
+        if self._load_started is not None:
+            mode = "project" if project is not None else "lazy" if source is not None else "full"
+            self.perf.record('load', time.perf_counter() - self._load_started[0], self._load_started[1],
+                             entries=len(self.mob_data), file=os.path.basename(path), mode=mode)
+            self._load_started = None
+        status = f"Loaded {len(self.mob_data)} mobs from {os.path.basename(path)}"
+        if keys.duplicates:
+            status += f" ({len(keys.duplicates)} duplicate keys)"
+            messagebox.showwarning("Duplicate Keys", "\n".join(keys.duplicates[:20]) + ("\n..." if len(keys.duplicates) > 20 else ""))
+        self.set_status(status)
+        self._open_journal(path)
+        self._watch()
+
+    def _on_load_error(self, e):
+        self.btn_open.configure(state="normal")
+        self.btn_open_project.configure(state="normal")
+        self.set_status("Load failed")
+        if isinstance(e, DBLoadError): messagebox.showerror("Error", str(e))
+        else: messagebox.showerror("Error Loading File", str(e))
 
     def populate_mob_list(self):
-        self.sort_by_column = "ID"
-        self.sort_reverse_order = False
-        if self.mob_data:
-            self.mob_data.sort(key=lambda mob: int(mob.get('Id', 0)), reverse=False)
+        # Shown by Id; the Body itself keeps the file's order.
+        self.sort_keys = [('Id', False)]
+        self.mob_list.clear_selection()
+        self.current_mob_index = None
         self.search_var.set("")
-        
-        self.mob_list_tree.heading("ID", text="ID ▼")
-        self.mob_list_tree.heading("AegisName", text="AegisName")
+        self._update_headings()
         self.filter_mob_list()
 
+    @timed('select', lambda app: len(app.mob_data))
     def on_mob_select(self, event=None):
-        if not (selected_items := self.mob_list_tree.selection()): return
+        if not (selected_items := self.mob_list.selection()): return
         selected_iid = int(selected_items[0])
         self.current_mob_index = selected_iid
-        mob = self.mob_data[selected_iid]
+        mob = self.sql.get(selected_iid) if self.sql is not None else self.table[selected_iid]
+        if mob is None:
+            return
         self.display_mob_details(mob)
         self.btn_save_mob.configure(state="normal")
 
     def display_mob_details(self, mob):
-        for widget in self.editor_frame.winfo_children(): widget.destroy()
-        self.entry_widgets = {}
-        self.editor_frame.configure(label_text=f"Editing: {mob.get('Id')} - {mob.get('AegisName')}")
-        full_mob_data = MOB_TEMPLATE.copy(); full_mob_data.update(mob)
+        source = ""
+        if self.project is not None and self.project.source_of(mob):
+            source = f" ({os.path.relpath(self.project.source_of(mob), os.path.dirname(self.project.path))})"
+        self.editor_frame.configure(label_text=f"Editing: {mob.get('Id')} - {mob.get('AegisName')}{source}")
+        full_mob_data = MOB_SCHEMA.merge_template(mob)
+        shown = {}
         row_counter = 0
         for key, value in full_mob_data.items():
-            lbl = ctk.CTkLabel(self.editor_frame, text=key); lbl.grid(row=row_counter, column=0, padx=10, pady=5, sticky="w")
-            if isinstance(value, list):
-                widget = self._create_list_editor(self.editor_frame, key, value)
-            elif isinstance(value, dict):
-                widget = self._create_dict_editor(self.editor_frame, key, value)
+            lbl, widget, kind = self._form_row(key, self._field_kind(key, value))
+            if kind == 'list':
+                self._set_list_editor(widget, value or [])
+            elif kind == 'dict':
+                self._set_dict_editor(widget, value or {})
             else:
-                widget = ctk.CTkEntry(self.editor_frame); widget.insert(0, str(value))
-            widget.grid(row=row_counter, column=1, padx=5, pady=5, sticky="ew")
-            self.entry_widgets[key] = widget
+                widget.delete(0, "end")
+                widget.insert(0, str(value))
+            if self._form_grid.get(key) != row_counter:
+                lbl.grid(row=row_counter, column=0, padx=10, pady=5, sticky="w")
+                widget.grid(row=row_counter, column=1, padx=5, pady=5, sticky="ew")
+                self._form_grid[key] = row_counter
+            shown[key] = widget
             row_counter += 1
+        for key in [k for k in self._form_grid if k not in shown]:
+            self._hide_form_row(key)
+        self.entry_widgets = shown
+        self._show_conflict(mob)
+
+    def _show_conflict(self, mob):
+        conflict = self.conflicts.get(mob.get('Id'))
+        if conflict is None:
+            self.conflict_frame.grid_remove()
+            return
+        self.conflict_label.configure(text=f"Merge conflict ({len(self.conflicts)} left):\n{conflict.describe()}")
+        self.conflict_frame.grid(row=2, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
+
+    def _field_kind(self, key, value):
+        if isinstance(value, list) or (value is None and key in LIST_FIELDS):
+            return 'list'
+        if isinstance(value, dict) or (value is None and key in DICT_FIELDS):
+            return 'dict'
+        return 'entry'
+
+    def _form_row(self, key, kind):
+        # Widgets are built once per field and reused across selections; only a type change rebuilds one.
+        row = self.form_rows.get(key)
+        if row is not None and row[2] == kind:
+            return row
+        if row is not None:
+            self._hide_form_row(key)
+            row[0].destroy()
+            row[1].destroy()
+        lbl = ctk.CTkLabel(self.editor_frame, text=key)
+        if kind == 'list':
+            widget = self._create_list_editor(self.editor_frame, key, [])
+        elif kind == 'dict':
+            widget = self._create_dict_editor(self.editor_frame, key, {})
+        else:
+            widget = ctk.CTkEntry(self.editor_frame)
+        row = (lbl, widget, kind)
+        self.form_rows[key] = row
+        return row
+
+    def _hide_form_row(self, key):
+        if self._form_grid.pop(key, None) is None:
+            return
+        lbl, widget, _ = self.form_rows[key]
+        lbl.grid_remove()
+        widget.grid_remove()
+
+    def _hide_form(self):
+        for key in list(self._form_grid):
+            self._hide_form_row(key)
+        self.entry_widgets = {}
 
     def _create_list_editor(self, parent, key, items):
         frame = ctk.CTkFrame(parent); frame.columnconfigure(0, weight=1)
         tree = ttk.Treeview(frame, columns=("Item", "Rate"), show="headings", height=max(3, len(items)))
         tree.heading("Item", text="Item"); tree.heading("Rate", text="Rate")
+        tree.tag_configure("unknown_item", foreground="#ff6b6b")
         tree.grid(row=0, column=0, columnspan=3, sticky="ew", padx=5, pady=5)
-        for item in items: tree.insert("", "end", values=(item.get("Item", ""), item.get("Rate", "")))
+        frame.tree = tree
+        self._set_list_editor(frame, items)
         def add_item():
             item_name = simpledialog.askstring("Input", "Enter Item Name:", parent=self)
             if not item_name: return
+            if not self._confirm_item_ref(item_name): return
+            if ref := self.item_refs.lookup(item_name): item_name = ref[0]
             rate = simpledialog.askinteger("Input", "Enter Rate:", parent=self, minvalue=1, maxvalue=10000)
-            if rate is not None: tree.insert("", "end", values=(item_name, rate))
+            if rate is not None: tree.insert("", "end", values=(item_name, rate), tags=self._drop_tags(item_name))
         def remove_item():
             if selected := tree.selection(): tree.delete(selected)
         ctk.CTkButton(frame, text="Add", width=60, command=add_item).grid(row=1, column=0, padx=5, pady=2, sticky="w")
         ctk.CTkButton(frame, text="Remove", width=60, command=remove_item).grid(row=1, column=1, padx=5, pady=2, sticky="w")
-        frame.tree = tree
         return frame
 
+    def _set_list_editor(self, frame, items):
+        tree = frame.tree
+        tree.delete(*tree.get_children())
+        for item in items: tree.insert("", "end", values=(item.get("Item", ""), item.get("Rate", "")), tags=self._drop_tags(item.get("Item", "")))
+        if int(tree.cget("height")) != max(3, len(items)):
+            tree.configure(height=max(3, len(items)))
+
     def _create_dict_editor(self, parent, key, items):
         frame = ctk.CTkFrame(parent); frame.columnconfigure(0, weight=1)
         text_widget = ctk.CTkTextbox(frame, height=max(60, len(items) * 25))
-        text_content = "\n".join([f"{k}: {v}" for k, v in items.items()])
-        if text_content: text_widget.insert("1.0", text_content)
         text_widget.grid(row=0, column=0, sticky="ew")
         frame.textbox = text_widget
+        frame.textbox_height = max(60, len(items) * 25)
+        self._set_dict_editor(frame, items)
         return frame
+
+    def _set_dict_editor(self, frame, items):
+        frame.textbox.delete("1.0", "end")
+        text_content = MOB_SCHEMA.format_dict_text(items)
+        if text_content: frame.textbox.insert("1.0", text_content)
+        height = max(60, len(items) * 25)
+        if height != frame.textbox_height:
+            frame.textbox.configure(height=height)
+            frame.textbox_height = height
         
     def save_current_mob(self):
         if self.current_mob_index is None: return
         new_mob_data = {}
         try:
-            for key, widget in self.entry_widgets.items():
-                if isinstance(widget, ctk.CTkEntry):
-                    value = widget.get()
-                    if key in ['Id', 'Level', 'Hp', 'Sp', 'BaseExp', 'JobExp', 'MvpExp', 'Attack', 'Attack2', 'Defense', 'MagicDefense', 'Resistance', 'MagicResistance', 'Str', 'Agi', 'Vit', 'Int', 'Dex', 'Luk', 'AttackRange', 'SkillRange', 'ChaseRange', 'ElementLevel', 'AttackDelay', 'AttackMotion', 'ClientAttackMotion', 'DamageMotion', 'DamageTaken', 'GroupId']:
-                        new_mob_data[key] = int(value) if value.isdigit() else 0
-                    else: new_mob_data[key] = value
-                elif isinstance(widget, ctk.CTkFrame) and hasattr(widget, 'tree'):
-                    items = [{'Item': widget.tree.item(c)['values'][0], 'Rate': int(widget.tree.item(c)['values'][1])} for c in widget.tree.get_children()]
-                    new_mob_data[key] = items
-                elif isinstance(widget, ctk.CTkFrame) and hasattr(widget, 'textbox'):
-                    items = {}
-                    if text_content := widget.textbox.get("1.0", "end-1c").strip():
-                        for line in text_content.split('\n'):
-                            if ':' in line:
-                                k, v = (s.strip() for s in line.split(':', 1))
-                                if v.lower() == 'true': items[k] = True
-                                elif v.lower() == 'false': items[k] = False
-                                else: items[k] = v
-                    new_mob_data[key] = items
-            clean_mob_data = {}
-            for key, value in new_mob_data.items():
-                if key in MOB_TEMPLATE and value == MOB_TEMPLATE[key] and key not in ['Id', 'AegisName', 'Name']: continue
-                if key in ['MvpDrops', 'Drops', 'Modes', 'RaceGroups'] and not value: continue
-                clean_mob_data[key] = value
-            self.mob_data[self.current_mob_index] = clean_mob_data
-            self.filter_mob_list()
-            self.mob_list_tree.selection_set(str(self.current_mob_index))
+            with self.perf.measure('save_entry', entries=len(self.mob_data)):
+                for key, widget in self.entry_widgets.items():
+                    if isinstance(widget, ctk.CTkEntry):
+                        new_mob_data[key] = MOB_SCHEMA.coerce_field(key, widget.get())
+                    elif isinstance(widget, ctk.CTkFrame) and hasattr(widget, 'tree'):
+                        items = [MOB_SCHEMA.make_drop(*widget.tree.item(c)['values'][:2]) for c in widget.tree.get_children()]
+                        new_mob_data[key] = items
+                    elif isinstance(widget, ctk.CTkFrame) and hasattr(widget, 'textbox'):
+                        new_mob_data[key] = MOB_SCHEMA.parse_dict_text(widget.textbox.get("1.0", "end-1c"))
+                clean_mob_data = MOB_SCHEMA.clean(new_mob_data)
+                if self.sql is not None:
+                    duplicate = self._sql_put(self.current_mob_index, clean_mob_data)
+                else:
+                    try:
+                        self.key_index.replace(self.table[self.current_mob_index], clean_mob_data)
+                        duplicate = None
+                    except DuplicateKeyError as e:
+                        duplicate = e
+                if duplicate is None and self.sql is None:
+                    old_mob = self.table[self.current_mob_index]
+                    if self.drop_index is not None:
+                        self.drop_index.replace(old_mob, clean_mob_data)
+                    self.table.replace(self.current_mob_index, clean_mob_data)
+                    self.search_index.update(self.current_mob_index, clean_mob_data)
+                    self.filter_mob_list()
+                    self.mob_list.select(self.current_mob_index)
+                    self._journal(f"edit {clean_mob_data.get('AegisName')}", [(old_mob, clean_mob_data)])
+            if duplicate is not None:
+                messagebox.showerror("Duplicate Key", str(duplicate))
+                return
             messagebox.showinfo("Success", f"Mob '{clean_mob_data['AegisName']}' updated.")
         except Exception as e: messagebox.showerror("Save Error", f"An error occurred: {e}")
 
+    def _sql_put(self, old_id, mob):
+        # Returns the DuplicateKeyError instead of raising it, like the in-memory branch of save_current_mob.
+        try:
+            self.sql.put(old_id, mob)
+        except DuplicateKeyError as e:
+            return e
+        self.current_mob_index = mob.get('Id')
+        self.filter_mob_list()
+        self.mob_list.select(self.current_mob_index)
+        return None
+
+    @timed('add', lambda app: len(app.mob_data))
     def add_mob(self):
-        new_mob = {'Id': 1001, 'AegisName': 'NEW_MOB_1001', 'Name': 'New Mob'}
-        if self.mob_data: new_mob['Id'] = max(m.get('Id', 0) for m in self.mob_data) + 1
-        new_mob['AegisName'] = f"MOB_{new_mob['Id']}"
-        self.mob_data.append(new_mob)
-        self.sort_treeview_column(self.sort_by_column)
-        for i, item in enumerate(self.mob_list_tree.get_children()):
-             if self.mob_data[int(item)].get('Id') == new_mob['Id']:
-                 self.mob_list_tree.selection_set(item)
-                 self.mob_list_tree.see(item)
-                 break
+        if self.sql is not None:
+            new_id = self.sql.first_gap(MOB_SCHEMA.default_id)
+            aegis_name = f"MOB_{new_id}"
+            while self.sql.get_by_name(aegis_name) is not None:
+                aegis_name += '_'
+            self._sql_put(None, {'Id': new_id, 'AegisName': aegis_name, 'Name': 'New Mob'})
+            return
+        new_id = self.key_index.first_gap(MOB_SCHEMA.default_id)
+        aegis_name = f"MOB_{new_id}"
+        while self.key_index.get_by_name(aegis_name) is not None:
+            aegis_name += '_'
+        new_mob = {'Id': new_id, 'AegisName': aegis_name, 'Name': 'New Mob'}
+        self.key_index.add(new_mob)
+        handle = self.table.add(new_mob)
+        self.search_index.add(handle, new_mob)
+        self.filter_mob_list()
+        self.mob_list.select(handle)
+        self._journal(f"add {aegis_name}", [(None, new_mob)])
 
     def delete_mob(self):
-        if not (selected_items := self.mob_list_tree.selection()):
+        if not (selected_items := self.mob_list.selection()):
             messagebox.showwarning("Warning", "Please select a mob to delete.")
             return
         selected_iid = int(selected_items[0])
-        mob_name = self.mob_data[selected_iid].get('AegisName', 'N/A')
-        if messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {mob_name}?"):
-            self.mob_data.pop(selected_iid)
+        if self.sql is not None:
+            mob_name = self.sql.row(selected_iid)[1]
+        else:
+            mob_name = self.table[selected_iid].get('AegisName', 'N/A')
+        if not messagebox.askyesno("Confirm Delete", f"Are you sure you want to delete {mob_name}?"):
+            return
+        if self.sql is not None:
+            self.sql.delete(selected_iid)
+            self.mob_list.clear_selection()
+            self.filter_mob_list()
+            self._hide_form()
+            self.editor_frame.configure(label_text="Select a mob to edit")
+            self.current_mob_index = None
+            self.btn_save_mob.configure(state="disabled")
+            return
+        with self.perf.measure('delete', entries=len(self.mob_data)):
+            removed = self.table[selected_iid]
+            self.table.remove(selected_iid)
+            self.search_index.remove(selected_iid)
+            self.key_index.remove(removed)
+            if self.drop_index is not None:
+                self.drop_index.remove(removed)
+            self.mob_list.clear_selection()
             self.filter_mob_list()
-            for widget in self.editor_frame.winfo_children(): widget.destroy()
+            self._hide_form()
+            self.editor_frame.configure(label_text="Select a mob to edit")
+            self.current_mob_index = None
+            self.btn_save_mob.configure(state="disabled")
+            self._journal(f"delete {removed.get('AegisName')}", [(removed, None)])
+
+    def open_bulk_edit(self):
+        if not HAS_NUMPY:
+            messagebox.showerror("Bulk Edit", "NumPy is required for bulk editing.")
+            return
+        BulkEditDialog(self)
+
+    @timed('bulk_apply', lambda app: len(app.mob_data))
+    def apply_entry_changes(self, pairs, label):
+        # pairs are (old_entry, new_entry); recorded as one undoable, journalled step.
+        applied = self._apply_pairs(pairs)
+        self._journal(label, applied)
+
+    def _open_journal(self, path):
+        # Unsaved steps from a previous session are replayed on top of the file just loaded if the user agrees.
+        self.journal = ChangeJournal(path)
+        try:
+            steps = self.journal.pending()
+        except JournalMismatch as e:
+            self.journal.set_aside()
+            steps = []
+            messagebox.showwarning("Change Journal", f"{e}\nThe old journal was kept as {os.path.basename(self.journal.log_path)}.bak.")
+        if steps and messagebox.askyesno("Recover Changes", f"{len(steps)} unsaved change(s) to {os.path.basename(path)} were found from a previous session. Recover them?"):
+            missed = 0
+            for label, changes in steps:
+                pairs, skipped = resolve_step(self.key_index, changes)
+                applied = self._apply_pairs(pairs)
+                missed += skipped + len(pairs) - len(applied)
+                if applied:
+                    self.journal.adopt(label, applied)
+            self.set_status(f"Recovered {len(steps)} change(s)" + (f", {missed} could not be applied" if missed else ""))
+        else:
+            self.journal.start()
+        self._update_undo_buttons()
+
+    def _journal(self, label, pairs):
+        if self.journal is not None:
+            self.journal.record(label, pairs)
+            self._update_undo_buttons()
+
+    def _update_undo_buttons(self):
+        undo = self.journal.undo_stack[-1][0] if self.journal is not None and self.journal.undo_stack else None
+        redo = self.journal.redo_stack[-1][0] if self.journal is not None and self.journal.redo_stack else None
+        self.btn_undo.configure(state="normal" if undo else "disabled", text=f"Undo {undo}" if undo else "Undo")
+        self.btn_redo.configure(state="normal" if redo else "disabled", text=f"Redo {redo}" if redo else "Redo")
+
+    @timed('undo', lambda app: len(app.mob_data))
+    def undo(self):
+        if self.journal is None or (step := self.journal.undo()) is None:
+            return
+        self._apply_pairs(step[1])
+        self._update_undo_buttons()
+        self.set_status(f"Undid {step[0]}")
+
+    @timed('redo', lambda app: len(app.mob_data))
+    def redo(self):
+        if self.journal is None or (step := self.journal.redo()) is None:
+            return
+        self._apply_pairs(step[1])
+        self._update_undo_buttons()
+        self.set_status(f"Redid {step[0]}")
+
+    def _apply_pairs(self, pairs):
+        # (old, new) steps from bulk edits, undo/redo, recovery and reloads from disk; None on the old side adds new,
+        # None on the new side deletes old. Returns the pairs that applied: one whose Id or AegisName is taken by
+        # another entry is skipped.
+        applied = []
+        reshaped = False
+        for old, new in pairs:
+            try:
+                if old is None:
+                    self.key_index.add(new)
+                    handle = self.table.add(new)
+                    self.search_index.add(handle, new)
+                    if self.drop_index is not None:
+                        self.drop_index.add(new)
+                    reshaped = True
+                    applied.append((old, new))
+                    continue
+                handle = self.table.handle(old)
+                if handle is None:
+                    continue
+                if new is None:
+                    self.key_index.remove(old)
+                    self.search_index.remove(handle)
+                    if self.drop_index is not None:
+                        self.drop_index.remove(old)
+                    self.table.remove(handle)
+                    reshaped = True
+                else:
+                    self.key_index.replace(old, new)
+                    self.table.replace(handle, new)
+                    self.search_index.update(handle, new)
+                    if self.drop_index is not None:
+                        self.drop_index.replace(old, new)
+            except DuplicateKeyError:
+                continue
+            applied.append((old, new))
+        if reshaped and self.current_mob_index not in self.table:
+            self.mob_list.clear_selection()
+            self._hide_form()
             self.editor_frame.configure(label_text="Select a mob to edit")
             self.current_mob_index = None
             self.btn_save_mob.configure(state="disabled")
+        self.filter_mob_list(keep_top=True)
+        if self.current_mob_index is not None:
+            self.mob_list.select(self.current_mob_index, see=False)
+            self.display_mob_details(self.table[self.current_mob_index])
+        return applied
+
+    def _watch(self):
+        if self.project is not None:
+            self.watcher.watch([db.path for db in self.project.files])
+        else:
+            self.watcher.watch([self.file_path])
+
+    def _on_disk_change(self, paths):
+        # Another program rewrote the open file: it is diffed against the loaded bytes on a worker thread and
+        # only the entries that changed are patched in. Projects, and lazy files written in place, can only be
+        # reloaded whole.
+        if self.project is not None or self.file_image is None or (self.lazy_source is not None and self.lazy_source.maps_path()):
+            self._offer_reload(paths)
+            return
+        path, image = self.file_path, self.file_image
+
+        def work(progress):
+            stamp = stat_key(path)
+            with open(path, 'rb') as f:
+                raw = f.read()
+            return diff_file(image, raw), stamp
+
+        AsyncTask(self, work, on_done=lambda diff, stamp: self._apply_disk_diff(path, image, diff, stamp), on_error=self._on_disk_error)
+
+    def _offer_reload(self, paths):
+        names = ", ".join(os.path.basename(p) for p in paths)
+        unsaved = self.journal is not None and self.journal.unsaved
+        if not messagebox.askyesno("Changed on Disk", f"{names} changed on disk. Reload?" + (" Your unsaved changes will be lost." if unsaved else "")):
+            self.watcher.sync()
+            return
+        if self.journal is not None:
+            self.journal.close()
+            self.journal = None
+        self._load_started = (time.perf_counter(), rss_bytes())
+        if self.project is not None:
+            self.project_mode_var.set(self.project.mode)
+            self.load_project(self.project.path)
+        elif self.lazy_source is not None:
+            self._open_lazy(self.file_path)
+        else:
+            self.load_file(self.file_path)
+
+    def _on_disk_error(self, e):
+        self.watcher.sync()
+        self.set_status(f"{os.path.basename(self.file_path)} changed on disk but could not be read ({e}); keeping the loaded version")
+
+    def _apply_disk_diff(self, path, image, diff, stamp):
+        if path != self.file_path or image is not self.file_image:
+            # Reopened or saved while the diff ran.
+            self.watcher.sync()
+            return
+        take, conflicts = split_changes(diff.pairs, self.mob_data, image, self.key_index)
+        if conflicts:
+            names = [f"{(mine or new).get('Id')} - {(mine or new).get('AegisName')}" for mine, new in conflicts]
+            message = (f"{os.path.basename(path)} was changed by another program, and these mobs also have unsaved edits here:\n\n"
+                       + "\n".join(names[:20]) + ("\n..." if len(names) > 20 else "")
+                       + "\n\nTake the versions from disk? No keeps your edits; saving will overwrite the file with them.")
+            if messagebox.askyesno("Changed on Disk", message):
+                take += conflicts
+                conflicts = []
+        with self.perf.measure('disk_reload', parsed=diff.parsed, changed=len(diff.pairs)) as extra:
+            if diff.header is not None:
+                self.header_data = diff.header
+            self.file_image = diff.image
+            if self.lazy_source is not None:
+                self.lazy_source.rebase(diff.image.raw, diff.image, self.mob_data)
+            applied = self._apply_pairs(take) if take else []
+            extra['entries'] = len(self.mob_data)
+        if self.journal is not None:
+            self.journal.restamp()
+        self.watcher.sync({path: stamp})
+        status = f"{os.path.basename(path)} changed on disk: {len(applied)} mob(s) updated"
+        if conflicts:
+            status += f", {len(conflicts)} kept with your edits"
+        if len(applied) < len(take):
+            status += f", {len(take) - len(applied)} skipped (duplicate Id or AegisName)"
+        self.set_status(status)
+
+    def attach_item_db(self):
+        paths = filedialog.askopenfilenames(title="Attach item_db.yml", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")))
+        for path in paths:
+            try:
+                check_header(path, 'ITEM_DB')
+            except (DBLoadError, OSError) as e:
+                messagebox.showerror("Error", f"{os.path.basename(path)}: {e}")
+                continue
+            self.set_status(f"Indexing {os.path.basename(path)} in the background...")
+            AsyncLoad(self, path, 'ITEM_DB', cache=self.parse_cache,
+                      prepare=lambda data, raw, path=path: ItemRefIndex.names_from(data['Body'], path),
+                      on_done=lambda data, names, path=path: self._on_item_refs_loaded(path, names),
+                      on_error=lambda e, path=path: self._on_item_refs_error(path, e))
+
+    def _on_item_refs_loaded(self, path, names):
+        self.item_refs.attach(path, names)
+        self.set_status(f"Item references: {len(self.item_refs)} items from {len(self.item_refs.sources)} file(s)")
+        if self.current_mob_index is not None and self.entry_widgets:
+            for key in ('MvpDrops', 'Drops'):
+                if (widget := self.entry_widgets.get(key)) is not None and hasattr(widget, 'tree'):
+                    for child in widget.tree.get_children():
+                        widget.tree.item(child, tags=self._drop_tags(widget.tree.item(child)['values'][0]))
+
+    def _on_item_refs_error(self, path, e):
+        messagebox.showerror("Error Loading Item DB", f"{os.path.basename(path)}: {e}")
+
+    def _drop_tags(self, item_name):
+        return ("unknown_item",) if len(self.item_refs) and item_name not in self.item_refs else ()
+
+    def _confirm_item_ref(self, item_name):
+        if not len(self.item_refs) or item_name in self.item_refs:
+            return True
+        suggestions = self.item_refs.suggest(item_name)
+        hint = f"\nDid you mean: {', '.join(suggestions)}?" if suggestions else ""
+        return messagebox.askyesno("Unknown Item", f"'{item_name}' is not in the attached item databases.{hint}\n\nAdd it anyway?")
+
+    def show_droppers(self):
+        item_name = simpledialog.askstring("Who Drops", "Item AegisName:", parent=self)
+        if not item_name:
+            return
+        if self.sql is not None:
+            # The drop slots are indexed columns here; the list itself becomes the answer.
+            self.search_var.set(f"Drops.Item={item_name} OR MvpDrops.Item={item_name}")
+            self.filter_mob_list()
+            return
+        rows = self._drops().droppers(item_name)
+        if not rows:
+            messagebox.showinfo("Who Drops", f"No mob drops '{item_name}'.")
+            return
+        DroppersDialog(self, item_name, rows)
+
+    def select_mob(self, mob):
+        if self.search_var.get():
+            self.search_var.set("")
+            self.filter_mob_list()
+        handle = self.table.handle(mob)
+        if handle is not None:
+            self.mob_list.select(handle)
+
+    def open_merge(self):
+        # Merges another version of the open file (e.g. an rAthena update) into it. With the common base version this is a
+        # three-way merge; without one, mobs only in theirs are added and mobs that differ are conflicts.
+        filetypes = (("YAML files", "*.yml"), ("All files", "*.*"))
+        theirs = filedialog.askopenfilename(title="Merge: their version (e.g. the updated upstream mob_db.yml)", filetypes=filetypes)
+        if not theirs:
+            return
+        base = filedialog.askopenfilename(title="Merge: common base version (Cancel to compare without one)", filetypes=filetypes)
+        body = self.mob_data
+        ours = Version(self.header_data, list(body))
+        self.btn_merge.configure(state="disabled")
+        self.set_status(f"Merging {os.path.basename(theirs)}...", 0)
+
+        def work(progress):
+            versions = load_versions([p for p in (base, theirs) if p], MOB_SCHEMA, cache=self.parse_cache)
+            return merge3(versions[0] if base else Version({}, []), ours, versions[-1]),
+
+        AsyncTask(self, work, on_done=lambda result: self._on_merged(theirs, body, result), on_error=self._on_merge_error)
+
+    def _on_merge_error(self, e):
+        self.btn_merge.configure(state="normal")
+        self.set_status("Merge failed")
+        messagebox.showerror("Merge Error", str(e))
+
+    def _on_merged(self, path, body, result):
+        # Applied as one undoable step; nothing is written until the file is saved as usual.
+        if body is not self.mob_data:
+            return  # another file was opened meanwhile
+        self.btn_merge.configure(state="normal")
+        with self.perf.measure('merge', entries=len(self.mob_data), compared=result.compared, conflicts=len(result.conflicts)):
+            applied = self._apply_pairs(result.pairs) if result.pairs else []
+            if applied:
+                self._journal(f"merge {os.path.basename(path)}", applied)
+        self.conflicts = result.conflicts
+        status = f"Merged {os.path.basename(path)}: {result.taken} mob(s) from theirs, {len(self.conflicts)} conflict(s)"
+        if len(applied) < len(result.pairs):
+            status += f", {len(result.pairs) - len(applied)} skipped (duplicate Id or AegisName)"
+        self.set_status(status)
+        if self.conflicts:
+            self.next_conflict()
+
+    def next_conflict(self):
+        if not self.conflicts:
+            self.conflict_frame.grid_remove()
+            self.set_status("No merge conflicts left")
+            return
+        current = None
+        if self.current_mob_index in self.table:
+            current = self.table[self.current_mob_index].get('Id')
+        keys = sorted(self.conflicts)
+        key = next((k for k in keys if current is not None and k > current), keys[0])
+        mob = self.key_index.get(key)
+        if mob is None:
+            self.conflicts.pop(key)
+            self.next_conflict()
+            return
+        self.select_mob(mob)
+
+    def resolve_conflict(self, side):
+        if self.current_mob_index is None:
+            return
+        mob = self.table[self.current_mob_index]
+        conflict = self.conflicts.pop(mob.get('Id'), None)
+        if conflict is None:
+            return
+        new = conflict.resolve(side, mob)
+        if new is not mob:
+            applied = self._apply_pairs([(mob, new)])
+            if not applied:
+                self.conflicts[mob.get('Id')] = conflict
+                messagebox.showerror("Duplicate Key", "Their version clashes with another mob's Id or AegisName.")
+                return
+            self._journal(f"{'take theirs' if side == 'theirs' else 'keep ours'} {mob.get('AegisName')}", applied)
+        self.next_conflict()
 
     def _get_full_data_dict(self): return {'Header': self.header_data, 'Body': self.mob_data}
 
     def save_file(self):
         if not self.file_path: self.save_file_as(); return
+        if self.project is not None:
+            try:
+                with self.perf.measure('save_file', entries=len(self.mob_data), mode="project") as extra:
+                    saved = self.project.save(self.mob_data)
+                    extra['files'] = len(saved)
+                if self.journal is not None:
+                    self.journal.compact()
+                self._watch()
+                messagebox.showinfo("Success", "Saved " + (", ".join(os.path.basename(p) for p in saved) if saved else "nothing, no changes"))
+            except Exception as e: messagebox.showerror("Save Error", str(e))
+            return
         try:
-            with open(self.file_path, 'w', encoding='utf-8') as f:
-                yaml.dump(self._get_full_data_dict(), f, Dumper=NoAliasDumper, sort_keys=False, indent=2)
+            with self.perf.measure('save_file', entries=len(self.mob_data), file=os.path.basename(self.file_path), incremental=self.file_image is not None):
+                self.parse_cache.invalidate(self.file_path)
+                self.file_image = save_db(self.file_path, self.header_data, self.mob_data, self.file_image, before_write=self._release_lazy)
+            if self.journal is not None:
+                self.journal.compact(self.file_path)
+            self._watch()
             messagebox.showinfo("Success", f"File saved successfully to {self.file_path}")
         except Exception as e: messagebox.showerror("Save Error", str(e))
     
     def save_file_as(self):
-        if not (path := filedialog.asksaveasfilename(defaultextension=".yml", filetypes=(("YAML files", "*.yml"), ("All files", "*.*")), initialfile="mob_db.yml")): return
+        filetypes = (("YAML files", "*.yml"), ("SQLite databases", " ".join("*" + e for e in SQLITE_EXTENSIONS)), ("All files", "*.*"))
+        if not (path := filedialog.asksaveasfilename(defaultextension=".yml", filetypes=filetypes, initialfile="mob_db.yml")): return
+        if os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS or self.sql is not None:
+            self._export(path)
+            return
         self.file_path = path
         self.save_file()
         self.title(f"rAthena Mob DB YML Editor - {os.path.basename(path)}")
 
+    def _export(self, path):
+        # A .db/.sqlite target gets a mob_db_re table (replaced if it exists); in SQLite mode a YAML target gets the
+        # whole table. Either way the editor stays on what it has open.
+        try:
+            body = self.sql.body() if self.sql is not None else self.mob_data
+            with self.perf.measure('export', entries=len(body), file=os.path.basename(path)):
+                if os.path.splitext(path)[1].lower() in SQLITE_EXTENSIONS:
+                    if self.sql is not None and os.path.abspath(path) == os.path.abspath(self.sql.path):
+                        messagebox.showerror("Save Error", "That is the open database.")
+                        return
+                    export_sqlite(path, MOB_SCHEMA, body, header=self.header_data)
+                else:
+                    save_db(path, self.header_data, body)
+            messagebox.showinfo("Success", f"Exported {len(body)} mobs to {path}")
+        except (OSError, sqlite3.Error) as e:
+            messagebox.showerror("Save Error", str(e))
+
+
+class BulkEditDialog(ctk.CTkToplevel):
+    PREVIEW_LIMIT = 1000
+
+    def __init__(self, app):
+        super().__init__(app)
+        self.app = app
+        self.title("Bulk Edit Mobs")
+        self.geometry("760x560")
+        self.transient(app)
+        self.table = None
+        self.snapshot = []
+        self.change = None
+
+        self.grid_columnconfigure(1, weight=1)
+        self.grid_rowconfigure(6, weight=1)
+
+        ctk.CTkLabel(self, text="Filter").grid(row=0, column=0, padx=10, pady=5, sticky="w")
+        self.filter_entry = ctk.CTkEntry(self, placeholder_text="e.g. Modes.Mvp=true AND (Level>=80 OR Race=Demon)")
+        self.filter_entry.grid(row=0, column=1, columnspan=3, padx=5, pady=5, sticky="ew")
+
+        ctk.CTkLabel(self, text="Field").grid(row=1, column=0, padx=10, pady=5, sticky="w")
+        self.field_box = ctk.CTkComboBox(self, values=DROP_FIELDS + NUMERIC_FIELDS)
+        self.field_box.set(DROP_FIELDS[0])
+        self.field_box.grid(row=1, column=1, padx=5, pady=5, sticky="w")
+        ctk.CTkLabel(self, text="Rounding").grid(row=1, column=2, padx=10, pady=5, sticky="w")
+        self.rounding_box = ctk.CTkComboBox(self, values=list(ROUNDING))
+        self.rounding_box.set("round")
+        self.rounding_box.grid(row=1, column=3, padx=5, pady=5, sticky="w")
+
+        self.inputs = {}
+        for i, (name, default) in enumerate((("Factor", "1.0"), ("Offset", "0"), ("Min", ""), ("Max", ""))):
+            row, col = 2 + i // 2, (i % 2) * 2
+            ctk.CTkLabel(self, text=name).grid(row=row, column=col, padx=10, pady=5, sticky="w")
+            entry = ctk.CTkEntry(self)
+            if default:
+                entry.insert(0, default)
+            entry.grid(row=row, column=col + 1, padx=5, pady=5, sticky="w")
+            self.inputs[name] = entry
+
+        btn_frame = ctk.CTkFrame(self, fg_color="transparent")
+        btn_frame.grid(row=4, column=0, columnspan=4, sticky="ew", padx=5)
+        ctk.CTkButton(btn_frame, text="Preview", command=self.preview).pack(side="left", padx=5, pady=5)
+        self.btn_apply = ctk.CTkButton(btn_frame, text="Apply", command=self.apply, state="disabled")
+        self.btn_apply.pack(side="left", padx=5, pady=5)
+        self.summary = ctk.CTkLabel(self, text="", anchor="w")
+        self.summary.grid(row=5, column=0, columnspan=4, sticky="ew", padx=10)
+
+        self.preview_tree = ttk.Treeview(self, columns=("Id", "AegisName", "Field", "Old", "New"), show="headings")
+        for col, width in (("Id", 70), ("AegisName", 200), ("Field", 160), ("Old", 90), ("New", 90)):
+            self.preview_tree.heading(col, text=col)
+            self.preview_tree.column(col, width=width)
+        self.preview_tree.grid(row=6, column=0, columnspan=4, sticky="nsew", padx=10, pady=10)
+
+    def _number(self, name):
+        text = self.inputs[name].get().strip()
+        return float(text) if text else None
+
+    def _stale(self):
+        # The dialog is not modal: edits, undo or a reload from disk may have replaced mobs since the table was built.
+        body = self.app.mob_data
+        return self.table is None or self.table.body is not body or len(body) != len(self.snapshot) or any(a is not b for a, b in zip(body, self.snapshot))
+
+    def _compute(self):
+        if self._stale():
+            self.table = MobTable(self.app.mob_data)
+            self.snapshot = list(self.app.mob_data)
+        mask = self.table.mask(self.filter_entry.get())
+        factor, offset = self._number("Factor"), self._number("Offset")
+        return self.table.compute(self.field_box.get(), mask, factor=1.0 if factor is None else factor, offset=offset or 0.0,
+                                  minimum=self._number("Min"), maximum=self._number("Max"), rounding=self.rounding_box.get())
+
+    def preview(self):
+        try:
+            self.change = self._compute()
+        except (ValueError, KeyError) as e:
+            messagebox.showerror("Bulk Edit", str(e), parent=self)
+            return
+        self.preview_tree.delete(*self.preview_tree.get_children())
+        for values in self.change.preview(self.app.mob_data, self.PREVIEW_LIMIT):
+            self.preview_tree.insert("", "end", values=values)
+        rows = len(set(self.change.rows.tolist()))
+        more = f" (showing first {self.PREVIEW_LIMIT})" if len(self.change) > self.PREVIEW_LIMIT else ""
+        self.summary.configure(text=f"{len(self.change)} values in {rows} mobs will change{more}")
+        self.btn_apply.configure(state="normal" if len(self.change) else "disabled")
+
+    def apply(self):
+        if not self.change:
+            return
+        if self._stale():
+            self.preview()
+            messagebox.showinfo("Bulk Edit", "Mobs changed in the editor since the preview. Check the new preview and apply again.", parent=self)
+            return
+        updated = self.change.build_entries(self.app.mob_data)
+        pairs = [(self.app.mob_data[row], entry) for row, entry in updated.items()]
+        self.app.apply_entry_changes(pairs, f"bulk {self.change.field}")
+        self.app.set_status(f"Bulk edit changed {len(self.change)} values in {len(pairs)} mobs")
+        self.destroy()
+
+
+class DroppersDialog(ctk.CTkToplevel):
+    def __init__(self, app, item_name, rows):
+        super().__init__(app)
+        self.app = app
+        self.title(f"Mobs dropping {item_name}")
+        self.geometry("520x400")
+        self.transient(app)
+        self.grid_columnconfigure(0, weight=1)
+        self.grid_rowconfigure(0, weight=1)
+        tree = ttk.Treeview(self, columns=("Id", "AegisName", "List", "Rate"), show="headings")
+        for col, width in (("Id", 70), ("AegisName", 200), ("List", 90), ("Rate", 80)):
+            tree.heading(col, text=col)
+            tree.column(col, width=width)
+        self.mobs = {}
+        for mob, field, rate in rows:
+            iid = tree.insert("", "end", values=(mob.get('Id'), mob.get('AegisName', ''), field, rate))
+            self.mobs[iid] = mob
+        tree.grid(row=0, column=0, sticky="nsew", padx=10, pady=10)
+        tree.bind("<Double-1>", lambda e: self._jump(tree))
+        self.tree = tree
+
+    def _jump(self, tree):
+        if selected := tree.selection():
+            self.app.select_mob(self.mobs[selected[0]])
+
 
 if __name__ == "__main__":
     app = App()
@@ -0,0 +1,74 @@
+import hashlib
+import os
+import pickle
+import sys
+
+CACHE_VERSION = 1
+
+def user_cache_dir(app_name="ryde"):
+    if sys.platform == "win32": base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~\\AppData\\Local")
+    elif sys.platform == "darwin": base = os.path.expanduser("~/Library/Caches")
+    else: base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, app_name, "parse_cache")
+
+def content_hash(raw): return hashlib.blake2b(raw, digest_size=20).hexdigest()
+
+class ParseCache:
+    def __init__(self, cache_dir=None, max_bytes=256 * 1024 * 1024):
+        self.cache_dir = cache_dir or user_cache_dir()
+        self.max_bytes = max_bytes
+
+    def _entry_path(self, path):
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(path)).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, key + ".pickle")
+
+    def get(self, path, raw=None):
+        entry_path = self._entry_path(path)
+        try:
+            st = os.stat(path)
+            with open(entry_path, 'rb') as f: entry = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError, ValueError): return None
+        if entry.get('version') != CACHE_VERSION or entry.get('path') != os.path.abspath(path): return None
+        if entry.get('size') != st.st_size: return None
+        if entry.get('mtime_ns') != st.st_mtime_ns or raw is not None:
+            if raw is None:
+                with open(path, 'rb') as f: raw = f.read()
+            if entry.get('hash') != content_hash(raw): return None
+        try: os.utime(entry_path)
+        except OSError: pass
+        return entry['data']
+
+    def put(self, path, data, raw=None):
+        try:
+            st = os.stat(path)
+            if raw is None:
+                with open(path, 'rb') as f: raw = f.read()
+            entry = {'version': CACHE_VERSION, 'path': os.path.abspath(path), 'size': st.st_size,
+                     'mtime_ns': st.st_mtime_ns, 'hash': content_hash(raw), 'data': data}
+            os.makedirs(self.cache_dir, exist_ok=True)
+            entry_path = self._entry_path(path)
+            tmp_path = entry_path + ".tmp"
+            with open(tmp_path, 'wb') as f: pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, entry_path)
+            self.evict(keep=entry_path)
+        except OSError: pass
+
+    def invalidate(self, path):
+        try: os.remove(self._entry_path(path))
+        except OSError: pass
+
+    def evict(self, keep=None):
+        try: names = [n for n in os.listdir(self.cache_dir) if n.endswith(".pickle")]
+        except OSError: return
+        entries = []
+        for name in names:
+            full = os.path.join(self.cache_dir, name)
+            try: st = os.stat(full)
+            except OSError: continue
+            entries.append((st.st_mtime, st.st_size, full))
+        total = sum(size for _, size, _ in entries)
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes: break
+            if full == keep: continue
+            try: os.remove(full); total -= size
+            except OSError: pass
@@ -0,0 +1,112 @@
+import cProfile
+import functools
+import json
+import logging
+import logging.handlers
+import os
+import sys
+import time
+from contextlib import contextmanager
+
+from parse_cache import user_cache_dir
+
+LOG_MAX_BYTES = 2 * 1024 * 1024
+LOG_BACKUPS = 3
+
+def log_dir():
+    return os.path.join(os.path.dirname(user_cache_dir()), "logs")
+
+def rss_bytes():
+    # Resident set size of this process, or None where it cannot be read without extra packages.
+    try:
+        with open('/proc/self/statm') as f: return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError): pass
+    if sys.platform == "win32":
+        try:
+            import ctypes
+            from ctypes import wintypes
+            class Counters(ctypes.Structure):
+                _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD)] + [(n, ctypes.c_size_t) for n in (
+                    'PeakWorkingSetSize', 'WorkingSetSize', 'QuotaPeakPagedPoolUsage', 'QuotaPagedPoolUsage',
+                    'QuotaPeakNonPagedPoolUsage', 'QuotaNonPagedPoolUsage', 'PagefileUsage', 'PeakPagefileUsage')]
+            counters = Counters(); counters.cb = ctypes.sizeof(Counters)
+            if ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb):
+                return counters.WorkingSetSize
+        except (OSError, AttributeError): pass
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+    except ImportError: return None
+
+class PerfLog:
+    # Wall time, entry counts and RSS deltas per editor operation, appended to a rotating JSON-lines file.
+    def __init__(self, app_name, directory=None, on_record=None):
+        self.app_name, self.directory, self.on_record = app_name, directory or log_dir(), on_record
+        self.path = os.path.join(self.directory, f"{app_name}-perf.jsonl")
+        self.last, self.profiler = None, None
+        self.logger = logging.getLogger(f"ryde.perf.{app_name}")
+        self.logger.propagate = False; self.logger.setLevel(logging.INFO)
+        if not self.logger.handlers:
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                handler = logging.handlers.RotatingFileHandler(self.path, maxBytes=LOG_MAX_BYTES, backupCount=LOG_BACKUPS, encoding='utf-8')
+                handler.setFormatter(logging.Formatter('%(message)s'))
+                self.logger.addHandler(handler)
+            except OSError: self.logger.addHandler(logging.NullHandler())
+
+    def record(self, op, seconds, rss_before=None, **fields):
+        rss = rss_bytes()
+        rec = {'ts': time.strftime('%Y-%m-%dT%H:%M:%S'), 'app': self.app_name, 'op': op, 'ms': round(seconds * 1000, 3)}
+        rec.update(fields)
+        if rss is not None:
+            rec['rss_mb'] = round(rss / 1e6, 1)
+            if rss_before is not None: rec['rss_delta_mb'] = round((rss - rss_before) / 1e6, 2)
+        self.last = rec
+        self.logger.info(json.dumps(rec, default=str))
+        if self.on_record:
+            try: self.on_record(rec)
+            except Exception: pass
+        return rec
+
+    @contextmanager
+    def measure(self, op, **fields):
+        # The yielded dict collects extra fields (entries=..., matches=...) while the operation runs.
+        extra, rss_before, start = dict(fields), rss_bytes(), time.perf_counter()
+        try: yield extra
+        except BaseException as e:
+            extra['error'] = type(e).__name__; raise
+        finally: self.record(op, time.perf_counter() - start, rss_before, **extra)
+
+    def start_profile(self):
+        if self.profiler is None: self.profiler = cProfile.Profile(); self.profiler.enable()
+
+    def stop_profile(self):
+        # Returns the .prof path (load with pstats or snakeviz), or None when no capture was running.
+        if self.profiler is None: return None
+        self.profiler.disable()
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, f"{self.app_name}-{time.strftime('%Y%m%d-%H%M%S')}.prof")
+        self.profiler.dump_stats(path); self.profiler = None
+        return path
+
+    @property
+    def profiling(self): return self.profiler is not None
+
+def timed(op, entries=None):
+    # Method decorator for the App classes: expects self.perf; entries(self) adds the current entry count.
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(self, *args, **kwargs):
+            with self.perf.measure(op) as extra:
+                result = fn(self, *args, **kwargs)
+                if entries is not None: extra['entries'] = entries(self)
+                return result
+        return wrapper
+    return decorate
+
+def format_record(rec):
+    text = f"{rec['op']} {rec['ms']:.1f} ms"
+    if 'entries' in rec: text += f" · {rec['entries']} entries"
+    if 'rss_delta_mb' in rec and abs(rec['rss_delta_mb']) >= 0.1: text += f" · {rec['rss_delta_mb']:+.1f} MB"
+    return text
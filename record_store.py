@@ -0,0 +1,149 @@
+import sys
+import zlib
+from array import array
+from collections.abc import MutableMapping
+
+ENUM_FIELDS = frozenset(['Type', 'SubType', 'Gender', 'Size', 'Race', 'Element', 'Class', 'Ai', 'WalkSpeed', 'Title'])
+TEXT_FIELDS = frozenset(['Script', 'EquipScript', 'UnEquipScript'])
+COMPRESS_MIN = 128
+_INT64_MIN, _INT64_MAX = -(1 << 63), (1 << 63) - 1
+
+def _intern_nested(value):
+    if type(value) is dict: return {sys.intern(k) if type(k) is str else k: _intern_nested(v) for k, v in value.items()}
+    if type(value) is list: return [_intern_nested(v) for v in value]
+    return value
+
+class ColumnStore:
+    # Scalar template fields live in typed columns (int64/bool arrays, interned enum codes, compressed scripts);
+    # each row keeps only an interned key-order tuple plus an overflow dict for anything else.
+    def __init__(self, schema):
+        self.template = schema.template
+        self.kinds = {}
+        for key, default in schema.template.items():
+            if key in TEXT_FIELDS: self.kinds[key] = 'text'
+            elif type(default) is bool: self.kinds[key] = 'bool'
+            elif type(default) is int: self.kinds[key] = 'int'
+            elif key in ENUM_FIELDS: self.kinds[key] = 'enum'
+            elif type(default) is str or default is None: self.kinds[key] = 'str'
+        self.columns, self.enum_values, self.enum_codes = {}, {}, {}
+        self.layouts, self.layout_ids, self.layout_sets = [], {}, []
+        self.row_layout = array('I')
+        self.extras = []
+
+    def __len__(self): return len(self.row_layout)
+
+    def _layout_id(self, keys):
+        keys = tuple(sys.intern(k) if type(k) is str else k for k in keys)
+        if (lid := self.layout_ids.get(keys)) is None:
+            lid = self.layout_ids[keys] = len(self.layouts)
+            self.layouts.append(keys); self.layout_sets.append(frozenset(keys))
+        return lid
+
+    def _column(self, key, kind):
+        if (col := self.columns.get(key)) is not None: return col
+        n, default = len(self.row_layout), self.template.get(key)
+        if kind == 'int': col = array('q', [default]) * n
+        elif kind == 'bool': col = array('b', [int(default)]) * n
+        elif kind == 'enum': col = array('H', [0]) * n; self.enum_values[key] = [None]; self.enum_codes[key] = {None: 0}
+        else: col = [None] * n
+        self.columns[key] = col
+        return col
+
+    def _fits(self, kind, value):
+        t = type(value)
+        if kind == 'int': return t is int and _INT64_MIN <= value <= _INT64_MAX
+        if kind == 'bool': return t is bool
+        return t is str
+
+    def add_row(self, entry):
+        row = len(self.row_layout)
+        self.row_layout.append(self._layout_id(entry.keys()))
+        for key, col in self.columns.items():
+            kind = self.kinds[key]
+            col.append(int(self.template[key]) if kind in ('int', 'bool') else 0 if kind == 'enum' else None)
+        self.extras.append(None)
+        for key, value in entry.items(): self._store(row, key, value)
+        return row
+
+    def _store(self, row, key, value):
+        kind = self.kinds.get(key)
+        if kind is not None and self._fits(kind, value):
+            if kind in ('int', 'bool'):
+                if value == self.template[key] and key not in self.columns: self._drop_extra(row, key); return
+                self._column(key, kind)[row] = int(value)
+            elif kind == 'enum':
+                col, codes = self._column(key, kind), self.enum_codes[key]
+                if (code := codes.get(value)) is None:
+                    code = codes[value] = len(self.enum_values[key]); self.enum_values[key].append(sys.intern(value))
+                    if code > 0xFFFF: self._put_extra(row, key, value); return
+                col[row] = code
+            elif kind == 'text' and len(value) >= COMPRESS_MIN:
+                self._column(key, kind)[row] = zlib.compress(value.encode('utf-8'))
+            else: self._column(key, kind)[row] = value
+            self._drop_extra(row, key)
+        else: self._put_extra(row, key, value)
+
+    def _put_extra(self, row, key, value):
+        if self.extras[row] is None: self.extras[row] = {}
+        self.extras[row][key] = _intern_nested(value)
+
+    def _drop_extra(self, row, key):
+        if (extra := self.extras[row]) is not None and key in extra:
+            del extra[key]
+            if not extra: self.extras[row] = None
+
+    def keys(self, row): return self.layouts[self.row_layout[row]]
+
+    def has(self, row, key): return key in self.layout_sets[self.row_layout[row]]
+
+    def get(self, row, key):
+        if (extra := self.extras[row]) is not None and key in extra: return extra[key]
+        kind = self.kinds[key]
+        if (col := self.columns.get(key)) is None: return self.template[key]
+        value = col[row]
+        if kind == 'int': return value
+        if kind == 'bool': return bool(value)
+        if kind == 'enum': return self.enum_values[key][value]
+        if type(value) is bytes: return zlib.decompress(value).decode('utf-8')
+        return value
+
+    def set(self, row, key, value):
+        if not self.has(row, key): self.row_layout[row] = self._layout_id(self.keys(row) + (key,))
+        self._store(row, key, value)
+
+    def delete(self, row, key):
+        if not self.has(row, key): raise KeyError(key)
+        self.row_layout[row] = self._layout_id(k for k in self.keys(row) if k != key)
+        self._drop_extra(row, key)
+
+class CompactRecord(MutableMapping):
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store, row):
+        self._store, self._row = store, row
+
+    def __getitem__(self, key):
+        if not self._store.has(self._row, key): raise KeyError(key)
+        return self._store.get(self._row, key)
+
+    def __setitem__(self, key, value): self._store.set(self._row, key, value)
+
+    def __delitem__(self, key): self._store.delete(self._row, key)
+
+    def __iter__(self): return iter(self._store.keys(self._row))
+
+    def __len__(self): return len(self._store.keys(self._row))
+
+    def __contains__(self, key): return self._store.has(self._row, key)
+
+    def get(self, key, default=None):
+        return self._store.get(self._row, key) if self._store.has(self._row, key) else default
+
+    def copy(self): return dict(self.items())
+
+    def __repr__(self): return f"CompactRecord({dict(self.items())!r})"
+
+def compact_entries(schema, entries):
+    # Returns a plain list of CompactRecord views; entries that are not plain dicts are kept as they are.
+    store = ColumnStore(schema)
+    return [CompactRecord(store, store.add_row(e)) if type(e) is dict else e for e in entries]
@@ -0,0 +1,265 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+import tracemalloc
+
+from db_core import ITEM_SCHEMA, MOB_SCHEMA
+from db_loader import HAS_LIBYAML, load_db
+from db_writer import FileImage, dump_entry, save_db
+from entry_table import EntryTable
+from key_index import PrimaryKeyIndex
+from lazy_body import open_lazy
+from parse_cache import ParseCache
+from record_store import compact_entries
+from search_index import SearchIndex
+from xref_index import DropIndex
+
+# --- synthetic rAthena-scale data
+
+ITEM_TYPES = [('Etc', 40), ('Weapon', 15), ('Armor', 20), ('Usable', 8), ('Healing', 6), ('Card', 7), ('Ammo', 2), ('Delayconsume', 2)]
+WEAPON_TYPES = ['Dagger', '1hSword', '2hSword', '1hSpear', 'Mace', 'Staff', 'Bow', 'Knuckle', 'Book', 'Katar']
+LOCATIONS = ['Head_Top', 'Armor', 'Shield', 'Garment', 'Shoes', 'Right_Accessory', 'Left_Accessory']
+BONUSES = ['bStr', 'bAgi', 'bVit', 'bInt', 'bDex', 'bLuk', 'bMaxHP', 'bMaxSP', 'bAtk', 'bMatk', 'bDef', 'bMdef', 'bHit', 'bFlee', 'bCritical', 'bAspd']
+SYLLABLES = ['po', 'ring', 'lu', 'nat', 'ic', 'ro', 'da', 'frog', 'fa', 'bre', 'thief', 'bug', 'hor', 'net', 'zen', 'orc', 'war', 'rior', 'mi', 'mic']
+RACES = ['Formless', 'Undead', 'Brute', 'Plant', 'Insect', 'Fish', 'Demon', 'Demihuman', 'Angel', 'Dragon']
+ELEMENTS = ['Neutral', 'Water', 'Earth', 'Fire', 'Wind', 'Poison', 'Holy', 'Dark', 'Ghost', 'Undead']
+
+def _name(rng, n=3):
+    return ''.join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, n))).capitalize()
+
+def _script(rng, lines):
+    out = []
+    for _ in range(lines):
+        r = rng.random()
+        if r < 0.6: out.append(f"bonus {rng.choice(BONUSES)},{rng.randint(1, 20)};")
+        elif r < 0.8: out.append(f"if (getrefine() >= {rng.randint(5, 10)}) {{\n  bonus2 bSkillAtk,{rng.randint(1, 3000)},{rng.randint(5, 30)};\n}}")
+        else: out.append(f"autobonus \"{{ bonus {rng.choice(BONUSES)},{rng.randint(1, 50)}; }}\",{rng.randint(10, 300)},{rng.randint(1000, 10000)};")
+    return '\n'.join(out) + '\n'
+
+def generate_items(n, seed=1):
+    rng = random.Random(seed)
+    types = [t for t, w in ITEM_TYPES for _ in range(w)]
+    body, used = [], set()
+    for i in range(n):
+        item_type, name = rng.choice(types), _name(rng)
+        aegis = f"{name}_{i}"
+        item = {'Id': 500 + i, 'AegisName': aegis, 'Name': name.replace('_', ' '), 'Type': item_type}
+        if item_type == 'Weapon': item['SubType'] = rng.choice(WEAPON_TYPES)
+        item['Buy'] = rng.randint(1, 200000)
+        if rng.random() < 0.8: item['Weight'] = rng.randint(1, 3000)
+        if item_type == 'Weapon':
+            item.update(Attack=rng.randint(10, 300), Range=rng.randint(1, 9), Slots=rng.randint(0, 4), Jobs={'Swordman': True, 'Knight': True},
+                        Locations={'Right_Hand': True}, WeaponLevel=rng.randint(1, 4), EquipLevelMin=rng.randint(1, 150), Refineable=True)
+        elif item_type == 'Armor':
+            item.update(Defense=rng.randint(1, 120), Slots=rng.randint(0, 1), Locations={rng.choice(LOCATIONS): True}, ArmorLevel=1,
+                        EquipLevelMin=rng.randint(1, 150), Refineable=rng.random() < 0.7)
+            if rng.random() < 0.3: item['View'] = rng.randint(1, 2000)
+        elif item_type == 'Card': item['Locations'] = {rng.choice(LOCATIONS): True}; item['Flags'] = {'NoRefine': True} if rng.random() < 0.1 else {}
+        if item_type in ('Weapon', 'Armor', 'Card') or rng.random() < 0.2: item['Script'] = _script(rng, rng.randint(1, 6))
+        if item_type in ('Weapon', 'Armor') and rng.random() < 0.1: item['EquipScript'] = _script(rng, 1)
+        if item_type in ('Usable', 'Healing', 'Delayconsume') and rng.random() < 0.3: item['Delay'] = {'Duration': rng.randint(100, 60000)}
+        if rng.random() < 0.05: item['Trade'] = {'NoDrop': True, 'NoTrade': True}
+        body.append({k: v for k, v in item.items() if v != {}})
+    return body
+
+def generate_mobs(n, item_names, seed=2):
+    rng = random.Random(seed)
+    body = []
+    for i in range(n):
+        name, mvp = _name(rng), rng.random() < 0.02
+        level = rng.randint(1, 175)
+        mob = {'Id': 1001 + i, 'AegisName': f"{name.upper()}_{i}", 'Name': name, 'Level': level, 'Hp': rng.randint(level * 10, level * 5000 * (50 if mvp else 1)),
+               'BaseExp': rng.randint(0, level * 300), 'JobExp': rng.randint(0, level * 200), 'Attack': rng.randint(1, level * 20), 'Attack2': rng.randint(0, level * 10),
+               'Defense': rng.randint(0, 300), 'MagicDefense': rng.randint(0, 100), 'Str': rng.randint(1, 200), 'Agi': rng.randint(1, 200), 'Vit': rng.randint(1, 200),
+               'Int': rng.randint(1, 200), 'Dex': rng.randint(1, 200), 'Luk': rng.randint(1, 200), 'AttackRange': rng.randint(1, 14), 'SkillRange': 10, 'ChaseRange': 12,
+               'Size': rng.choice(['Small', 'Medium', 'Large']), 'Race': rng.choice(RACES), 'Element': rng.choice(ELEMENTS), 'ElementLevel': rng.randint(1, 4),
+               'WalkSpeed': rng.choice([100, 150, 200, 400]), 'AttackDelay': rng.randint(300, 3000), 'AttackMotion': rng.randint(300, 2000), 'DamageMotion': rng.randint(100, 800),
+               'Ai': rng.choice(['01', '02', '04', '07', '21'])}
+        if mvp:
+            mob['MvpExp'] = mob['BaseExp'] // 2; mob['Class'] = 'Boss'; mob['Modes'] = {'Mvp': True}
+            mob['MvpDrops'] = [{'Item': rng.choice(item_names), 'Rate': rng.randint(100, 5500)} for _ in range(rng.randint(1, 3))]
+        drops = [{'Item': rng.choice(item_names), 'Rate': rng.choice([1, 5, 10, 50, 100, 500, 1000, 3000, 5000, 7000])} for _ in range(rng.randint(0, 10))]
+        for drop in drops:
+            if rng.random() < 0.05: drop['StealProtected'] = True
+        if drops: mob['Drops'] = drops
+        body.append(mob)
+    return body
+
+def write_db(path, db_type, body, version=1):
+    # Written the way rAthena's own files are laid out (indented Body sequence), so incremental saves apply.
+    with open(path, 'wb') as f:
+        f.write(f"Header:\n  Type: {db_type}\n  Version: {version}\n\nBody:\n".encode('utf-8'))
+        for entry in body: f.write(dump_entry(entry))
+
+# --- measurement
+
+# The editors' methods need a Tk root, so each timed group runs a Tk-free stand-in for the App method it is named after.
+SURROGATES = {
+    'load.parse': "load_db, as load_file's worker thread calls it",
+    'load.cached': "load_db with the ParseCache sidecar",
+    'load.lazy': "_open_lazy (open_lazy)",
+    'load.prepare': "_prepare_loaded: SearchIndex, FileImage.scan, PrimaryKeyIndex",
+    'filter.keystroke': "filter_step -> filter_item_list / filter_mob_list",
+    'sort.rank': "sort_step, ranks cleared -> first sort_treeview_column on a field",
+    'sort.column': "sort_step -> sort_treeview_column",
+    'sort.secondary': "sort_step -> _on_heading_shift_click",
+    'display.details': "display_step -> display_item_details / display_mob_details",
+    'save.current': "save_current_step -> save_current_item / save_current_mob",
+    'save.file': "save_db with the file image -> save_file",
+    'save.full': "save_db without a file image -> save_file on a file that has none yet",
+}
+
+def summarize(samples):
+    s = sorted(samples)
+    pick = lambda q: s[min(len(s) - 1, int(round(q * (len(s) - 1))))]
+    return {'n': len(s), 'mean_ms': sum(s) / len(s) * 1000, 'p50_ms': pick(0.5) * 1000, 'p95_ms': pick(0.95) * 1000, 'p99_ms': pick(0.99) * 1000, 'max_ms': s[-1] * 1000}
+
+class Bench:
+    def __init__(self, measure_memory=True):
+        self.results, self.measure_memory = {}, measure_memory
+
+    def run(self, name, calls):
+        # calls yields zero-argument callables; each one is one latency sample.
+        samples = []
+        for call in calls:
+            gc.disable()
+            t = time.perf_counter(); call(); samples.append(time.perf_counter() - t)
+            gc.enable()
+        self.results[name] = summarize(samples)
+        return self.results[name]
+
+    def peak(self, name, fn):
+        if not self.measure_memory: return fn()
+        gc.collect(); tracemalloc.start()
+        try: result = fn()
+        finally: current, peak = tracemalloc.get_traced_memory(); tracemalloc.stop()
+        self.results.setdefault(name, {}).update(peak_mb=peak / 1e6, retained_mb=current / 1e6)
+        return result
+
+def keystrokes(body, rng, words=20):
+    # Typing a name one character at a time, as filter_*_list sees it after each debounce.
+    for entry in rng.sample(body, min(words, len(body))):
+        term = str(entry.get('AegisName', ''))[:rng.randint(3, 10)]
+        for i in range(1, len(term) + 1): yield term[:i].lower()
+        yield ''
+
+def bench_db(bench, db_type, schema, body, directory, rng, repeat):
+    prefix = f"{db_type}/{len(body)}"
+    path = os.path.join(directory, f"{db_type.lower()}_{len(body)}.yml")
+    write_db(path, db_type, body)
+
+    bench.run(f"{prefix}/load.parse", (lambda: load_db(path, db_type) for _ in range(repeat)))
+    cache = ParseCache(os.path.join(directory, 'cache'))
+    load_db(path, db_type, cache=cache)
+    bench.run(f"{prefix}/load.cached", (lambda: load_db(path, db_type, cache=cache) for _ in range(repeat)))
+    bench.run(f"{prefix}/load.lazy", (lambda: open_lazy(path, db_type)[3].close() for _ in range(repeat)))
+
+    def prepare():
+        data, raw = load_db(path, db_type, with_raw=True)
+        loaded = compact_entries(schema, data['Body'])
+        return loaded, raw, SearchIndex(enumerate(loaded)), FileImage.scan(raw, loaded), PrimaryKeyIndex(loaded)
+    loaded, raw, index, image, keys = bench.peak(f"{prefix}/load.memory", prepare)
+    bench.run(f"{prefix}/load.prepare", (lambda: (SearchIndex(enumerate(loaded)), FileImage.scan(raw, loaded), PrimaryKeyIndex(loaded)) for _ in range(repeat)))
+    drops = DropIndex(loaded) if schema is MOB_SCHEMA else None
+    table = EntryTable(loaded, schema)
+
+    def filter_step(term):
+        order = table.order([('Id', False)])
+        return order if (matches := index.search(term)) is None else table.select(order, matches)
+    bench.run(f"{prefix}/filter.keystroke", ((lambda t=t: filter_step(t)) for t in keystrokes(loaded, rng)))
+
+    # sort.rank: the first sort on a field; sort.column and sort.secondary: later header clicks, one or two keys.
+    def sort_step(keys, cold=False):
+        if cold: table._ranks.clear()
+        table._orders.clear(); return table.order(keys)
+    fields = ['Id', 'AegisName', 'Name', 'Weight' if schema is ITEM_SCHEMA else 'Level']
+    bench.run(f"{prefix}/sort.rank", ((lambda f=f: sort_step([(f, False)], cold=True)) for _ in range(repeat) for f in fields))
+    for f in fields: table.order([(f, False)])
+    bench.run(f"{prefix}/sort.column", ((lambda f=f, r=r: sort_step([(f, r)])) for _ in range(repeat) for f in fields for r in (False, True)))
+    bench.run(f"{prefix}/sort.secondary", ((lambda f=f: sort_step([(f, False), ('AegisName', True)])) for _ in range(repeat) for f in fields[2:]))
+
+    def display_step(entry):
+        # The Tk-free part of display_*_details: template merge plus the per-field widget decision.
+        full = schema.merge_template(entry)
+        return [(k, isinstance(v, dict), isinstance(v, list)) for k, v in full.items()]
+    picks = [rng.randrange(len(loaded)) for _ in range(min(300, len(loaded)))]
+    bench.run(f"{prefix}/display.details", ((lambda i=i: display_step(loaded[i])) for i in picks))
+
+    int_fields = sorted(schema.int_fields - {'Id'})
+    def save_current_step(i):
+        old = loaded[i]
+        new = schema.merge_template(old); new[rng.choice(int_fields)] = rng.randint(1, 999)
+        new = schema.clean(new)
+        keys.replace(old, new)
+        table.replace(i, new); index.update(i, new)
+        if drops is not None: drops.replace(old, new)
+    bench.run(f"{prefix}/save.current", ((lambda i=i: save_current_step(i)) for i in picks))
+
+    out = os.path.join(directory, f"out_{db_type.lower()}_{len(body)}.yml")
+    state = [image]
+    def save_incremental(): state[0] = save_db(out, {'Type': db_type, 'Version': 1}, loaded, state[0])
+    bench.run(f"{prefix}/save.file", (save_incremental for _ in range(repeat)))
+    bench.run(f"{prefix}/save.full", ((lambda: save_db(out, {'Type': db_type, 'Version': 1}, loaded)) for _ in range(repeat)))
+
+def compare(results, baseline, threshold):
+    # Returns the names whose p50 got slower than threshold x the baseline.
+    regressions = []
+    for name, now in sorted(results.items()):
+        if (then := baseline.get(name)) is None or 'p50_ms' not in now or not then.get('p50_ms'): continue
+        ratio = now['p50_ms'] / then['p50_ms']
+        flag = "  REGRESSION" if ratio > threshold else ""
+        print(f"{name:45} {then['p50_ms']:10.3f} -> {now['p50_ms']:10.3f} ms  x{ratio:5.2f}{flag}")
+        if flag: regressions.append(name)
+    return regressions
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ryde_bench", description="Headless benchmarks for the editors' hot paths on synthetic item_db/mob_db files.")
+    parser.add_argument("--sizes", default="1000,10000", help="comma separated entry counts, e.g. 1000,10000,100000")
+    parser.add_argument("--db", choices=("item", "mob", "both"), default="both")
+    parser.add_argument("--repeat", type=int, default=3, help="samples for whole-file operations")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-memory", action="store_true", help="skip tracemalloc peak measurement")
+    parser.add_argument("-o", "--output", help="write results as JSON (a baseline for --compare)")
+    parser.add_argument("--compare", help="baseline JSON to compare against")
+    parser.add_argument("--threshold", type=float, default=1.25, help="p50 ratio reported as a regression")
+    parser.add_argument("--generate", metavar="DIR", help="only write the synthetic files to DIR")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(',') if s.strip()]
+    if args.generate:
+        os.makedirs(args.generate, exist_ok=True)
+        for n in sizes:
+            items = generate_items(n, args.seed)
+            write_db(os.path.join(args.generate, f"item_db_{n}.yml"), 'ITEM_DB', items)
+            write_db(os.path.join(args.generate, f"mob_db_{n}.yml"), 'MOB_DB', generate_mobs(n, [i['AegisName'] for i in items], args.seed + 1))
+        return 0
+    bench, rng = Bench(not args.no_memory), random.Random(args.seed)
+    with tempfile.TemporaryDirectory(prefix="ryde_bench_") as directory:
+        for n in sizes:
+            items = generate_items(n, args.seed)
+            if args.db in ("item", "both"): bench_db(bench, 'ITEM_DB', ITEM_SCHEMA, items, directory, rng, args.repeat)
+            if args.db in ("mob", "both"):
+                bench_db(bench, 'MOB_DB', MOB_SCHEMA, generate_mobs(n, [i['AegisName'] for i in items], args.seed + 1), directory, rng, args.repeat)
+    print("Stand-ins for the editors' App methods:")
+    for group, method in SURROGATES.items(): print(f"  {group:18} {method}")
+    for name, r in bench.results.items():
+        if 'p50_ms' in r: print(f"{name:45} n={r['n']:5}  p50 {r['p50_ms']:10.3f}  p95 {r['p95_ms']:10.3f}  p99 {r['p99_ms']:10.3f}  max {r['max_ms']:10.3f} ms")
+        if 'peak_mb' in r: print(f"{name:45} peak {r['peak_mb']:.1f} MB, retained {r['retained_mb']:.1f} MB")
+    meta = {'python': sys.version.split()[0], 'platform': platform.platform(), 'libyaml': HAS_LIBYAML, 'sizes': sizes, 'seed': args.seed, 'surrogates': SURROGATES, 'time': time.strftime('%Y-%m-%dT%H:%M:%S')}
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f: json.dump({'meta': meta, 'results': bench.results}, f, indent=2)
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f: baseline = json.load(f)
+        if compare(bench.results, baseline.get('results', {}), args.threshold): return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,196 @@
+import argparse
+import os
+import sqlite3
+import sys
+from collections.abc import Mapping
+
+from db_core import SCHEMAS, Database, DBLoadError, DuplicateKeyError, parse_filter, parse_value
+from db_merge import Version, diff_versions, load_versions, merge3
+from db_sqlite import TABLES, export_sqlite, import_sqlite
+from parse_cache import ParseCache
+
+def _targets(entry, path):
+    # Yields (container, key) pairs for a dotted path; list values fan out, e.g. Drops.Rate hits every drop.
+    parts = path.split('.')
+    containers = [entry]
+    for part in parts[:-1]:
+        nxt = []
+        for c in containers:
+            value = c.get(part) if isinstance(c, Mapping) else None
+            if isinstance(value, dict): nxt.append(value)
+            elif isinstance(value, list): nxt.extend(v for v in value if isinstance(v, dict))
+        containers = nxt
+    return [(c, parts[-1]) for c in containers]
+
+def cmd_set(db, matches, args):
+    changed = {}
+    if args.raw: value = args.value
+    elif '.' in args.field: value = parse_value(args.value)
+    else: value = db.schema.coerce_field(args.field, args.value)
+    rekey = args.field in ('Id', 'AegisName')
+    for entry in matches:
+        for container, key in _targets(entry, args.field):
+            if container.get(key) == value: continue
+            if rekey: db.keys.remove(entry)
+            container[key] = value; changed[id(entry)] = entry
+            if rekey: db.keys.add(entry)
+    return changed
+
+def cmd_scale(db, matches, args):
+    changed = {}
+    for entry in matches:
+        if '.' not in args.field and args.field not in entry and args.field in db.schema.template:
+            entry_targets = [(entry, args.field)] if isinstance(db.schema.template[args.field], int) else []
+            default = db.schema.template.get(args.field)
+        else: entry_targets, default = _targets(entry, args.field), None
+        for container, key in entry_targets:
+            old = container.get(key, default)
+            if not isinstance(old, (int, float)) or isinstance(old, bool): continue
+            new = old * args.factor + args.offset
+            if args.min is not None: new = max(new, args.min)
+            if args.max is not None: new = min(new, args.max)
+            new = int(round(new))
+            if new != old: container[key] = new; changed[id(entry)] = entry
+    return changed
+
+def cmd_renumber(db, matches, args):
+    matched = {id(e) for e in matches}
+    for entry in matches: db.keys.remove(entry)
+    next_id, changed = args.start, {}
+    for entry in db.body:
+        if id(entry) not in matched: continue
+        next_id = db.keys.first_gap(next_id)
+        if entry.get('Id') != next_id: entry['Id'] = next_id; changed[id(entry)] = entry
+        db.keys.add(entry)
+        next_id += 1
+    return changed
+
+def cmd_validate(db, matches, args):
+    for problem in db.keys.duplicates: print(f"{db.path}: {problem}")
+    return {}
+
+def cmd_export_sqlite(db, matches, args):
+    # The first file for a table replaces its rows, later ones add to them (item_db_usable.yml, item_db_equip.yml, ...).
+    table = args.table or TABLES[db.schema.db_type]
+    if not args.dry_run:
+        export_sqlite(args.sqlite, db.schema, matches, table, header=db.header, replace=table not in args.exported)
+    args.exported.add(table)
+    return {}
+
+def import_to_yaml(args, cache):
+    # Writes each file from the table. An existing file keeps its Header, Footer and entry order, and entries whose
+    # row did not change keep their original text; rows for new Ids are appended. --where selects the rows.
+    status = 0
+    for path in args.files:
+        try:
+            db = Database.open(path, cache=cache) if os.path.exists(path) else None
+            if db is None and args.type is None: raise ValueError("the file does not exist; pass --type to create it")
+            schema = db.schema if db is not None else SCHEMAS[f"{args.type.upper()}_DB"]
+            header, rows = import_sqlite(args.sqlite, schema, args.table)
+            predicate = parse_filter(args.where, schema)
+            rows = {e.get('Id'): e for e in rows if predicate(e)}
+            old = {e.get('Id'): e for e in db.body} if db is not None else {}
+            body = [entry if entry == rows[key] else rows[key] for key, entry in old.items() if key in rows]
+            body += [entry for key, entry in rows.items() if key not in old]
+            changed = sum(1 for key, entry in rows.items() if old.get(key) != entry) + sum(1 for key in old if key not in rows)
+            db = Database(path, schema, db.header if db is not None else header, body, db.image if db is not None else None, cache)
+            print(f"{path}: {len(rows)} rows from {args.table or TABLES[schema.db_type]}, {changed} changed")
+            if changed and not args.dry_run: db.save()
+            if db.keys.duplicates: status = 1
+        except (DBLoadError, DuplicateKeyError, ValueError, OSError, sqlite3.Error) as e:
+            print(f"{path}: error: {e}", file=sys.stderr); status = 2
+    return status
+
+def cmd_diff(db, matches, args):
+    # Entry-level differences from this file to --against; with --where, entries this file has are limited to matches.
+    keep = {e.get('Id') for e in matches}
+    other = load_versions([args.against], db.schema, cache=db.cache)[0]
+    for key, old, new, paths in diff_versions(Version(db.header, db.body), other):
+        if key not in keep and old is not None: continue
+        if old is None: print(f"+ {key} {new.get('AegisName')}")
+        elif new is None: print(f"- {key} {old.get('AegisName')}")
+        else: print(f"~ {key} {new.get('AegisName')}: {', '.join(paths)}")
+    return {}
+
+def cmd_merge(db, matches, args):
+    # Merges --theirs into the file, three-way when --base is given. Conflicting fields keep this file's values and are
+    # listed on stderr; entries new in theirs go after the entry they follow there.
+    versions = load_versions([p for p in (args.base, args.theirs) if p], db.schema, cache=db.cache)
+    theirs = versions[-1]
+    result = merge3(versions[0] if args.base else Version({}, []), Version(db.header, db.body), theirs)
+    added = {new.get('Id') for old, new in result.pairs if old is None}
+    after, anchor = {}, None
+    for entry in theirs.body:
+        if entry.get('Id') in added: after[entry.get('Id')] = anchor
+        elif entry.get('Id') in db.keys: anchor = entry.get('Id')
+    changed = {}
+    for old, new in result.pairs:
+        try:
+            if old is None:
+                prev = db.keys.get(after.get(new.get('Id')))
+                db.add(new, next((i + 1 for i, e in enumerate(db.body) if e is prev), None) if prev is not None else None)
+            elif new is None: db.remove(next(i for i, e in enumerate(db.body) if e is old))
+            else: db.replace(next(i for i, e in enumerate(db.body) if e is old), new)
+        except DuplicateKeyError as e: print(f"{db.path}: skipped {(new or old).get('Id')}: {e}", file=sys.stderr); continue
+        changed[id(new or old)] = new or old
+    for key, conflict in result.conflicts.items():
+        print(f"{db.path}: conflict {key}: " + conflict.describe().replace('\n', '; '), file=sys.stderr)
+    print(f"{db.path}: {result.taken} from {args.theirs}, {result.compared} merged field by field, {len(result.conflicts)} conflicts")
+    return changed
+
+COMMANDS = {'set': cmd_set, 'scale': cmd_scale, 'renumber': cmd_renumber, 'validate': cmd_validate, 'export-sqlite': cmd_export_sqlite,
+            'diff': cmd_diff, 'merge': cmd_merge}
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="ryde_cli", description="Batch operations on rAthena item_db/mob_db YAML files without a display.")
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("files", nargs="+", help="item_db/mob_db YAML files")
+    common.add_argument("-w", "--where", action="append", default=[], help="condition or query such as 'Level>=80', 'Modes.Mvp=true', 'Type=Weapon AND (Slots>=3 OR Refineable=false)' (repeatable, ANDed)")
+    common.add_argument("-n", "--dry-run", action="store_true", help="report changes without writing files")
+    common.add_argument("--no-cache", action="store_true", help="do not use the persistent parse cache")
+    sub = parser.add_subparsers(dest="command", required=True)
+    p = sub.add_parser("set", parents=[common], help="set a field on matching entries")
+    p.add_argument("--field", required=True); p.add_argument("--value", required=True)
+    p.add_argument("--raw", action="store_true", help="store the value as a string without type parsing")
+    p = sub.add_parser("scale", parents=[common], help="multiply a numeric field (value * factor + offset), optionally clamped")
+    p.add_argument("--field", required=True); p.add_argument("--factor", type=float, default=1.0)
+    p.add_argument("--offset", type=float, default=0.0); p.add_argument("--min", type=float); p.add_argument("--max", type=float)
+    p = sub.add_parser("renumber", parents=[common], help="assign consecutive free Ids to matching entries")
+    p.add_argument("--start", type=int, required=True)
+    sub.add_parser("validate", parents=[common], help="report duplicate Ids/AegisNames")
+    p = sub.add_parser("export-sqlite", parents=[common], help="write matching entries to a SQLite table in rAthena's item_db_re/mob_db_re layout")
+    p.add_argument("--sqlite", required=True, help="database file, created if missing"); p.add_argument("--table", help="default item_db_re or mob_db_re")
+    p.set_defaults(exported=set())
+    p = sub.add_parser("diff", parents=[common], help="list the entries and fields that differ in another version")
+    p.add_argument("--against", required=True, help="the other version of the file")
+    p = sub.add_parser("merge", parents=[common], help="merge another version (e.g. an rAthena update) into the file")
+    p.add_argument("--theirs", required=True, help="the version to merge in"); p.add_argument("--base", help="the version both files started from")
+    p = sub.add_parser("import-sqlite", parents=[common], help="write the YAML files from a SQLite table")
+    p.add_argument("--sqlite", required=True); p.add_argument("--table", help="default item_db_re or mob_db_re")
+    p.add_argument("--type", choices=("item", "mob"), help="database type of a file that does not exist yet")
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    cache = None if args.no_cache else ParseCache()
+    if args.command == 'import-sqlite': return import_to_yaml(args, cache)
+    status = 0
+    for path in args.files:
+        try:
+            db = Database.open(path, cache=cache)
+            predicate = parse_filter(args.where, db.schema)
+            matches = [e for e in db.body if predicate(e)]
+            changed = COMMANDS[args.command](db, matches, args)
+            for entry in changed.values():
+                cleaned = db.schema.clean(entry)
+                if cleaned != entry or list(cleaned) != list(entry): entry.clear(); entry.update(cleaned)
+                db.mark_changed(entry)
+            print(f"{path}: {len(matches)} matching, {len(changed)} changed")
+            if changed and not args.dry_run: db.save()
+            if db.keys.duplicates: status = 1
+        except (DBLoadError, DuplicateKeyError, ValueError, OSError, sqlite3.Error) as e:
+            print(f"{path}: error: {e}", file=sys.stderr); status = 2
+    return status
+
+if __name__ == "__main__":
+    sys.exit(main())
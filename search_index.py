@@ -0,0 +1,257 @@
+import math
+import re
+from bisect import bisect_left, bisect_right, insort
+from collections import defaultdict
+from collections.abc import Mapping
+from itertools import groupby
+from operator import itemgetter
+
+from db_core import COMPARISON_OPS, get_path, parse_query, parse_value, query_paths, value_matcher
+
+GRAM = 3
+
+def _grams(text):
+    return {text[i:i + GRAM] for i in range(len(text) - GRAM + 1)}
+
+def _hashable(value):
+    if isinstance(value, Mapping): return ('m', tuple(sorted((str(k), repr(v)) for k, v in value.items())))
+    if isinstance(value, (str, bool)) or value is None: return (type(value).__name__, value)
+    return ('r', repr(value))
+
+def _is_number(value): return isinstance(value, (int, float)) and not isinstance(value, bool)
+
+class _Field:
+    # Numbers sit in one sorted (value, key) list for range lookups; everything else (names, flags, dict fields) is
+    # grouped by distinct value, so a condition is tested once per distinct value rather than once per entry.
+    def __init__(self, values=()):
+        self.numbers, self.others = [], {}
+        for key, value in values:
+            if _is_number(value): self.numbers.append((value, key))
+            else: self.others.setdefault(_hashable(value), [value, set()])[1].add(key)
+        self.numbers.sort()
+
+    def add(self, key, value):
+        if _is_number(value): insort(self.numbers, (value, key))
+        else: self.others.setdefault(_hashable(value), [value, set()])[1].add(key)
+
+    def remove(self, key, value):
+        if _is_number(value):
+            if (i := bisect_left(self.numbers, (value, key))) < len(self.numbers) and self.numbers[i] == (value, key): del self.numbers[i]
+        elif (group := self.others.get(h := _hashable(value))) is not None:
+            group[1].discard(key)
+            if not group[1]: del self.others[h]
+
+    def lookup(self, op, raw_value):
+        match, value, result = value_matcher(op, raw_value), parse_value(raw_value), set()
+        for rep, keys in self.others.values():
+            if match(rep): result |= keys
+        numbers = self.numbers
+        if op in COMPARISON_OPS and _is_number(value):
+            lo, hi, n = bisect_left(numbers, (value,)), bisect_right(numbers, (value, math.inf)), len(numbers)
+            ranges = {'=': ((lo, hi),), '!=': ((0, lo), (hi, n)), '<': ((0, lo),), '<=': ((0, hi),), '>': ((hi, n),), '>=': ((lo, n),)}[op]
+            for a, b in ranges: result.update(map(itemgetter(1), numbers[a:b]))
+        else:
+            for number, group in groupby(numbers, key=itemgetter(0)):
+                if match(number): result.update(map(itemgetter(1), group))
+        return result
+
+class FieldIndex:
+    # Structured queries over any field or dotted path (Type=Weapon AND Attack>=150, Modes.Mvp=true). A field's index
+    # is built the first time a query names it and kept current by add/remove afterwards.
+    def __init__(self):
+        self.entries, self.fields, self.schema = {}, {}, None
+
+    def add(self, key, entry):
+        self.entries[key] = entry
+        for path, field in self.fields.items(): field.add(key, get_path(entry, path, self.schema))
+
+    def remove(self, key):
+        if (entry := self.entries.pop(key, None)) is None: return
+        for path, field in self.fields.items(): field.remove(key, get_path(entry, path, self.schema))
+
+    def _ensure(self, paths, schema):
+        if schema is not self.schema: self.fields, self.schema = {}, schema
+        # One pass for all new fields, so lazily opened files parse each entry once.
+        if not (missing := [p for p in paths if p not in self.fields]): return
+        columns = {p: [] for p in missing}
+        for key, entry in self.entries.items():
+            for p in missing: columns[p].append((key, get_path(entry, p, schema)))
+        for p in missing: self.fields[p] = _Field(columns[p])
+
+    def query(self, node, schema=None):
+        self._ensure(query_paths(node), schema)
+        return self._evaluate(node)
+
+    def _evaluate(self, node):
+        kind = node[0]
+        if kind == 'cond': return self.fields[node[1]].lookup(node[2], node[3])
+        if kind == 'not': return set(self.entries).difference(self._evaluate(node[1]))
+        parts = [self._evaluate(n) for n in node[1]]
+        if kind == 'or': return set().union(*parts)
+        parts.sort(key=len)
+        return parts[0].intersection(*parts[1:])
+
+# --- full-text search over script fields: 'script: bonus bStr', 'script: "skill AL_HEAL"', 'script: getrefine*'
+
+_WORD = re.compile(r'\w+')
+_TEXT_TERM = re.compile(r'"([^"]*)"?|(\S+)')
+TEXT_PREFIX = 'script:'
+
+def is_text_query(text): return text.lstrip().lower().startswith(TEXT_PREFIX)
+
+def parse_text_query(text):
+    # [('token', t) | ('prefix', p) | ('phrase', [t, ...])], all of which must match. Quoted text is a phrase,
+    # a trailing * makes a prefix, anything else is split into tokens the way scripts are.
+    text = text.lstrip()[len(TEXT_PREFIX):] if is_text_query(text) else text
+    terms = []
+    for m in _TEXT_TERM.finditer(text):
+        if m.group(1) is not None:
+            if (words := [w.lower() for w in _WORD.findall(m.group(1))]): terms.append(('phrase', words) if len(words) > 1 else ('token', words[0]))
+            continue
+        word = m.group(2)
+        if word.endswith('*') and (stem := _WORD.findall(word[:-1])):
+            terms.extend(('token', w.lower()) for w in stem[:-1]); terms.append(('prefix', stem[-1].lower()))
+        else: terms.extend(('token', w.lower()) for w in _WORD.findall(word))
+    return terms
+
+def _term_at(words, i, term):
+    # Number of words term covers starting at words[i], or 0.
+    kind, value = term
+    if kind == 'token': return 1 if words[i] == value else 0
+    if kind == 'prefix': return 1 if words[i].startswith(value) else 0
+    return len(value) if words[i:i + len(value)] == value else 0
+
+def text_hits(text, terms):
+    # Character spans of every hit in one script, for highlighting.
+    matches = list(_WORD.finditer(text or ''))
+    words = [m.group().lower() for m in matches]
+    hits = []
+    for i in range(len(words)):
+        for term in terms:
+            if (n := _term_at(words, i, term)): hits.append((matches[i].start(), matches[i + n - 1].end())); break
+    return hits
+
+class TextIndex:
+    # Inverted index over script fields: token -> keys, with a sorted vocabulary for prefix lookups, and adjacent
+    # token pairs -> keys so a two-word phrase is exact and a longer one only checks the few entries left.
+    def __init__(self, fields):
+        self.fields = tuple(fields)
+        self.postings, self.vocab, self.pairs = {}, [], {}
+
+    def _words(self, entry):
+        return [[w.lower() for w in _WORD.findall(text)] for f in self.fields if isinstance(text := entry.get(f), str) and text]
+
+    def _terms(self, entry):
+        words, pairs = set(), set()
+        for seq in self._words(entry): words.update(seq); pairs.update(map(' '.join, zip(seq, seq[1:])))
+        return words, pairs
+
+    def add(self, key, entry):
+        words, pairs = self._terms(entry)
+        for word in words:
+            if (keys := self.postings.get(word)) is None: keys = self.postings[word] = set(); insort(self.vocab, word)
+            keys.add(key)
+        for pair in pairs: self.pairs.setdefault(pair, set()).add(key)
+
+    def bulk_add(self, items):
+        for key, entry in items:
+            words, pairs = self._terms(entry)
+            for word in words: self.postings.setdefault(word, set()).add(key)
+            for pair in pairs: self.pairs.setdefault(pair, set()).add(key)
+        self.vocab = sorted(self.postings)
+
+    def remove(self, key, entry):
+        words, pairs = self._terms(entry)
+        for word in words:
+            if (keys := self.postings.get(word)) is None: continue
+            keys.discard(key)
+            if not keys:
+                del self.postings[word]
+                if (i := bisect_left(self.vocab, word)) < len(self.vocab) and self.vocab[i] == word: del self.vocab[i]
+        for pair in pairs:
+            if (keys := self.pairs.get(pair)) is not None:
+                keys.discard(key)
+                if not keys: del self.pairs[pair]
+
+    def _prefix(self, stem):
+        result, i = set(), bisect_left(self.vocab, stem)
+        while i < len(self.vocab) and self.vocab[i].startswith(stem): result |= self.postings[self.vocab[i]]; i += 1
+        return result
+
+    def search(self, terms, entries):
+        # entries maps key -> entry; only phrase candidates are looked up in it.
+        sets, phrases = [], []
+        for kind, value in terms:
+            if kind == 'token': sets.append(self.postings.get(value, set()))
+            elif kind == 'prefix': sets.append(self._prefix(value))
+            else:
+                sets.extend(self.pairs.get(' '.join(pair), set()) for pair in zip(value, value[1:]))
+                if len(value) > 2: phrases.append(value)
+        if not sets: return None
+        sets.sort(key=len)
+        result = sets[0].intersection(*sets[1:])
+        for phrase in phrases:
+            result = {k for k in result if any(_term_at(words, i, ('phrase', phrase)) for words in self._words(entries[k]) for i in range(len(words)))}
+        return result
+
+class SearchIndex:
+    # Keys are opaque handles chosen by the caller (the editors use EntryTable handles).
+    def __init__(self, entries=None, text_fields=()):
+        self.texts = {}
+        self.postings = defaultdict(set)
+        self.fields = FieldIndex()
+        self.text = None
+        self._last_term, self._last_result = None, None
+        for key, entry in (entries or ()): self.add(key, entry)
+        if text_fields: self.index_text(text_fields)
+
+    def __len__(self): return len(self.texts)
+
+    def add(self, key, entry):
+        id_str, name = str(entry.get('Id', '')), str(entry.get('AegisName', '')).lower()
+        self.texts[key] = (id_str, name)
+        self.fields.add(key, entry)
+        if self.text is not None: self.text.add(key, entry)
+        for g in _grams(id_str) | _grams(name): self.postings[g].add(key)
+        self._last_term, self._last_result = None, None
+
+    def remove(self, key):
+        if (texts := self.texts.pop(key, None)) is None: return
+        if self.text is not None: self.text.remove(key, self.fields.entries[key])
+        self.fields.remove(key)
+        for g in _grams(texts[0]) | _grams(texts[1]):
+            if (keys := self.postings.get(g)) is not None:
+                keys.discard(key)
+                if not keys: del self.postings[g]
+        self._last_term, self._last_result = None, None
+
+    def update(self, key, entry):
+        self.remove(key); self.add(key, entry)
+
+    def search(self, term):
+        # Returns the set of matching keys, or None when the term matches everything.
+        term = term.lower()
+        if not term: return None
+        if self._last_term is not None and self._last_term in term:
+            candidates = self._last_result
+        elif len(term) >= GRAM:
+            lists = sorted((self.postings.get(g, ()) for g in _grams(term)), key=len)
+            candidates = set(lists[0]).intersection(*lists[1:]) if lists else set()
+        else: candidates = self.texts.keys()
+        texts = self.texts
+        result = {k for k in candidates if term in texts[k][0] or term in texts[k][1]}
+        self._last_term, self._last_result = term, result
+        return result
+
+    def query(self, text, schema=None):
+        # Set of keys matching a structured query; raises ValueError for a malformed one.
+        return self.fields.query(parse_query(text), schema)
+
+    def index_text(self, fields):
+        # Builds the script index; done on the loader thread, or on first use for lazily opened files.
+        self.text = TextIndex(fields)
+        self.text.bulk_add(self.fields.entries.items())
+
+    def search_text(self, terms):
+        if self.text is None: raise ValueError("Script search is not indexed for this file.")
+        return self.text.search(terms, self.fields.entries)
@@ -0,0 +1,28 @@
+import pytest
+
+np = pytest.importorskip("numpy")
+
+from bulk_ops import MobTable
+from db_core import MOB_SCHEMA, compile_query, parse_query
+
+BODY = [
+    {'Id': 1001, 'AegisName': 'SCORPION', 'Level': 16, 'Race': 'Insect', 'Drops': [{'Item': 'Jellopy', 'Rate': 7000}]},
+    {'Id': 1038, 'AegisName': 'OSIRIS', 'Level': 78, 'Race': 'Undead', 'Modes': {'Mvp': True}},
+    {'Id': 1039, 'AegisName': 'BAPHOMET', 'Level': 81, 'Race': 'Demon', 'Modes': {'Mvp': True}},
+    {'Id': 1109, 'AegisName': 'DEVIRUCHI', 'Level': 64, 'Race': 'Demon'},
+]
+
+@pytest.mark.parametrize("text", [
+    "Level>=80",
+    "Modes.Mvp=true AND (Level>=80 OR Race=Undead)",
+    "Race=Demon OR Id<1010",
+    "NOT Race=Demon AND Level>10",
+    "AegisName~osi",
+])
+def test_mask_matches_query_bar(text):
+    table = MobTable(BODY)
+    expected = [compile_query(parse_query(text), MOB_SCHEMA)(e) for e in BODY]
+    assert table.mask(text).tolist() == expected
+
+def test_empty_filter_selects_all():
+    assert MobTable(BODY).mask("  ").all()
@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+from change_journal import ChangeJournal, JournalMismatch, journal_path, resolve_step
+from key_index import PrimaryKeyIndex
+
+POTION = {'Id': 501, 'AegisName': 'Red_Potion', 'Name': 'Red Potion'}
+
+@pytest.fixture
+def db_file(tmp_path):
+    path = tmp_path / "item_db.yml"
+    path.write_text("Header:\n  Type: ITEM_DB\n  Version: 3\n\nBody:\n  - Id: 501\n    AegisName: Red_Potion\n")
+    return str(path)
+
+def test_record_undo_redo_replay_forward(db_file):
+    journal = ChangeJournal(db_file); journal.start()
+    renamed = dict(POTION, Name='Big Red Potion')
+    journal.record("edit Red_Potion", [(POTION, renamed)])
+    assert journal.undo() == ("edit Red_Potion", [(renamed, POTION)])
+    assert journal.undo() is None
+    assert journal.redo() == ("edit Red_Potion", [(POTION, renamed)])
+    assert journal.redo() is None
+    assert ChangeJournal(db_file).pending() == [
+        ("edit Red_Potion", [[POTION, renamed]]),
+        ("undo edit Red_Potion", [[renamed, POTION]]),
+        ("edit Red_Potion", [[POTION, renamed]]),
+    ]
+    assert journal.unsaved == 3 and journal.undo_stack and not journal.redo_stack
+
+def test_record_clears_redo(db_file):
+    journal = ChangeJournal(db_file); journal.start()
+    journal.record("add", [(None, POTION)]); journal.undo()
+    journal.record("delete", [(POTION, None)])
+    assert journal.redo() is None and [label for label, _ in journal.undo_stack] == ["delete"]
+
+def test_compact_restarts_log_and_keeps_undo(db_file, tmp_path):
+    journal = ChangeJournal(db_file); journal.start()
+    journal.record("add", [(None, POTION)])
+    journal.compact()
+    assert ChangeJournal(db_file).pending() == [] and journal.unsaved == 0 and len(journal.undo_stack) == 1
+    other = tmp_path / "copy.yml"; other.write_text(open(db_file).read())
+    journal.compact(str(other))
+    assert not os.path.exists(journal_path(db_file)) and os.path.exists(journal_path(str(other)))
+
+def test_torn_last_line_is_dropped(db_file):
+    journal = ChangeJournal(db_file); journal.start()
+    journal.record("add", [(None, POTION)])
+    with open(journal.log_path, 'a', encoding='utf-8') as f: f.write('{"label": "edit", "chan')
+    assert ChangeJournal(db_file).pending() == [("add", [[None, POTION]])]
+
+def test_changed_file_is_a_mismatch(db_file):
+    journal = ChangeJournal(db_file); journal.start()
+    journal.record("add", [(None, POTION)])
+    with open(db_file, 'a') as f: f.write("  - Id: 502\n    AegisName: Orange_Potion\n")
+    recovered = ChangeJournal(db_file)
+    with pytest.raises(JournalMismatch): recovered.pending()
+    recovered.set_aside()
+    assert not os.path.exists(recovered.log_path) and os.path.exists(recovered.log_path + '.bak')
+    assert recovered.pending() == []
+
+def test_restamp_keeps_steps(db_file):
+    journal = ChangeJournal(db_file); journal.start()
+    journal.record("add", [(None, POTION)])
+    with open(db_file, 'a') as f: f.write("# merged\n")
+    journal.restamp()
+    assert ChangeJournal(db_file).pending() == [("add", [[None, POTION]])] and journal.unsaved == 1
+
+def test_resolve_step_counts_missed():
+    body = [dict(POTION), {'Id': 502, 'AegisName': 'Orange_Potion'}]
+    keys = PrimaryKeyIndex(body)
+    changes = json.loads(json.dumps([
+        [POTION, dict(POTION, Name='Potion')],
+        [{'Id': 502, 'AegisName': 'Orange_Potion', 'Name': 'stale'}, None],
+        [{'Id': 999, 'AegisName': 'Gone'}, None],
+        [None, {'Id': 503, 'AegisName': 'Yellow_Potion'}],
+    ]))
+    live, missed = resolve_step(keys, changes)
+    assert missed == 2
+    assert live[0][0] is body[0] and live[0][1]['Name'] == 'Potion'
+    assert live[1] == (None, {'Id': 503, 'AegisName': 'Yellow_Potion'})
@@ -0,0 +1,82 @@
+from db_merge import Version, diff_versions, merge3
+
+def _v(*entries): return Version({'Type': 'ITEM_DB', 'Version': 3}, [dict(e) for e in entries])
+
+KNIFE = {'Id': 1201, 'AegisName': 'Knife', 'Attack': 17, 'Jobs': {'Swordman': True, 'Thief': True}, 'Flags': {'NoRefine': True}}
+POTION = {'Id': 501, 'AegisName': 'Red_Potion', 'Buy': 10}
+
+def test_unchanged_and_same_change_settle_without_merging():
+    base = _v(POTION, KNIFE)
+    both = dict(KNIFE, Attack=20)
+    result = merge3(base, _v(POTION, both), _v(POTION, both))
+    assert result.pairs == [] and result.conflicts == {} and result.compared == 0
+
+def test_one_side_changed_takes_that_side():
+    base = _v(POTION, KNIFE)
+    theirs_knife, our_potion = dict(KNIFE, Attack=20), dict(POTION, Buy=12)
+    ours = _v(our_potion, KNIFE)
+    result = merge3(base, ours, _v(POTION, theirs_knife))
+    assert result.pairs == [(ours.body[1], theirs_knife)] and result.taken == 1 and result.compared == 0
+    assert not result.conflicts
+
+def test_added_and_deleted_in_theirs():
+    added = {'Id': 502, 'AegisName': 'Orange_Potion'}
+    ours = _v(POTION, KNIFE)
+    result = merge3(_v(POTION, KNIFE), ours, _v(KNIFE, added))
+    assert (None, added) in result.pairs and (ours.body[0], None) in result.pairs and not result.conflicts
+
+def test_deleted_ours_changed_theirs():
+    theirs_knife = dict(KNIFE, Attack=20)
+    result = merge3(_v(POTION, KNIFE), _v(POTION), _v(POTION, theirs_knife))
+    conflict = result.conflicts[1201]
+    assert conflict.kind == 'deleted_ours' and result.pairs == [(None, theirs_knife)]
+    assert conflict.resolve('ours', theirs_knife) is None and conflict.resolve('theirs', theirs_knife) is theirs_knife
+
+def test_deleted_theirs_changed_ours():
+    our_knife = dict(KNIFE, Attack=25)
+    result = merge3(_v(POTION, KNIFE), _v(POTION, our_knife), _v(POTION))
+    conflict = result.conflicts[1201]
+    assert conflict.kind == 'deleted_theirs' and result.pairs == []
+    assert conflict.resolve('ours', our_knife) is our_knife and conflict.resolve('theirs', our_knife) is None
+
+def test_both_changed_different_fields_merge_cleanly():
+    ours = _v(dict(KNIFE, Attack=25))
+    theirs = _v(dict(KNIFE, AegisName='Sharp_Knife', Slots=3))
+    result = merge3(_v(KNIFE), ours, theirs)
+    assert not result.conflicts and result.compared == 1 and result.taken == 1
+    assert result.pairs == [(ours.body[0], dict(KNIFE, Attack=25, AegisName='Sharp_Knife', Slots=3))]
+
+def test_nested_dict_fields_merge_key_by_key():
+    ours = _v(dict(KNIFE, Jobs={'Swordman': True, 'Thief': True, 'Knight': True}, Flags={}))
+    theirs = _v(dict(KNIFE, Jobs={'Swordman': True}, Flags={'NoRefine': False}))
+    result = merge3(_v(KNIFE), ours, theirs)
+    merged = result.pairs[0][1]
+    assert merged['Jobs'] == {'Swordman': True, 'Knight': True}
+    conflict = result.conflicts[1201]
+    assert conflict.kind == 'fields' and conflict.paths == ['Flags.NoRefine'] and merged['Flags'] == {}
+
+def test_conflicting_fields_keep_ours_and_resolve_to_theirs():
+    ours = _v(dict(KNIFE, Attack=25, Jobs={'Swordman': True, 'Thief': False}))
+    theirs = _v(dict({k: v for k, v in KNIFE.items() if k != 'Attack'}, Jobs={'Swordman': True}))
+    result = merge3(_v(KNIFE), ours, theirs)
+    conflict = result.conflicts[1201]
+    assert sorted(conflict.paths) == ['Attack', 'Jobs.Thief']
+    assert result.pairs == []
+    merged = ours.body[0]
+    assert merged['Attack'] == 25 and merged['Jobs'] == {'Swordman': True, 'Thief': False}
+    resolved = conflict.resolve('theirs', merged)
+    assert 'Attack' not in resolved and resolved['Jobs'] == {'Swordman': True}
+    assert conflict.resolve('ours', merged) is merged
+    assert "Attack: base 17, ours 25, theirs -" in conflict.describe()
+
+def test_empty_base_compares_two_files():
+    added = {'Id': 502, 'AegisName': 'Orange_Potion'}
+    ours = _v(POTION, KNIFE)
+    result = merge3(_v(), ours, _v(dict(POTION, Buy=12), KNIFE, added))
+    assert result.pairs == [(None, added)]
+    assert list(result.conflicts) == [501] and result.conflicts[501].paths == ['Buy']
+    assert result.conflicts[501].resolve('theirs', ours.body[0]) == dict(POTION, Buy=12)
+
+def test_diff_versions():
+    changes = diff_versions(_v(POTION, KNIFE), _v(dict(KNIFE, Jobs={'Swordman': True}), {'Id': 502}))
+    assert changes == [(1201, KNIFE, dict(KNIFE, Jobs={'Swordman': True}), ['Jobs.Thief']), (502, None, {'Id': 502}, []), (501, POTION, None, [])]
@@ -0,0 +1,61 @@
+from db_core import ITEM_SCHEMA
+from db_project import Project
+
+BASE = """Header:
+  Type: ITEM_DB
+  Version: 3
+
+Body:
+  - Id: 1201
+    AegisName: Knife
+    Name: Knife
+    Type: Weapon
+    Attack: 17
+    Refineable: true
+    Script: |
+      bonus bStr,1;
+  - Id: 1202
+    AegisName: Knife_
+    Name: Knife
+    Type: Weapon
+    Attack: 17
+
+Footer:
+  Imports:
+    - Path: db/import/item_db.yml
+"""
+IMPORT = """Header:
+  Type: ITEM_DB
+  Version: 3
+
+Body:
+  - Id: 1201
+    Attack: 30
+"""
+
+def _write(tmp_path):
+    (tmp_path / "db" / "import").mkdir(parents=True)
+    (tmp_path / "db" / "item_db.yml").write_text(BASE)
+    (tmp_path / "db" / "import" / "item_db.yml").write_text(IMPORT)
+
+def _project(tmp_path):
+    return Project.open(str(tmp_path / "db" / "item_db.yml"), ITEM_SCHEMA, root=str(tmp_path), workers=1)
+
+def test_override_keeps_only_changed_fields(tmp_path):
+    _write(tmp_path)
+    project = _project(tmp_path)
+    body = list(project.body)
+    body[0] = dict(body[0], Name='Sharp Knife')
+    assert project.save(body) == [str(tmp_path / "db" / "import" / "item_db.yml")]
+    assert (tmp_path / "db" / "item_db.yml").read_text() == BASE
+    assert _project(tmp_path).body[0] == dict(body[0])
+
+def test_removed_field_stays_removed(tmp_path):
+    _write(tmp_path)
+    project = _project(tmp_path)
+    body = list(project.body)
+    body[0] = {k: v for k, v in body[0].items() if k not in ('Refineable', 'Script')}
+    project.save(body)
+    assert (tmp_path / "db" / "item_db.yml").read_text() == BASE
+    knife = _project(tmp_path).body[0]
+    assert knife['Attack'] == 30 and knife['Refineable'] is False and not knife['Script']
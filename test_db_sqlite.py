@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+
+from db_core import ITEM_SCHEMA, MOB_SCHEMA, parse_query
+from db_sqlite import SqlTable, export_sqlite, import_sqlite
+from key_index import DuplicateKeyError
+from search_index import FieldIndex, TextIndex, parse_text_query
+
+ITEMS = [
+    {'Id': 501, 'AegisName': 'Red_Potion', 'Name': 'Red Potion', 'Type': 'Healing', 'Buy': 10, 'Weight': 70,
+     'Script': "itemheal rand(45,65),0;\n"},
+    {'Id': 1201, 'AegisName': 'Knife', 'Name': 'Knife', 'Type': 'Weapon', 'SubType': 'Dagger', 'Buy': 50, 'Attack': 17, 'Slots': 3,
+     'Jobs': {'Swordman': True, 'Thief': True}, 'Locations': {'Right_Hand': True}, 'Refineable': True,
+     'Script': "bonus bStr,1;\nbonus2 bAddRace,RC_Demon,5;\n"},
+    {'Id': 1202, 'AegisName': 'Cutter', 'Name': 'Cutter', 'Type': 'Weapon', 'SubType': 'Dagger', 'Attack': 30, 'Slots': 4,
+     'Jobs': {'Thief': True}, 'Locations': {'Right_Hand': True}, 'Refineable': True,
+     'Script': "bonus2 bAddRace,\nRC_Demon,10;\nbonus bStrength,2;\n", 'EquipScript': "sc_start SC_ENDURE,10000,1;\n"},
+    {'Id': 2301, 'AegisName': 'Cotton_Shirt', 'Name': 'Cotton Shirt', 'Type': 'Armor', 'Defense': 10,
+     'Locations': {'Armor': True}, 'Refineable': True, 'Trade': {'NoDrop': True}},
+]
+MOBS = [
+    {'Id': 1002, 'AegisName': 'PORING', 'Name': 'Poring', 'Level': 1, 'Race': 'Plant',
+     'Drops': [{'Item': 'Jellopy', 'Rate': 7000}, {'Item': 'Apple', 'Rate': 1000, 'StealProtected': True}]},
+    {'Id': 1039, 'AegisName': 'BAPHOMET', 'Name': 'Baphomet', 'Level': 81, 'Race': 'Demon', 'Class': 'Boss',
+     'Modes': {'Mvp': True}, 'MvpDrops': [{'Item': 'Yggdrasilberry', 'Rate': 2000}], 'Drops': [{'Item': 'Crescent_Scythe', 'Rate': 40}]},
+    {'Id': 1109, 'AegisName': 'DEVIRUCHI', 'Name': 'Deviruchi', 'Level': 64, 'Race': 'Demon'},
+]
+
+def _export(tmp_path, schema, body):
+    path = str(tmp_path / "ryde.db")
+    export_sqlite(path, schema, body, header={'Type': schema.db_type, 'Version': 3})
+    return path
+
+@pytest.mark.parametrize("schema, body", [(ITEM_SCHEMA, ITEMS), (MOB_SCHEMA, MOBS)])
+def test_round_trip(tmp_path, schema, body):
+    header, loaded = import_sqlite(_export(tmp_path, schema, body), schema)
+    assert header == {'Type': schema.db_type, 'Version': 3}
+    assert loaded == body
+
+def test_flattened_columns(tmp_path):
+    con = sqlite3.connect(_export(tmp_path, ITEM_SCHEMA, ITEMS))
+    con.row_factory = sqlite3.Row
+    knife = con.execute("SELECT * FROM item_db_re WHERE id = 1201").fetchone()
+    assert (knife['name_aegis'], knife['price_buy'], knife['job_swordman'], knife['job_thief'], knife['location_right_hand']) == ('Knife', 50, 1, 1, 1)
+    assert knife['location_armor'] is None
+    con.close()
+    con = sqlite3.connect(_export(tmp_path, MOB_SCHEMA, MOBS))
+    con.row_factory = sqlite3.Row
+    poring = con.execute("SELECT * FROM mob_db_re WHERE id = 1002").fetchone()
+    assert (poring['drop1_item'], poring['drop1_rate'], poring['drop2_item'], poring['drop2_nosteal']) == ('Jellopy', 7000, 'Apple', 1)
+    assert tuple(con.execute("SELECT mode_mvp, mvpdrop1_item FROM mob_db_re WHERE id = 1039").fetchone()) == (1, 'Yggdrasilberry')
+    con.close()
+
+def test_put_and_first_gap(tmp_path):
+    table = SqlTable(_export(tmp_path, ITEM_SCHEMA, ITEMS), ITEM_SCHEMA)
+    assert table.first_gap(501) == 502 and table.first_gap(1201) == 1203 and table.first_gap(600) == 600
+    table.put(None, {'Id': 502, 'AegisName': 'Orange_Potion', 'Flags': {'BuyingStore': True}})
+    assert table.get(502) == {'Id': 502, 'AegisName': 'Orange_Potion', 'Flags': {'BuyingStore': True}}
+    assert table.first_gap(501) == 503
+    with pytest.raises(DuplicateKeyError): table.put(None, {'Id': 501, 'AegisName': 'Other'})
+    with pytest.raises(DuplicateKeyError): table.put(502, {'Id': 502, 'AegisName': 'knife'})
+    table.put(502, {'Id': 503, 'AegisName': 'Orange_Potion'})
+    assert table.get(502) is None and table.get_by_name('orange_potion') == 503
+    table.delete(503)
+    assert len(table) == len(ITEMS)
+    table.close()
+
+@pytest.mark.parametrize("schema, body, query", [
+    (ITEM_SCHEMA, ITEMS, "Type=Weapon AND Attack>=20"),
+    (ITEM_SCHEMA, ITEMS, "Jobs=Thief"),
+    (ITEM_SCHEMA, ITEMS, "Jobs=Acolyte"),
+    (ITEM_SCHEMA, ITEMS, "Locations.Right_Hand=true OR Defense>5"),
+    (ITEM_SCHEMA, ITEMS, "NOT Refineable=true"),
+    (ITEM_SCHEMA, ITEMS, "Slots!=3"),
+    (ITEM_SCHEMA, ITEMS, "AegisName~pot"),
+    (ITEM_SCHEMA, ITEMS, "Trade.NoDrop=true"),
+    (MOB_SCHEMA, MOBS, "Race=Demon AND Level<80"),
+    (MOB_SCHEMA, MOBS, "Modes.Mvp=true"),
+    (MOB_SCHEMA, MOBS, "Class=Normal"),
+])
+def test_where_query_matches_field_index(tmp_path, schema, body, query):
+    table = SqlTable(_export(tmp_path, schema, body), schema)
+    index = FieldIndex()
+    for entry in body: index.add(entry['Id'], entry)
+    assert sorted(table.ids(*table.where_query(query))) == sorted(index.query(parse_query(query), schema))
+    table.close()
+
+@pytest.mark.parametrize("text", ["script: bonus2", "script: bstr*", "script: bstr", '"bAddRace RC_Demon"', '"bAddRace RC_Demon 10"', "sc_endure", "nothing"])
+def test_where_text_matches_text_index(tmp_path, text):
+    table = SqlTable(_export(tmp_path, ITEM_SCHEMA, ITEMS), ITEM_SCHEMA)
+    terms = parse_text_query(text)
+    index = TextIndex(('Script', 'EquipScript', 'UnEquipScript'))
+    entries = {e['Id']: e for e in ITEMS}
+    index.bulk_add(entries.items())
+    assert sorted(table.ids(*table.where_text(terms))) == sorted(index.search(terms, entries))
+    table.close()
@@ -0,0 +1,67 @@
+import pytest
+import yaml
+
+from db_loader import SafeLoader, load_db
+from db_writer import FileImage, save_db
+
+HEADER = {'Type': 'ITEM_DB', 'Version': 3}
+SOURCE = """Header:
+  Type: ITEM_DB
+  Version: 3
+
+Body:
+  - Id: 501
+    AegisName: Red_Potion
+    Name: Red Potion
+    Script: |
+      itemheal rand(45,65),0;
+  - Id: 502
+    AegisName: Orange_Potion
+    Name: Orange Potion
+    Script: |
+      itemheal rand(105,145),0;
+"""
+SCRIPT = ".@r = rand(105,145);\nif (.@r > 120) {\n  itemheal .@r,0;\n}\n"
+
+def test_edited_script_stays_literal_block(tmp_path):
+    path = tmp_path / "item_db.yml"
+    path.write_bytes(SOURCE.encode())
+    data, raw = load_db(str(path), 'ITEM_DB', with_raw=True)
+    body = data['Body']
+    image = FileImage.scan(raw, body)
+    body[1] = dict(body[1], Script=SCRIPT)
+    text, _ = image.render(body)
+    text = text.decode()
+    assert text.startswith(SOURCE.split("  - Id: 502")[0])
+    assert "    Script: |\n      .@r = rand(105,145);\n      if (.@r > 120) {\n        itemheal .@r,0;\n      }\n" in text
+    assert "'" not in text and '"' not in text and "..." not in text
+    assert yaml.load(text, Loader=SafeLoader)['Body'][1]['Script'] == SCRIPT
+
+def test_full_save_writes_literal_blocks(tmp_path):
+    path = tmp_path / "item_db.yml"
+    save_db(str(path), HEADER, [{'Id': 502, 'AegisName': 'Orange_Potion', 'Script': SCRIPT}])
+    text = path.read_text()
+    assert "  Script: |\n    .@r = rand(105,145);\n" in text
+    assert load_db(str(path), 'ITEM_DB')['Body'][0]['Script'] == SCRIPT
+
+@pytest.mark.parametrize("script", [
+    "a  \nb\n\n",
+    "bonus bStr,1;\n\n",
+    "\n",
+    "bonus bStr,1; \nbonus bAgi,1;\n",
+    "bonus bStr,1;\r\nbonus bAgi,1;\r\n",
+    "  bonus bStr,1;\nbonus bAgi,1;",
+    "\tif (.@a) {\n\t\tend;\n\t}\n",
+    "...\n---\n# not a comment\n",
+])
+def test_saved_strings_load_back_unchanged(tmp_path, script):
+    path = tmp_path / "item_db.yml"
+    body = [{'Id': 501, 'AegisName': 'Red_Potion', 'Script': script}, {'Id': 502, 'AegisName': 'Orange_Potion', 'Script': SCRIPT}]
+    save_db(str(path), HEADER, body)
+    assert [e['Script'] for e in load_db(str(path), 'ITEM_DB')['Body']] == [script, SCRIPT]
+    path.write_bytes(SOURCE.encode())
+    data, raw = load_db(str(path), 'ITEM_DB', with_raw=True)
+    image = FileImage.scan(raw, data['Body'])
+    data['Body'][0] = dict(data['Body'][0], Script=script)
+    path.write_bytes(image.render(data['Body'])[0])
+    assert [e['Script'] for e in load_db(str(path), 'ITEM_DB')['Body']] == [script, "itemheal rand(105,145),0;\n"]
@@ -0,0 +1,71 @@
+import random
+
+import pytest
+
+from db_core import ITEM_SCHEMA, get_path
+from entry_table import EntryTable, sort_key
+
+def _body(n=60, seed=3):
+    rng = random.Random(seed)
+    body = []
+    for i in range(n):
+        entry = {'Id': 500 + rng.randrange(40), 'AegisName': rng.choice(['knife', 'Knife', 'Cutter', 'apple', 'Zeny', ''])}
+        if rng.random() < 0.7: entry['Weight'] = rng.choice([0, 10, 10.5, 70, 'heavy', 'Heavy'])
+        if rng.random() < 0.5: entry['Jobs'] = rng.choice([{'Thief': True}, {'Swordman': True, 'Thief': True}, {}])
+        if rng.random() < 0.3: entry['Slots'] = None
+        body.append(entry)
+    return body
+
+def _expected(table, keys):
+    order = list(table.handles)
+    for field, reverse in reversed(keys):
+        order.sort(key=lambda h: sort_key(get_path(table[h], field, ITEM_SCHEMA)), reverse=reverse)
+    return order
+
+KEYS = [
+    [('Id', False)], [('Id', True)], [('AegisName', False)], [('Weight', True)], [('Jobs', False)], [('Slots', False)],
+    [('Weight', False), ('AegisName', True)], [('AegisName', True), ('Id', False), ('Jobs', True)],
+]
+
+def test_sort_key_orders_mixed_values():
+    values = ['b', 3, None, {'A': True}, 'A', 1.5, '', [1]]
+    assert sorted(values, key=sort_key) == [None, '', 1.5, 3, 'A', 'b', {'A': True}, [1]]
+
+@pytest.mark.parametrize("keys", KEYS)
+def test_order_matches_sorted(keys):
+    table = EntryTable(_body(), ITEM_SCHEMA)
+    assert table.order(keys) == _expected(table, keys)
+    assert table.order(keys) == _expected(table, keys)
+
+def test_order_after_edits():
+    rng = random.Random(5)
+    table = EntryTable(_body(), ITEM_SCHEMA)
+    for keys in KEYS: table.order(keys)
+    for step in range(40):
+        handle = rng.choice(table.handles)
+        if step % 7 == 6: table.remove(handle)
+        elif step % 5 == 4: table.add({'Id': rng.randrange(480, 560), 'AegisName': rng.choice(['new', 'Knife']), 'Weight': rng.choice([5, 'x'])})
+        else: table.replace(handle, dict(table[handle], Weight=rng.choice([1, 70, 999, 'Heavy', None]), AegisName=rng.choice(['a', 'Zeny'])))
+        for keys in KEYS: assert table.order(keys) == _expected(table, keys), (step, keys)
+    assert [table[h] for h in table.handles] == table.body
+
+def test_replace_keeps_handle_and_slot():
+    body = _body(10)
+    table = EntryTable(body, ITEM_SCHEMA)
+    entry = dict(body[4], Id=1)
+    table.replace(4, entry)
+    assert table[4] is entry and body[4] is entry and table.handle(entry) == 4 and table.slot(4) == 4
+    assert table.order([('Id', False)])[0] == 4
+
+def test_add_places_new_entry_after_smaller_ids():
+    body = [{'Id': 501}, {'Id': 503}, {'Id': 510}]
+    table = EntryTable(body, ITEM_SCHEMA)
+    handle = table.add({'Id': 504})
+    assert handle == 3 and [e['Id'] for e in body] == [501, 503, 504, 510]
+    table.remove(1)
+    assert [e['Id'] for e in body] == [501, 504, 510] and 1 not in table
+
+def test_select_keeps_order():
+    table = EntryTable(_body(20), ITEM_SCHEMA)
+    order = table.order([('AegisName', True)])
+    assert table.select(order, {3, 7, 11}) == [h for h in order if h in (3, 7, 11)]
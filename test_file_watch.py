@@ -0,0 +1,119 @@
+import os
+
+import pytest
+
+from db_loader import load_db
+from db_writer import FileImage, dump_entry
+from file_watch import FileWatcher, diff_file, split_changes
+from key_index import PrimaryKeyIndex
+
+HEAD = b"Header:\n  Type: ITEM_DB\n  Version: 3\n\nBody:\n"
+
+def _entry(i, **fields): return dict({'Id': 500 + i, 'AegisName': f'Item_{i}', 'Buy': i * 10}, **fields)
+
+def _raw(entries, head=HEAD, tail=b""): return head + b"".join(dump_entry(e) for e in entries) + tail
+
+@pytest.fixture
+def loaded(tmp_path):
+    path = tmp_path / "item_db.yml"
+    path.write_bytes(_raw([_entry(i) for i in range(10)], tail=b"\nFooter:\n  Imports:\n    - Path: db/import/item_db.yml\n"))
+    data, raw = load_db(str(path), 'ITEM_DB', with_raw=True)
+    return data['Body'], FileImage.scan(raw, data['Body'])
+
+def _changed(image, old, new):
+    return image.raw.replace(dump_entry(old), dump_entry(new)) if new is not None else image.raw.replace(dump_entry(old), b"")
+
+def _check_image(diff, raw):
+    # The new image covers the new bytes: unchanged entries re-render to them.
+    assert diff.image.raw == raw
+    assert diff.image.render(diff.image.entries)[0] == raw
+
+@pytest.mark.parametrize("i", [0, 4, 9])
+def test_edit_at_start_middle_and_end(loaded, i):
+    body, image = loaded
+    raw = _changed(image, body[i], _entry(i, Buy=99999))
+    diff = diff_file(image, raw)
+    assert diff.pairs == [(body[i], _entry(i, Buy=99999))] and diff.pairs[0][0] is body[i]
+    assert diff.parsed == 1 and diff.header is None
+    assert [e is b for e, b in zip(diff.image.entries, body)] == [j != i for j in range(10)]
+    _check_image(diff, raw)
+
+def test_header_change(loaded):
+    body, image = loaded
+    raw = image.raw.replace(b"Version: 3", b"Version: 4")
+    diff = diff_file(image, raw)
+    assert diff.header == {'Type': 'ITEM_DB', 'Version': 4} and diff.pairs == [] and diff.parsed == 0
+    assert all(e is b for e, b in zip(diff.image.entries, body))
+    _check_image(diff, raw)
+
+@pytest.mark.parametrize("where", [0, 5, 10])
+def test_added_entry(loaded, where):
+    body, image = loaded
+    added = _entry(42)
+    raw = _raw(body[:where] + [added] + body[where:], tail=image.raw[image.suffix_start:])
+    diff = diff_file(image, raw)
+    assert diff.pairs == [(None, added)] and diff.parsed == 1
+    assert len(diff.image.entries) == 11 and sum(e is not b for e, b in zip(diff.image.entries, body[:where])) == 0
+    _check_image(diff, raw)
+
+@pytest.mark.parametrize("i", [0, 5, 9])
+def test_removed_entry(loaded, i):
+    body, image = loaded
+    raw = _changed(image, body[i], None)
+    diff = diff_file(image, raw)
+    assert diff.pairs == [(body[i], None)] and diff.pairs[0][0] is body[i] and diff.parsed == 0
+    assert diff.image.entries == body[:i] + body[i + 1:]
+    _check_image(diff, raw)
+
+def test_moved_entry_and_comment_only_change(loaded):
+    body, image = loaded
+    raw = _raw([body[3]] + body[:3] + body[4:], tail=image.raw[image.suffix_start:])
+    diff = diff_file(image, raw)
+    assert diff.pairs == [] and diff.parsed == 0 and diff.image.entries[0] is body[3]
+    raw = image.raw.replace(dump_entry(body[2]), dump_entry(body[2]).replace(b"Buy: 20\n", b"Buy: 20 # cheaper\n"))
+    diff = diff_file(image, raw)
+    assert diff.pairs == [] and diff.parsed == 1 and diff.image.entries[2] is body[2]
+
+def test_split_changes(loaded):
+    body, image = loaded
+    keys = PrimaryKeyIndex(body)
+    edited = _entry(1, Buy=1)
+    keys.replace(body[1], edited); body[1] = edited; image.mark_dirty(edited)
+    pairs = [(body[0], _entry(0, Buy=5)),                          # untouched here: taken
+             (image.entries[1], _entry(1, Buy=7)),                 # edited here too: conflict
+             (image.entries[2], None),                             # deleted there: taken
+             (None, _entry(42)),                                   # new Id: taken
+             (None, _entry(3)),                                    # Id added there and here: same entry, nothing to do
+             (None, _entry(4, Buy=1))]                             # Id added there, different here: conflict
+    take, conflicts = split_changes(pairs, body, image, keys)
+    assert take == [pairs[0], pairs[2], pairs[3]]
+    assert conflicts == [(edited, _entry(1, Buy=7)), (body[4], _entry(4, Buy=1))]
+    assert split_changes([(image.entries[1], edited)], body, image, keys) == ([], [])
+
+class _Widget:
+    def __init__(self): self.jobs = []
+    def after(self, ms, fn): self.jobs.append(fn); return len(self.jobs)
+    def after_cancel(self, job): pass
+
+def test_watcher_reports_after_two_equal_polls(tmp_path):
+    path = tmp_path / "item_db.yml"; path.write_bytes(HEAD)
+    seen, widget = [], _Widget()
+    watcher = FileWatcher(widget, seen.append)
+    watcher.watch([str(path)])
+    watcher._poll()
+    assert seen == []
+    path.write_bytes(HEAD + b"  - Id: 501\n"); os.utime(path, ns=(1, 1))
+    watcher._poll()
+    assert seen == []
+    path.write_bytes(HEAD + b"  - Id: 501\n  - Id: 502\n"); os.utime(path, ns=(2, 2))
+    watcher._poll()
+    assert seen == []
+    watcher._poll()
+    assert seen == [[str(path)]] and watcher.paused
+    watcher._poll()
+    assert len(seen) == 1
+    watcher.sync()
+    watcher._poll(); watcher._poll()
+    assert len(seen) == 1
+    watcher.stop()
+    assert watcher.stamps == {}
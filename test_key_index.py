@@ -0,0 +1,36 @@
+import pytest
+
+from key_index import DuplicateKeyError, PrimaryKeyIndex
+
+def _index(*ids): return PrimaryKeyIndex({'Id': i, 'AegisName': f'E{i}'} for i in ids)
+
+@pytest.mark.parametrize("ids, start, expected", [
+    ((), 501, 501),
+    ((501, 502, 503), 501, 504),
+    ((501, 502, 504), 501, 503),
+    ((1, 2, 3, 10, 11), 1, 4),
+    ((1, 2, 3, 10, 11), 10, 12),
+    ((1, 2, 3, 10, 11), 5, 5),
+    ((5, 6), 1, 1),
+    (tuple(range(1, 1000)) + (1001,), 1, 1000),
+])
+def test_first_gap(ids, start, expected):
+    assert _index(*ids).first_gap(start) == expected
+
+def test_first_gap_after_remove():
+    index = _index(501, 502, 503)
+    index.remove(index.get(502))
+    assert index.first_gap(501) == 502
+
+def test_duplicates_rejected():
+    index = _index(501, 502)
+    with pytest.raises(DuplicateKeyError, match="Id 501"): index.add({'Id': 501, 'AegisName': 'Other'})
+    with pytest.raises(DuplicateKeyError, match="AegisName 'e502'"): index.check({'Id': 600, 'AegisName': 'e502'})
+    entry = index.get(501)
+    index.check(dict(entry, Name='Renamed'), replacing=entry)
+    with pytest.raises(DuplicateKeyError): index.replace(entry, {'Id': 502, 'AegisName': 'E501'})
+    assert index.get(501) is entry and len(index) == 2
+
+def test_duplicates_collected_on_build():
+    index = PrimaryKeyIndex([{'Id': 1, 'AegisName': 'A'}, {'Id': 1, 'AegisName': 'B'}, {'Id': 2, 'AegisName': 'a'}])
+    assert len(index) == 1 and len(index.duplicates) == 2
@@ -0,0 +1,75 @@
+import pytest
+
+from db_loader import DBLoadError, load_db
+from lazy_body import LazyEntry, open_lazy
+
+SOURCE = """Header:
+  Type: ITEM_DB
+  Version: 3
+
+Body:
+  - Id: 501
+    AegisName: Red_Potion
+    Name: Red Potion
+    Buy: 10
+  - Id: 0x1F6
+    AegisName: "Orange_Potion"
+    Name: 'It''s orange'   # quoted, with a comment
+  - Id: 503
+    Name: Yes
+    AegisName: Yellow_Potion
+    Script: |
+      itemheal rand(105,145),0;
+  - AegisName: White_Potion
+    Id: 504
+    Name: "Potion: white"
+  - Id: 505
+    AegisName: Blue_Potion
+    Name: >-
+      Blue
+      Potion
+  - Id: 506
+    AegisName: 1234
+    Name: null
+  - Id: 507
+    AegisName: Green_Potion
+    Jobs:
+      Name: true
+"""
+
+@pytest.fixture
+def lazy(tmp_path):
+    path = tmp_path / "item_db.yml"; path.write_text(SOURCE)
+    header, body, image, source = open_lazy(str(path), 'ITEM_DB', cache_size=2)
+    yield header, body, image, source, load_db(str(path), 'ITEM_DB')['Body']
+    source.close()
+
+def test_summary_fields_match_full_parse(lazy):
+    header, body, _, source, parsed = lazy
+    assert header == {'Type': 'ITEM_DB', 'Version': 3} and len(body) == len(parsed)
+    for entry, full in zip(body, parsed):
+        assert isinstance(entry, LazyEntry)
+        for key in ('Id', 'AegisName', 'Name'):
+            assert entry.get(key) == full.get(key), (full, key)
+    # Only entries whose summary is not on one line (505's folded Name) or is absent (507 has no Name) were parsed.
+    assert sorted(e['Id'] for e in source.parsed.values()) == [505, 507]
+
+def test_other_fields_parse_on_demand(lazy):
+    _, body, _, source, parsed = lazy
+    assert body[0]['Buy'] == 10 and dict(body[2]) == parsed[2] and body == parsed
+    assert 'Script' in body[2] and 'Script' not in body[0] and body[0].get('Script', 'none') == 'none'
+    with pytest.raises(KeyError): body[0]['Script']
+    assert len(source.parsed) == 2  # cache_size
+
+def test_image_renders_the_file_unchanged(lazy):
+    _, body, image, _, _ = lazy
+    assert image.render(body)[0] == SOURCE.encode()
+    edited = list(body); edited[1] = dict(body[1], Buy=5)
+    text = image.render(edited)[0].decode()
+    assert "Buy: 5" in text and text.count("Id:") == 7
+
+def test_rejects_entries_without_leading_ids(tmp_path):
+    path = tmp_path / "item_db.yml"
+    path.write_text(SOURCE.replace("  - Id: 507\n    AegisName: Green_Potion\n", "  - AegisName: Green_Potion\n"))
+    with pytest.raises(DBLoadError): open_lazy(str(path), 'ITEM_DB')
+    with pytest.raises(DBLoadError): open_lazy(str(path), 'MOB_DB')
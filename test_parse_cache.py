@@ -0,0 +1,70 @@
+import os
+import pickle
+
+from db_loader import load_db
+from parse_cache import ParseCache
+
+SOURCE = b"Header:\n  Type: ITEM_DB\n  Version: 3\n\nBody:\n  - Id: 501\n    AegisName: Red_Potion\n"
+DATA = {'Header': {'Type': 'ITEM_DB', 'Version': 3}, 'Body': [{'Id': 501, 'AegisName': 'Red_Potion'}]}
+
+def _setup(tmp_path, source=SOURCE):
+    path = tmp_path / "item_db.yml"; path.write_bytes(source)
+    return str(path), ParseCache(str(tmp_path / "cache"))
+
+def test_hit_after_put(tmp_path):
+    path, cache = _setup(tmp_path)
+    assert cache.get(path) is None
+    cache.put(path, DATA)
+    assert cache.get(path) == DATA and cache.get(path, SOURCE) == DATA
+
+def test_size_change_misses(tmp_path):
+    path, cache = _setup(tmp_path)
+    cache.put(path, DATA)
+    with open(path, 'ab') as f: f.write(b"  - Id: 502\n")
+    assert cache.get(path) is None
+
+def test_touched_file_is_checked_by_hash(tmp_path):
+    path, cache = _setup(tmp_path)
+    cache.put(path, DATA)
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+    assert cache.get(path) == DATA
+    with open(path, 'wb') as f: f.write(SOURCE.replace(b"Red_Potion", b"Red_Potiom"))
+    assert os.path.getsize(path) == st.st_size and cache.get(path) is None
+
+def test_raw_given_is_always_hashed(tmp_path):
+    path, cache = _setup(tmp_path)
+    cache.put(path, DATA)
+    assert cache.get(path, SOURCE.replace(b"501", b"502")) is None
+
+def test_stale_version_and_broken_entry_miss(tmp_path):
+    path, cache = _setup(tmp_path)
+    cache.put(path, DATA)
+    entry_path = cache._entry_path(path)
+    with open(entry_path, 'rb') as f: entry = pickle.load(f)
+    with open(entry_path, 'wb') as f: pickle.dump(dict(entry, version=0), f)
+    assert cache.get(path) is None
+    with open(entry_path, 'wb') as f: f.write(b"not a pickle")
+    assert cache.get(path) is None
+    cache.put(path, DATA); cache.invalidate(path)
+    assert cache.get(path) is None and not os.path.exists(entry_path)
+
+def test_eviction_drops_least_recently_used(tmp_path):
+    cache = ParseCache(str(tmp_path / "cache"))
+    paths = []
+    for i in range(4):
+        path = tmp_path / f"item_db_{i}.yml"; path.write_bytes(SOURCE)
+        cache.put(str(path), dict(DATA, pad='x' * 4000)); paths.append(str(path))
+        os.utime(cache._entry_path(str(path)), (1000 + i, 1000 + i))
+    cache.get(paths[0])
+    cache.max_bytes = 3 * os.path.getsize(cache._entry_path(paths[0]))
+    cache.evict()
+    assert [cache.get(p) is not None for p in paths] == [True, False, True, True]
+
+def test_load_db_uses_cache(tmp_path):
+    path, cache = _setup(tmp_path)
+    assert load_db(path, 'ITEM_DB', cache=cache) == DATA
+    with open(cache._entry_path(path), 'rb') as f: entry = pickle.load(f)
+    entry['data'] = dict(DATA, Body=[])
+    with open(cache._entry_path(path), 'wb') as f: pickle.dump(entry, f)
+    assert load_db(path, 'ITEM_DB', cache=cache)['Body'] == []
@@ -0,0 +1,56 @@
+import pytest
+
+from db_core import ITEM_SCHEMA, MOB_SCHEMA
+from db_writer import dump_entry, dump_full
+from record_store import CompactRecord, compact_entries
+
+LONG_SCRIPT = "bonus bStr,1;\n" * 20
+ITEMS = [
+    {'Id': 501, 'AegisName': 'Red_Potion', 'Name': 'Red Potion', 'Type': 'Healing', 'Buy': 10, 'Weight': 70, 'Script': "itemheal 45,0;\n"},
+    {'Id': 1201, 'AegisName': 'Knife', 'Type': 'Weapon', 'SubType': 'Dagger', 'Attack': 17, 'Refineable': True,
+     'Jobs': {'Thief': True}, 'Script': LONG_SCRIPT, 'Custom': [1, 2]},
+    {'Type': 'Weapon', 'Id': 1202, 'Buy': 1 << 70, 'Refineable': 'yes', 'Weight': 0},
+    {'Id': 1203},
+]
+
+@pytest.fixture
+def records(): return compact_entries(ITEM_SCHEMA, [dict(e) for e in ITEMS])
+
+def test_records_read_like_the_dicts(records):
+    for record, entry in zip(records, ITEMS):
+        assert isinstance(record, CompactRecord) and record == entry and list(record) == list(entry)
+        assert dict(record) == entry and record.copy() == entry and len(record) == len(entry)
+    assert 'Attack' not in records[0] and records[0].get('Attack', 'x') == 'x'
+    with pytest.raises(KeyError): records[0]['Attack']
+
+def test_mutation(records):
+    knife = records[1]
+    knife['Attack'] = 30; knife['Script'] = "bonus bAgi,1;\n"; knife['Type'] = 'Armor'; knife['Slots'] = 2
+    knife['Jobs'] = {'Swordman': True}; knife['Refineable'] = 'no'
+    del knife['SubType']; del knife['Custom']
+    assert dict(knife) == {'Id': 1201, 'AegisName': 'Knife', 'Type': 'Armor', 'Attack': 30, 'Refineable': 'no',
+                           'Jobs': {'Swordman': True}, 'Script': "bonus bAgi,1;\n", 'Slots': 2}
+    assert list(knife)[-1] == 'Slots'
+    with pytest.raises(KeyError): del knife['SubType']
+    assert records[0] == ITEMS[0] and records[2] == ITEMS[2] and records[3] == ITEMS[3]
+
+def test_new_columns_do_not_leak_into_other_rows(records):
+    records[3]['Attack'] = 5
+    records[3]['Weight'] = 0
+    assert 'Attack' not in records[0] and records[3] == {'Id': 1203, 'Attack': 5, 'Weight': 0}
+    assert records[2]['Weight'] == 0 and records[0]['Weight'] == 70
+
+def test_dumps_like_the_dicts(records):
+    for record, entry in zip(records, ITEMS): assert dump_entry(record) == dump_entry(entry)
+    assert dump_full({'Type': 'ITEM_DB', 'Version': 3}, records) == dump_full({'Type': 'ITEM_DB', 'Version': 3}, ITEMS)
+
+def test_non_dicts_are_kept():
+    marker = object()
+    assert compact_entries(MOB_SCHEMA, [marker])[0] is marker
+
+def test_mob_drops():
+    mobs = [{'Id': 1002, 'AegisName': 'PORING', 'Level': 1, 'Size': 'Small', 'Drops': [{'Item': 'Jellopy', 'Rate': 7000}]}]
+    record = compact_entries(MOB_SCHEMA, [dict(m) for m in mobs])[0]
+    assert record == mobs[0] and record['Size'] == 'Small' and record.get('Race') is None
+    record['Drops'] = record['Drops'] + [{'Item': 'Apple', 'Rate': 100}]; record['Size'] = 'Large'
+    assert record == dict(mobs[0], Drops=[{'Item': 'Jellopy', 'Rate': 7000}, {'Item': 'Apple', 'Rate': 100}], Size='Large')
@@ -0,0 +1,17 @@
+from db_loader import load_db
+from ryde_bench import SURROGATES, generate_items, main, write_db
+
+def test_fixtures_write_literal_scripts(tmp_path):
+    items = generate_items(200)
+    path = tmp_path / "item_db.yml"
+    write_db(str(path), 'ITEM_DB', items)
+    text = path.read_text()
+    assert "    Script: |\n" in text and "Script: '" not in text and 'Script: "' not in text
+    assert load_db(str(path), 'ITEM_DB')['Body'] == items
+
+def test_every_group_has_a_surrogate(tmp_path, capsys):
+    assert main(["--sizes", "50", "--repeat", "1", "--no-memory", "-o", str(tmp_path / "out.json")]) == 0
+    out = capsys.readouterr().out
+    groups = {line.split()[0].split('/', 2)[2] for line in out.splitlines() if line.count('/') >= 2 and ' n=' in line}
+    assert groups == set(SURROGATES)
+    assert all(method in out for method in SURROGATES.values())
@@ -0,0 +1,102 @@
+import pytest
+
+from db_core import ITEM_SCHEMA, compile_query, parse_query
+from search_index import SearchIndex, is_text_query, parse_text_query, text_hits
+
+BODY = [
+    {'Id': 501, 'AegisName': 'Red_Potion', 'Type': 'Healing', 'Weight': 70},
+    {'Id': 502, 'AegisName': 'Orange_Potion', 'Type': 'Healing', 'Weight': 100},
+    {'Id': 1201, 'AegisName': 'Knife', 'Type': 'Weapon', 'Attack': 17, 'Jobs': {'Swordman': True, 'Thief': True}},
+    {'Id': 1202, 'AegisName': 'Cutter', 'Type': 'Weapon', 'Attack': 30, 'Jobs': {'Thief': True}, 'Refineable': True},
+    {'Id': 15011, 'AegisName': 'Red_Robe', 'Type': 'Armor', 'Defense': 5},
+]
+
+def _scan(body, term):
+    term = term.lower()
+    return {i for i, e in enumerate(body) if term in str(e['Id']) or term in e['AegisName'].lower()}
+
+def test_search_matches_substring_scan():
+    index = SearchIndex(enumerate(BODY))
+    for term in ("red", "RED_", "potion", "50", "1", "o", "120", "xyz", "robe"):
+        assert index.search(term) == _scan(BODY, term), term
+    assert index.search("") is None
+
+def test_typing_narrows_from_last_result():
+    index = SearchIndex(enumerate(BODY))
+    results = [index.search(term) for term in ("r", "re", "red", "red_p", "red_r")]
+    assert results == [_scan(BODY, t) for t in ("r", "re", "red", "red_p", "red_r")]
+    assert index.search("potion") == {0, 1}
+
+def test_update_and_remove_reset_the_narrowing_cache():
+    index = SearchIndex(enumerate(BODY))
+    assert index.search("red") == {0, 4}
+    index.update(1, dict(BODY[1], AegisName='Red_Herb'))
+    assert index.search("red") == {0, 1, 4} and index.search("orange") == set()
+    index.remove(0)
+    assert index.search("red") == {1, 4} and index.search("501") == {4} and len(index) == 4
+    index.add(7, {'Id': 607, 'AegisName': 'Yggdrasilberry'})
+    assert index.search("607") == {7}
+
+@pytest.mark.parametrize("query", [
+    "Type=Weapon", "type=weapon", "Type!=Weapon", "Attack>=20", "Attack<20", "Attack=17", "Attack!=17", "Weight>70",
+    "Weight<=70", "AegisName~potion", "Jobs=Thief", "Jobs=Swordman", "Jobs.Thief=true", "Refineable=true", "Refineable=false",
+    "Type=Weapon AND Attack>=20", "Type=Armor OR Weight>=100", "NOT Type=Healing", "NOT (Type=Healing OR Attack>20) AND Id<2000",
+])
+def test_field_queries_match_compiled_query(query):
+    index = SearchIndex(enumerate(BODY))
+    match = compile_query(parse_query(query), ITEM_SCHEMA)
+    assert index.query(query, ITEM_SCHEMA) == {i for i, e in enumerate(BODY) if match(e)}
+
+def test_field_index_follows_edits():
+    index = SearchIndex(enumerate(BODY))
+    assert index.query("Attack>=20", ITEM_SCHEMA) == {3}
+    index.update(2, dict(BODY[2], Attack=25))
+    index.remove(3)
+    index.add(9, {'Id': 1203, 'AegisName': 'Main_Gauche', 'Type': 'Weapon', 'Attack': 40})
+    assert index.query("Attack>=20", ITEM_SCHEMA) == {2, 9}
+    assert index.query("Type=Weapon AND NOT Attack=40", ITEM_SCHEMA) == {2}
+
+def test_malformed_query_raises():
+    with pytest.raises(ValueError): SearchIndex(enumerate(BODY)).query("(Type=Weapon AND", ITEM_SCHEMA)
+
+SCRIPTED = [
+    {'Id': 1201, 'AegisName': 'Knife', 'Script': "bonus bStr,1;\nbonus2 bAddRace,RC_Demon,5;\n"},
+    {'Id': 1202, 'AegisName': 'Cutter', 'Script': "bonus2 bAddRace,\nRC_Demon,10;\n", 'EquipScript': "sc_start SC_ENDURE,10000,1;\n"},
+    {'Id': 1203, 'AegisName': 'Main_Gauche', 'Script': "bonus bStrength,2; bonus2 bAddRace,RC_Boss,5;\n"},
+    {'Id': 501, 'AegisName': 'Red_Potion'},
+]
+
+def test_parse_text_query():
+    assert is_text_query("  Script: bonus") and not is_text_query("Type=Weapon")
+    assert parse_text_query('script: bonus bStr "bAddRace RC_Demon" getref* "x"') == [
+        ('token', 'bonus'), ('token', 'bstr'), ('phrase', ['baddrace', 'rc_demon']), ('prefix', 'getref'), ('token', 'x')]
+
+@pytest.mark.parametrize("text, expected", [
+    ("script: bonus2", {0, 1, 2}),
+    ("script: bstr", {0}),
+    ("script: bstr*", {0, 2}),
+    ("script: bonus bstr", {0}),
+    ('script: "bAddRace RC_Demon"', {0, 1}),
+    ('script: "bonus2 bAddRace RC_Demon 10"', {1}),
+    ('script: "RC_Demon bAddRace"', set()),
+    ("script: sc_endure", {1}),
+    ("script: itemheal", set()),
+])
+def test_script_search(text, expected):
+    index = SearchIndex(enumerate(SCRIPTED), ('Script', 'EquipScript', 'UnEquipScript'))
+    assert index.search_text(parse_text_query(text)) == expected
+
+def test_script_index_follows_edits():
+    index = SearchIndex(enumerate(SCRIPTED))
+    with pytest.raises(ValueError): index.search_text(parse_text_query("script: bonus"))
+    index.index_text(('Script', 'EquipScript', 'UnEquipScript'))
+    index.update(0, dict(SCRIPTED[0], Script="bonus bAgi,1;\n"))
+    index.remove(1)
+    index.add(9, {'Id': 1204, 'AegisName': 'Stiletto', 'Script': "bonus2 bAddRace,RC_Demon,7;\n"})
+    assert index.search_text(parse_text_query('script: "bAddRace RC_Demon"')) == {9}
+    assert index.search_text(parse_text_query("script: bstr*")) == {2}
+    assert index.search_text(parse_text_query("script: bagi")) == {0}
+
+def test_text_hits_span_the_phrase():
+    script = SCRIPTED[1]['Script']
+    assert [script[a:b] for a, b in text_hits(script, parse_text_query('script: "bAddRace RC_Demon"'))] == ["bAddRace,\nRC_Demon"]
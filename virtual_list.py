@@ -0,0 +1,115 @@
+from tkinter import ttk
+
+class VirtualTreeview:
+    # Only a window of rows around the viewport is inserted into the Treeview; the scrollbar
+    # tracks the position in the full key list, the Treeview's own yview only scrolls inside the window.
+    def __init__(self, tree, scrollbar, values_fn, on_select=None, overscan=30):
+        self.tree, self.scrollbar, self.values_fn, self.on_select = tree, scrollbar, values_fn, on_select
+        self.overscan = overscan
+        self.keys, self.positions, self.window_keys = [], {}, {}
+        self.top, self.win_start, self.win_end = 0, 0, 0
+        self.visible = max(int(tree.cget("height")), 1)
+        self.selected_key, self._last_reported, self._busy = None, None, False
+        try: self.row_height = int(ttk.Style().lookup("Treeview", "rowheight") or 20)
+        except (ValueError, TypeError): self.row_height = 20
+        self.scrollbar.configure(command=self._on_scrollbar)
+        self.tree.configure(yscrollcommand=self._on_tree_scrolled)
+        self.tree.bind("<<TreeviewSelect>>", self._on_tree_select)
+        self.tree.bind("<Configure>", self._on_configure, add="+")
+
+    def __len__(self): return len(self.keys)
+
+    def set_rows(self, keys, keep_top=False):
+        self.keys = list(keys)
+        self.positions = {k: i for i, k in enumerate(self.keys)}
+        self.top = min(self.top, self._max_top()) if keep_top else 0
+        self._materialize()
+
+    def refresh(self, key=None):
+        # Re-read values for one materialized row (or all of them) after an entry changed.
+        for k in ([key] if key is not None else self.keys[self.win_start:self.win_end]):
+            if self.tree.exists(str(k)): self.tree.item(str(k), values=self.values_fn(k))
+
+    def selection(self):
+        return (str(self.selected_key),) if self.selected_key is not None and self.selected_key in self.positions else ()
+
+    def select(self, key, see=True):
+        if key not in self.positions: return
+        self.selected_key, self._last_reported = key, None
+        if see: self.see(key)
+        iid = str(key)
+        if self.tree.exists(iid): self.tree.selection_set(iid); self.tree.focus(iid)
+
+    def clear_selection(self):
+        self.selected_key = self._last_reported = None
+        if sel := self.tree.selection(): self.tree.selection_remove(*sel)
+
+    def see(self, key):
+        if (pos := self.positions.get(key)) is None: return
+        if pos < self.top: self._scroll_to(pos)
+        elif pos >= self.top + self.visible: self._scroll_to(pos - self.visible + 1)
+
+    def _max_top(self): return max(len(self.keys) - self.visible, 0)
+
+    def _materialize(self):
+        self._busy = True
+        try:
+            n = len(self.keys)
+            self.win_start = max(self.top - self.overscan, 0)
+            self.win_end = min(self.top + self.visible + self.overscan, n)
+            self.tree.delete(*self.tree.get_children())
+            self.window_keys = {str(k): k for k in self.keys[self.win_start:self.win_end]}
+            for k in self.keys[self.win_start:self.win_end]:
+                self.tree.insert("", "end", iid=str(k), values=self.values_fn(k))
+            if self.selected_key is not None and self.tree.exists(str(self.selected_key)):
+                self.tree.selection_set(str(self.selected_key)); self.tree.focus(str(self.selected_key))
+            win_len = self.win_end - self.win_start
+            if win_len: self.tree.yview_moveto((self.top - self.win_start) / win_len)
+        finally: self._busy = False
+        self._update_scrollbar()
+
+    def _scroll_to(self, top, from_tree=False):
+        self.top = min(max(int(top), 0), self._max_top())
+        margin = self.overscan // 2
+        low_ok = self.win_start == 0 or self.top >= self.win_start + margin
+        high_ok = self.win_end == len(self.keys) or self.top + self.visible <= self.win_end - margin
+        if low_ok and high_ok and self.win_end > self.win_start:
+            if not from_tree:
+                self._busy = True
+                try: self.tree.yview_moveto((self.top - self.win_start) / (self.win_end - self.win_start))
+                finally: self._busy = False
+            self._update_scrollbar()
+        else: self._materialize()
+
+    def _update_scrollbar(self):
+        n = len(self.keys)
+        if not n: self.scrollbar.set(0, 1); return
+        self.scrollbar.set(self.top / n, min((self.top + self.visible) / n, 1.0))
+
+    def _on_scrollbar(self, *args):
+        if args[0] == "moveto": self._scroll_to(round(float(args[1]) * len(self.keys)))
+        elif args[0] == "scroll":
+            step = int(args[1]) * (self.visible if args[2] == "pages" else 1)
+            self._scroll_to(self.top + step)
+
+    def _on_tree_scrolled(self, first, last):
+        # Internal scrolling (mouse wheel, keyboard focus, see()) moved the view inside the window.
+        if self._busy: return
+        win_len = self.win_end - self.win_start
+        if not win_len: return
+        top = self.win_start + round(float(first) * win_len)
+        if top != self.top: self._scroll_to(top, from_tree=True)
+
+    def _on_configure(self, event):
+        visible = max((event.height - self.row_height) // self.row_height, 1)
+        if visible != self.visible:
+            self.visible = visible
+            self.top = min(self.top, self._max_top())
+            self._materialize()
+
+    def _on_tree_select(self, event=None):
+        if not (sel := self.tree.selection()) or (key := self.window_keys.get(sel[0])) is None: return
+        self.selected_key = key
+        if key == self._last_reported: return
+        self._last_reported = key
+        if self.on_select: self.on_select(event)
@@ -0,0 +1,55 @@
+import difflib
+import os
+from collections import defaultdict
+
+DROP_LIST_FIELDS = ('MvpDrops', 'Drops')
+
+class ItemRefIndex:
+    # AegisName -> (AegisName, Id, source file) over one or more attached item_db files.
+    def __init__(self):
+        self.names, self.sources = {}, []
+
+    def __len__(self): return len(self.names)
+
+    @staticmethod
+    def names_from(body, path):
+        source = os.path.basename(path)
+        return {str(e['AegisName']).lower(): (e['AegisName'], e.get('Id'), source) for e in body if e.get('AegisName') is not None}
+
+    def attach(self, path, names):
+        if path not in self.sources: self.sources.append(path)
+        self.names.update(names)
+
+    def lookup(self, name): return self.names.get(str(name).lower())
+
+    def __contains__(self, name): return str(name).lower() in self.names
+
+    def suggest(self, name, n=5):
+        return [self.names[k][0] for k in difflib.get_close_matches(str(name).lower(), self.names.keys(), n=n, cutoff=0.7)]
+
+class DropIndex:
+    # Reverse index item name -> mobs dropping it, maintained per mob so edits never rescan mob_data.
+    def __init__(self, mobs=()):
+        self.by_item = defaultdict(dict)
+        for mob in mobs: self.add(mob)
+
+    def add(self, mob):
+        for field in DROP_LIST_FIELDS:
+            for drop in mob.get(field) or ():
+                if isinstance(drop, dict) and drop.get('Item') is not None:
+                    self.by_item[str(drop['Item']).lower()].setdefault(id(mob), (mob, []))[1].append((field, drop.get('Rate')))
+
+    def remove(self, mob):
+        for field in DROP_LIST_FIELDS:
+            for drop in mob.get(field) or ():
+                if isinstance(drop, dict) and (mobs := self.by_item.get(str(drop.get('Item')).lower())) is not None:
+                    mobs.pop(id(mob), None)
+                    if not mobs: del self.by_item[str(drop.get('Item')).lower()]
+
+    def replace(self, old, new):
+        self.remove(old); self.add(new)
+
+    def droppers(self, item_name):
+        # [(mob, list field, rate)] sorted by rate, highest first.
+        rows = [(mob, field, rate) for mob, drops in self.by_item.get(str(item_name).lower(), {}).values() for field, rate in drops]
+        return sorted(rows, key=lambda r: r[2] if isinstance(r[2], int) else 0, reverse=True)